@@ -0,0 +1,113 @@
+"""
+Benchmark parsing and SQLite ingest rates of the catalog compile functions
+
+The files already downloaded under MY_ASTRO_DATA are used, e.g. the small subset downloaded by
+``download_*(test=True)`` in the tests. Parsing files with every CSV parser engine is timed first,
+then files are parsed once before timing so only writing to the database is measured.
+Databases are written to a temporary folder, compiled databases are never touched.
+
+Usage: python benchmarks/bench_compile.py
+"""
+
+import contextlib
+import importlib.util
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+import mygaiadb.data
+from mygaiadb.data import compile
+
+CATALOGS = {
+    "gaia_source": (
+        "gaia_source_lite_schema.sql",
+        lambda: mygaiadb.data._GAIA_DR3_GAIASOURCE_PARENT.glob("*.csv.gz"),
+        compile._read_gaia_source,
+    ),
+    "twomass_psc": (
+        "twomass_psc_lite_schema.sql",
+        lambda: mygaiadb.data._2MASS_PARENT.glob("psc_*.gz"),
+        compile._read_tmass,
+    ),
+    "allwise": (
+        "allwise_lite_schema.sql",
+        lambda: mygaiadb.data._ALLWISE_PARENT.glob("wise-allwise-cat-*.bz2"),
+        compile._read_allwise,
+    ),
+    "catwise": (
+        "catwise_lite_schema.sql",
+        lambda: mygaiadb.data._CATWISE_PARENT.glob("*/*cat_b0.tbl.gz"),
+        compile._read_catwise,
+    ),
+}
+
+
+def ingest_to_sql(db_path: Path, schema: str, table: str, data: list[pd.DataFrame]):
+    # how compile_*_sql_db() used to ingest, default settings and one pandas to_sql() per file
+    with contextlib.closing(sqlite3.connect(db_path)) as conn:
+        compile._execute_schema(conn, schema)
+        for df in data:
+            df.to_sql(table, conn, if_exists="append", index=False)
+
+
+def ingest_executemany(
+    db_path: Path, schema: str, table: str, data: list[pd.DataFrame], bulk_load: bool
+):
+    conn = compile._connect_for_compile(db_path, bulk_load=bulk_load)
+    compile._execute_schema(conn, schema)
+    for df in data:
+        conn.execute("BEGIN")
+        compile._insert_dataframe(conn, table, df)
+        conn.execute("COMMIT")
+    compile._close_after_compile(conn, bulk_load=bulk_load)
+
+
+def bench_engines():
+    engines = ["pandas"]
+    if importlib.util.find_spec("pyarrow") is not None:
+        engines.append("pyarrow")
+    print(f"{'table':<14}{'engine':<20}{'rows':>10}{'rows/s':>14}")
+    for table, (_, glob, reader) in CATALOGS.items():
+        file_paths = sorted(glob())
+        if len(file_paths) == 0:
+            print(f"{table:<14}no files found, skipped")
+            continue
+        for engine in engines:
+            start = time.perf_counter()
+            n_rows = sum(
+                len(df) for p in file_paths for df in reader(p, engine=engine)
+            )
+            elapsed = time.perf_counter() - start
+            print(f"{table:<14}{engine:<20}{n_rows:>10,}{n_rows / elapsed:>14,.0f}")
+
+
+def bench_ingest():
+    modes = {
+        "to_sql (before)": lambda p, s, t, d: ingest_to_sql(p, s, t, d),
+        "executemany": lambda p, s, t, d: ingest_executemany(p, s, t, d, False),
+        "bulk_load (after)": lambda p, s, t, d: ingest_executemany(p, s, t, d, True),
+    }
+    print(f"{'table':<14}{'mode':<20}{'rows':>10}{'rows/s':>14}")
+    for table, (schema, glob, reader) in CATALOGS.items():
+        file_paths = sorted(glob())
+        if len(file_paths) == 0:
+            print(f"{table:<14}no files found, skipped")
+            continue
+        data = [pd.concat(list(reader(p))) for p in file_paths]
+        n_rows = sum(len(df) for df in data)
+        for mode, func in modes.items():
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                db_path = Path(tmp_dir).joinpath(f"{table}.db")
+                start = time.perf_counter()
+                func(db_path, schema, table, data)
+                elapsed = time.perf_counter() - start
+            print(f"{table:<14}{mode:<20}{n_rows:>10,}{n_rows / elapsed:>14,.0f}")
+
+
+if __name__ == "__main__":
+    bench_engines()
+    print()
+    bench_ingest()
@@ -0,0 +1,65 @@
+"""
+Benchmark file size and ``yield_xp_coeffs`` throughput of XP coeffs h5 layout profiles
+
+The XP coeffs h5 files already compiled by ``compile_xp_continuous_h5()`` under MY_ASTRO_DATA are used,
+e.g. the small subset downloaded by ``download_gaia_xp_continuous(test=True)`` in the tests.
+For every profile, a single h5 file is assembled with ``assembly="rewrite"`` in a temporary folder
+and read back by ``yield_xp_coeffs`` with a small subset of random source_id and with all source_id.
+The compiled single h5 file is never touched.
+
+Usage: python benchmarks/bench_xp_layout.py
+"""
+
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+import h5py
+import numpy as np
+
+import mygaiadb.spec
+from mygaiadb.data import compile
+
+
+def read_all_source_ids(h5_path: Path):
+    with h5py.File(h5_path, "r") as f:
+        return np.concatenate([f[i]["source_id"][()] for i in f.keys()])
+
+
+def time_yield_xp_coeffs(source_ids: np.ndarray):
+    start = time.perf_counter()
+    n_rows = sum(
+        len(coeffs)
+        for coeffs, *_ in mygaiadb.spec.yield_xp_coeffs(
+            source_ids, return_errors=True, rdcc_nbytes=2**20, rdcc_nslots=10007
+        )
+    )
+    return n_rows / (time.perf_counter() - start)
+
+
+def main():
+    rng = np.random.default_rng(42)
+    print(f"{'layout':<16}{'size (MB)':>12}{'random rows/s':>16}{'all rows/s':>14}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for layout in compile._H5_LAYOUT_PROFILES.keys():
+            h5_path = Path(tmp_dir).joinpath(f"xp_{layout}.h5")
+            with (
+                mock.patch.object(compile, "gaia_xp_coeff_h5_path", h5_path),
+                mock.patch.object(mygaiadb.spec, "gaia_xp_coeff_h5_path", h5_path),
+            ):
+                compile.compile_xp_continuous_allinone_h5(
+                    assembly="rewrite", layout=layout
+                )
+                source_ids = read_all_source_ids(h5_path)
+                subset = rng.choice(
+                    source_ids, size=max(len(source_ids) // 100, 1), replace=False
+                )
+                random_rate = time_yield_xp_coeffs(subset)
+                all_rate = time_yield_xp_coeffs(source_ids)
+            size = h5_path.stat().st_size / 1024**2
+            print(f"{layout:<16}{size:>12,.1f}{random_rate:>16,.0f}{all_rate:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,31 +7,63 @@ version = __version__ = version("MyGaiaDB")
 
 mygaiadb_path = pathlib.Path(importlib.util.find_spec("mygaiadb").origin).parent
 
-# make sure (shared) database folder exists
-astro_data_path = os.getenv("MY_ASTRO_DATA")
-if astro_data_path is None:
-    raise EnvironmentError("Please specify an environment variable - MY_ASTRO_DATA")
-else:
-    astro_data_path = pathlib.Path(astro_data_path).expanduser()
-    if not astro_data_path.exists():
-        astro_data_path.mkdir()
-
-# make sure user-specific database folder exists
-mygaiadb_folder = pathlib.Path.home().joinpath(".mygaiadb")
-mygaiadb_default_db = mygaiadb_folder.joinpath("mygaiadb.db")
-mygaiadb_usertable_db = mygaiadb_folder.joinpath("user_table.db")
-if not mygaiadb_folder.exists():
-    mygaiadb_folder.mkdir()
-mygaiadb_default_db.touch()
-mygaiadb_usertable_db.touch()
-
-gaia_sql_db_path = astro_data_path.joinpath("gaia_mirror", "gaiadr3.db")
-gaia_astro_param_sql_db_path = astro_data_path.joinpath(
-    "gaia_mirror", "gaiadr3_astrophysical_params.db"
+# paths below are resolved when one of them is first used (e.g., by LocalGaiaSQL), so importing mygaiadb does not need
+# MY_ASTRO_DATA and does not create any folder or file
+_PATH_NAMES = (
+    "astro_data_path",
+    "mygaiadb_folder",
+    "mygaiadb_default_db",
+    "mygaiadb_usertable_db",
+    "gaia_sql_db_path",
+    "gaia_astro_param_sql_db_path",
+    "gaia_xp_coeff_h5_path",
+    "tmass_sql_db_path",
+    "allwise_sql_db_path",
+    "catwise_sql_db_path",
 )
-gaia_xp_coeff_h5_path = astro_data_path.joinpath(
-    "gaia_mirror", "xp_continuous_mean_spectrum_allinone.h5"
-)
-tmass_sql_db_path = astro_data_path.joinpath("2mass_mirror", "tmass.db")
-allwise_sql_db_path = astro_data_path.joinpath("allwise_mirror", "allwise.db")
-catwise_sql_db_path = astro_data_path.joinpath("catwise_mirror", "catwise.db")
+
+
+def _resolve_paths() -> dict[str, pathlib.Path]:
+    # make sure (shared) database folder exists
+    astro_data_path = os.getenv("MY_ASTRO_DATA")
+    if astro_data_path is None:
+        raise EnvironmentError("Please specify an environment variable - MY_ASTRO_DATA")
+    else:
+        astro_data_path = pathlib.Path(astro_data_path).expanduser()
+        astro_data_path.mkdir(exist_ok=True)
+
+    # make sure user-specific database folder exists
+    mygaiadb_folder = pathlib.Path.home().joinpath(".mygaiadb")
+    mygaiadb_default_db = mygaiadb_folder.joinpath("mygaiadb.db")
+    mygaiadb_usertable_db = mygaiadb_folder.joinpath("user_table.db")
+    mygaiadb_folder.mkdir(exist_ok=True)
+    mygaiadb_default_db.touch()
+    mygaiadb_usertable_db.touch()
+
+    return {
+        "astro_data_path": astro_data_path,
+        "mygaiadb_folder": mygaiadb_folder,
+        "mygaiadb_default_db": mygaiadb_default_db,
+        "mygaiadb_usertable_db": mygaiadb_usertable_db,
+        "gaia_sql_db_path": astro_data_path.joinpath("gaia_mirror", "gaiadr3.db"),
+        "gaia_astro_param_sql_db_path": astro_data_path.joinpath(
+            "gaia_mirror", "gaiadr3_astrophysical_params.db"
+        ),
+        "gaia_xp_coeff_h5_path": astro_data_path.joinpath(
+            "gaia_mirror", "xp_continuous_mean_spectrum_allinone.h5"
+        ),
+        "tmass_sql_db_path": astro_data_path.joinpath("2mass_mirror", "tmass.db"),
+        "allwise_sql_db_path": astro_data_path.joinpath("allwise_mirror", "allwise.db"),
+        "catwise_sql_db_path": astro_data_path.joinpath("catwise_mirror", "catwise.db"),
+    }
+
+
+def __getattr__(name: str):
+    if name in _PATH_NAMES:
+        globals().update(_resolve_paths())
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_PATH_NAMES))
@@ -4,32 +4,38 @@ import shutil
 import requests
 import tqdm
 
-from mygaiadb import astro_data_path
+import mygaiadb
 
-_GAIA_PARENT = astro_data_path.joinpath("gaia_mirror")
-_GAIA_DR3_PARENT = _GAIA_PARENT.joinpath("Gaia", "gdr3")
-_GAIA_DR3_GAIASOURCE_PARENT = _GAIA_DR3_PARENT.joinpath("gaia_source")
-_GAIA_DR3_ASTROPHYS_PARENT = _GAIA_DR3_PARENT.joinpath(
-    "Astrophysical_parameters", "astrophysical_parameters"
-)
-_GAIA_DR3_ALLWISE_NEIGHBOUR_PARENT = _GAIA_DR3_PARENT.joinpath(
-    "cross_match", "allwise_best_neighbour"
-)
-_GAIA_DR3_2MASS_NEIGHBOUR_PARENT = _GAIA_DR3_PARENT.joinpath(
-    "cross_match", "tmasspscxsc_best_neighbour"
-)
-_GAIA_DR3_XP_CONTINUOUS_PARENT = _GAIA_DR3_PARENT.joinpath(
-    "Spectroscopy", "xp_continuous_mean_spectrum"
-)
-_GAIA_DR3_XP_SAMPLED_PARENT = _GAIA_DR3_PARENT.joinpath(
-    "Spectroscopy", "xp_sampled_mean_spectrum"
-)
-_GAIA_DR3_RVS_PARENT = _GAIA_DR3_PARENT.joinpath("Spectroscopy", "rvs_mean_spectrum")
-_2MASS_PARENT = astro_data_path.joinpath("2mass_mirror")
-_ALLWISE_PARENT = astro_data_path.joinpath("allwise_mirror")
-_CATWISE_PARENT = astro_data_path.joinpath("catwise_mirror", "2020")
+# folders of downloaded files relative to MY_ASTRO_DATA, resolved when first used so importing does not need MY_ASTRO_DATA
+_GAIA_DR3_PARTS = ("gaia_mirror", "Gaia", "gdr3")
+_PARENT_PARTS = {
+    "_GAIA_PARENT": ("gaia_mirror",),
+    "_GAIA_DR3_PARENT": _GAIA_DR3_PARTS,
+    "_GAIA_DR3_GAIASOURCE_PARENT": _GAIA_DR3_PARTS + ("gaia_source",),
+    "_GAIA_DR3_ASTROPHYS_PARENT": _GAIA_DR3_PARTS
+    + ("Astrophysical_parameters", "astrophysical_parameters"),
+    "_GAIA_DR3_ALLWISE_NEIGHBOUR_PARENT": _GAIA_DR3_PARTS
+    + ("cross_match", "allwise_best_neighbour"),
+    "_GAIA_DR3_2MASS_NEIGHBOUR_PARENT": _GAIA_DR3_PARTS
+    + ("cross_match", "tmasspscxsc_best_neighbour"),
+    "_GAIA_DR3_XP_CONTINUOUS_PARENT": _GAIA_DR3_PARTS
+    + ("Spectroscopy", "xp_continuous_mean_spectrum"),
+    "_GAIA_DR3_XP_SAMPLED_PARENT": _GAIA_DR3_PARTS
+    + ("Spectroscopy", "xp_sampled_mean_spectrum"),
+    "_GAIA_DR3_RVS_PARENT": _GAIA_DR3_PARTS + ("Spectroscopy", "rvs_mean_spectrum"),
+    "_2MASS_PARENT": ("2mass_mirror",),
+    "_ALLWISE_PARENT": ("allwise_mirror",),
+    "_CATWISE_PARENT": ("catwise_mirror", "2020"),
+}
 
 
+def __getattr__(name: str):
+    if name in _PARENT_PARTS:
+        value = mygaiadb.astro_data_path.joinpath(*_PARENT_PARTS[name])
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 def downloader(
     url: str,
     fullfilename: str,
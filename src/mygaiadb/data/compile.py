@@ -1,37 +1,36 @@
-import gc
+import concurrent.futures
+import contextlib
+import gzip
+import hashlib
+import importlib.util
+import io
+import multiprocessing
+import os
 import sqlite3
+import stat
+import time
+import traceback
 import warnings
+from datetime import datetime, timezone
+from functools import partial
 from pathlib import Path
+from queue import Empty
 
 import h5py
 import numpy as np
 import pandas as pd
 import tqdm
 from astropy.io import ascii
-from astropy.table import vstack
-
-from mygaiadb import (
-    allwise_sql_db_path,
-    astro_data_path,
-    catwise_sql_db_path,
-    gaia_sql_db_path,
-    gaia_xp_coeff_h5_path,
-    mygaiadb_path,
-    tmass_sql_db_path,
-)
-from mygaiadb.data import (
-    _2MASS_PARENT,
-    _ALLWISE_PARENT,
-    _CATWISE_PARENT,
-    _GAIA_DR3_2MASS_NEIGHBOUR_PARENT,
-    _GAIA_DR3_ALLWISE_NEIGHBOUR_PARENT,
-    _GAIA_DR3_ASTROPHYS_PARENT,
-    _GAIA_DR3_GAIASOURCE_PARENT,
-)
+
+import mygaiadb.data
+from mygaiadb import mygaiadb_path
+from mygaiadb.utils import radec_to_healpix
 
 
 def compile_xp_continuous_allinone_h5(
     save_correlation_matrix: bool = False,
+    assembly: str = "copy",
+    layout: str | dict | None = None,
 ):
     """
     Compile all xp_continuous_mean_spectrum h5 files into one h5 file
@@ -40,8 +39,25 @@ def compile_xp_continuous_allinone_h5(
     ----------
     save_correlation_matrix : bool, optional (default=False)
         Whether to save the correlation matrix
+    assembly : str, optional (default="copy")
+        How datasets of every h5 file are put into the single h5 file
+
+        - "rewrite": read datasets into memory and write them again
+        - "copy": copy datasets with HDF5 without decoding the data
+        - "link": external links to datasets in the h5 files, so the single h5 file is tiny but
+          it only works if the h5 files are kept at the same location relative to the single h5 file
+    layout : str | dict, optional (default=None)
+        Chunking and compression of datasets (see ``compile_xp_continuous_h5()``), only for assembly="rewrite"
+        since "copy" and "link" keep the layout of the h5 files. Default profile is used if None
     """
-    base_path = astro_data_path.joinpath(
+    if assembly not in ["rewrite", "copy", "link"]:
+        raise ValueError(
+            f"Unknown assembly '{assembly}', only 'rewrite', 'copy' and 'link' are supported"
+        )
+    if layout is not None and assembly != "rewrite":
+        raise ValueError("layout can only be set with assembly='rewrite'")
+    layout = _get_h5_layout("default" if layout is None else layout)
+    base_path = mygaiadb.astro_data_path.joinpath(
         "gaia_mirror",
         "Gaia",
         "gdr3",
@@ -63,111 +79,320 @@ def compile_xp_continuous_allinone_h5(
         int(file[file.rfind("-") + 1 : file.rfind(".h5")]) for file in file_names
     ]
 
-    if gaia_xp_coeff_h5_path.exists():
-        raise FileExistsError(f"File already existed in {gaia_xp_coeff_h5_path}")
+    if mygaiadb.gaia_xp_coeff_h5_path.exists():
+        raise FileExistsError(f"File already existed in {mygaiadb.gaia_xp_coeff_h5_path}")
 
-    h5f = h5py.File(gaia_xp_coeff_h5_path, "w")
+    h5f = h5py.File(mygaiadb.gaia_xp_coeff_h5_path, "w")
     for i in tqdm.tqdm(range(len(file_paths))):
         temp_h5_data = h5py.File(file_paths[i].as_posix(), "r")
         gp = h5f.create_group(f"{healpix_8_min[i]}-{healpix_8_max[i]}")
-        gp.create_dataset("source_id", data=temp_h5_data["source_id"][()])
-        gp.create_dataset("solution_id", data=temp_h5_data["solution_id"][()])
-        gp.create_dataset(
-            "bp_basis_function_id", data=temp_h5_data["bp_basis_function_id"][()]
-        )
-        gp.create_dataset(
-            "bp_degrees_of_freedom", data=temp_h5_data["bp_degrees_of_freedom"][()]
-        )
-        gp.create_dataset("bp_n_parameters", data=temp_h5_data["bp_n_parameters"][()])
-        gp.create_dataset(
-            "bp_n_measurements", data=temp_h5_data["bp_n_measurements"][()]
-        )
-        gp.create_dataset(
-            "bp_n_rejected_measurements",
-            data=temp_h5_data["bp_n_rejected_measurements"][()],
-        )
-        gp.create_dataset(
-            "bp_standard_deviation", data=temp_h5_data["bp_standard_deviation"][()]
-        )
-        gp.create_dataset("bp_chi_squared", data=temp_h5_data["bp_chi_squared"][()])
-        if (
-            save_correlation_matrix
-            and "bp_coefficient_correlations" in temp_h5_data.keys()
-        ):    # pragma: no cover
-            gp.create_dataset(
-                "bp_coefficient_correlations",
-                data=temp_h5_data["bp_coefficient_correlations"][()],
-            )
-        else:
+        for name in temp_h5_data.keys():
+            if name.endswith("_correlations") and not save_correlation_matrix:
+                continue
+            if assembly == "rewrite":
+                data = temp_h5_data[name][()]
+                gp.create_dataset(
+                    name,
+                    data=data,
+                    **_h5_dataset_kwargs(layout, data.shape, data.dtype),
+                )
+            elif assembly == "copy":
+                h5f.copy(temp_h5_data[name], gp, name=name)
+            else:
+                # relative path is resolved against the directory of the single h5 file by HDF5
+                gp[name] = h5py.ExternalLink(
+                    os.path.relpath(file_paths[i], mygaiadb.gaia_xp_coeff_h5_path.parent),
+                    f"/{name}",
+                )
+        if save_correlation_matrix and not all(
+            f"{band}_coefficient_correlations" in temp_h5_data.keys()
+            for band in ["bp", "rp"]
+        ):
             warnings.warn(
-                "No bp_coefficient_correlations in the original data but you have set save_correlation_matrix=True, so bp_coefficient_correlations will not be saved."
+                f"No coefficient correlations in {file_names[i]} but you have set save_correlation_matrix=True, so coefficient correlations will not be saved."
             )
-        gp.create_dataset(
-            "bp_coefficient_errors", data=temp_h5_data["bp_coefficient_errors"][()]
-        )
-        gp.create_dataset("bp_coefficients", data=temp_h5_data["bp_coefficients"][()])
-        gp.create_dataset(
-            "bp_n_relevant_bases", data=temp_h5_data["bp_n_relevant_bases"][()]
-        )
-        gp.create_dataset(
-            "bp_relative_shrinking", data=temp_h5_data["bp_relative_shrinking"][()]
-        )
+        temp_h5_data.close()
+    h5f.close()
 
-        gp.create_dataset(
-            "rp_basis_function_id", data=temp_h5_data["rp_basis_function_id"][()]
-        )
-        gp.create_dataset(
-            "rp_degrees_of_freedom", data=temp_h5_data["rp_degrees_of_freedom"][()]
-        )
-        gp.create_dataset("rp_n_parameters", data=temp_h5_data["rp_n_parameters"][()])
-        gp.create_dataset(
-            "rp_n_measurements", data=temp_h5_data["rp_n_measurements"][()]
-        )
-        gp.create_dataset(
-            "rp_n_rejected_measurements",
-            data=temp_h5_data["rp_n_rejected_measurements"][()],
-        )
-        gp.create_dataset(
-            "rp_standard_deviation", data=temp_h5_data["rp_standard_deviation"][()]
-        )
-        gp.create_dataset("rp_chi_squared", data=temp_h5_data["rp_chi_squared"][()])
-        if (
-            save_correlation_matrix
-            and "rp_coefficient_correlations" in temp_h5_data.keys()
-        ):  # pragma: no cover
-            gp.create_dataset(
-                "rp_coefficient_correlations",
-                data=temp_h5_data["rp_coefficient_correlations"][()],
-            )
-        else:
-            warnings.warn(
-                "No bp_coefficient_correlations in the original data but you have set save_correlation_matrix=True, so bp_coefficient_correlations will not be saved."
+
+# =================== h5 layout ===================
+# Layout profiles of datasets in spectra h5 files. Chunks always contain whole rows since
+# yield_xp_coeffs reads rows as a whole, smaller chunk_rows is better to read a few random rows
+# of (N, 55) coefficients while larger chunk_rows is better to read many rows and compression
+_H5_LAYOUT_PROFILES = {
+    "default": {
+        "chunk_rows": 1024,
+        "compression": None,
+        "compression_opts": None,
+        "shuffle": False,
+    },
+    "random_access": {
+        "chunk_rows": 128,
+        "compression": None,
+        "compression_opts": None,
+        "shuffle": False,
+    },
+    "lzf": {
+        "chunk_rows": 1024,
+        "compression": "lzf",
+        "compression_opts": None,
+        "shuffle": True,
+    },
+    "gzip": {
+        "chunk_rows": 1024,
+        "compression": "gzip",
+        "compression_opts": 4,
+        "shuffle": True,
+    },
+}
+# chunks of wide datasets like correlation matrices are limited to this size
+_H5_MAX_CHUNK_NBYTES = 4 * 1024**2
+
+
+def _get_h5_layout(layout: str | dict) -> dict:
+    """
+    Get layout settings from a profile name in ``_H5_LAYOUT_PROFILES`` or a dictionary to override the default profile
+    """
+    if isinstance(layout, str):
+        if layout not in _H5_LAYOUT_PROFILES:
+            raise ValueError(
+                f"Unknown layout '{layout}', only {list(_H5_LAYOUT_PROFILES.keys())} are supported"
             )
-        gp.create_dataset(
-            "rp_coefficient_errors", data=temp_h5_data["rp_coefficient_errors"][()]
-        )
-        gp.create_dataset("rp_coefficients", data=temp_h5_data["rp_coefficients"][()])
-        gp.create_dataset(
-            "rp_n_relevant_bases", data=temp_h5_data["rp_n_relevant_bases"][()]
-        )
-        gp.create_dataset(
-            "rp_relative_shrinking", data=temp_h5_data["rp_relative_shrinking"][()]
+        return _H5_LAYOUT_PROFILES[layout]
+    if unknown_keys := set(layout.keys()) - set(_H5_LAYOUT_PROFILES["default"].keys()):
+        raise ValueError(f"Unknown layout settings {sorted(unknown_keys)}")
+    return {**_H5_LAYOUT_PROFILES["default"], **layout}
+
+
+def _h5_dataset_kwargs(layout: dict, shape: tuple, dtype) -> dict:
+    """
+    Keyword arguments of ``create_dataset()`` for a dataset with the layout settings
+    """
+    row_nbytes = np.dtype(dtype).itemsize * int(np.prod(shape[1:]))
+    chunk_rows = min(
+        layout["chunk_rows"], _H5_MAX_CHUNK_NBYTES // max(row_nbytes, 1), shape[0]
+    )
+    return {
+        "chunks": (max(chunk_rows, 1),) + tuple(shape[1:]),
+        "compression": layout["compression"],
+        "compression_opts": layout["compression_opts"],
+        "shuffle": layout["shuffle"],
+    }
+
+
+# =================== XP continuous parser ===================
+# scalar columns in XpContinuousMeanSpectrum_*.csv.gz and their dtypes in h5
+_XP_CONTINUOUS_SCALAR_DTYPES = {"source_id": np.int64, "solution_id": np.int64}
+# array columns are stored as strings like "[1.0,2.0,...]"
+_XP_CONTINUOUS_ARRAY_DTYPES = {}
+for _band in ["bp", "rp"]:
+    _XP_CONTINUOUS_SCALAR_DTYPES.update(
+        {
+            f"{_band}_basis_function_id": np.int16,
+            f"{_band}_degrees_of_freedom": np.int16,
+            f"{_band}_n_parameters": np.int8,
+            f"{_band}_n_measurements": np.int16,
+            f"{_band}_n_rejected_measurements": np.int16,
+            f"{_band}_standard_deviation": np.float32,
+            f"{_band}_chi_squared": np.float32,
+            f"{_band}_n_relevant_bases": np.int16,
+            f"{_band}_relative_shrinking": np.float32,
+        }
+    )
+    _XP_CONTINUOUS_ARRAY_DTYPES.update(
+        {
+            f"{_band}_coefficients": np.float64,
+            f"{_band}_coefficient_errors": np.float32,
+            f"{_band}_coefficient_correlations": np.float32,
+        }
+    )
+del _band
+# XpContinuousMeanSpectrum_614517-614573's bp_basis_function_id is problematic,
+# need special treatment to skip that row (0-based index of data rows)
+_XP_CONTINUOUS_BAD_ROWS = {"614517-614573": [31211]}
+# number of rows to parse and write to h5 at a time
+_XP_CONTINUOUS_CHUNK_SIZE = 5_000
+
+
+def _decode_array_column(values: pd.Series, dtype) -> np.ndarray:
+    """
+    Decode a column of array strings like "[1.0,2.0,...]" to an array of shape (N, number of elements)
+
+    All strings are joined and parsed at once by numpy instead of parsing them one by one
+    """
+    values = values.to_numpy(dtype=object)
+    missing = pd.isna(values)
+    if missing.all():
+        raise ValueError("Cannot decode array column with all values missing")
+    n_elements = values[~missing][0].count(",") + 1
+    if missing.any():
+        values = values.copy()
+        values[missing] = "[" + ",".join(["nan"] * n_elements) + "]"
+    content = ",".join(values).replace("[", "").replace("]", "").replace("null", "nan")
+    # parse as float64 first so float32 results are the same as parsing each element in python
+    flat = np.fromstring(content, dtype=np.float64, sep=",")
+    if flat.size != len(values) * n_elements:
+        raise ValueError("Arrays in the column do not have the same number of elements")
+    return flat.reshape(len(values), n_elements).astype(dtype, copy=False)
+
+
+def _append_to_h5(h5f: h5py.File, name: str, data: np.ndarray, layout: dict):
+    """
+    Append data to a resizable dataset along the first axis, the dataset is created if it does not exist
+    """
+    if name not in h5f:
+        # chunks are not larger than the first batch so small files do not get oversized chunks
+        h5f.create_dataset(
+            name,
+            shape=(0,) + data.shape[1:],
+            maxshape=(None,) + data.shape[1:],
+            dtype=data.dtype,
+            **_h5_dataset_kwargs(layout, data.shape, data.dtype),
         )
-        if "bp_coefficient_correlations" in temp_h5_data.keys():
-            gp.create_dataset(
-                "bp_coefficient_correlations",
-                data=temp_h5_data["bp_coefficient_correlations"][()],
-            )
-        if "rp_coefficient_correlations" in temp_h5_data.keys():
-            gp.create_dataset(
-                "rp_coefficient_correlations",
-                data=temp_h5_data["rp_coefficient_correlations"][()],
+    dataset = h5f[name]
+    n = dataset.shape[0]
+    dataset.resize(n + data.shape[0], axis=0)
+    dataset[n:] = data
+
+
+def _xp_continuous_csv_to_h5(
+    csv_path: Path,
+    h5_path: Path,
+    save_correlation_matrix: bool = False,
+    chunksize: int = _XP_CONTINUOUS_CHUNK_SIZE,
+    layout: dict = _H5_LAYOUT_PROFILES["default"],
+):
+    """
+    Convert a XpContinuousMeanSpectrum_*.csv.gz file to h5 file chunk by chunk so memory usage is bounded by ``chunksize``
+    """
+    bad_rows = next(
+        (v for k, v in _XP_CONTINUOUS_BAD_ROWS.items() if k in csv_path.name), None
+    )
+    with gzip.open(csv_path, "rt") as f, h5py.File(h5_path, "w") as h5f:
+        # ECSV metadata lines start with "#" and followed by the line of column names
+        line = f.readline()
+        while line.startswith("#"):
+            line = f.readline()
+        names = line.strip().split(",")
+        # correlation matrices are not even parsed if not needed
+        usecols = [
+            i
+            for i in names
+            if i in _XP_CONTINUOUS_SCALAR_DTYPES
+            or (
+                i in _XP_CONTINUOUS_ARRAY_DTYPES
+                and (save_correlation_matrix or not i.endswith("_correlations"))
             )
-        temp_h5_data.close()
-    h5f.close()
+        ]
+        for chunk in pd.read_csv(
+            f,
+            header=None,
+            names=names,
+            usecols=usecols,
+            dtype={i: _XP_CONTINUOUS_SCALAR_DTYPES.get(i, object) for i in usecols},
+            skiprows=bad_rows,
+            chunksize=chunksize,
+        ):
+            for name in usecols:
+                if name in _XP_CONTINUOUS_ARRAY_DTYPES:
+                    data = _decode_array_column(
+                        chunk[name], _XP_CONTINUOUS_ARRAY_DTYPES[name]
+                    )
+                else:
+                    data = chunk[name].to_numpy()
+                _append_to_h5(h5f, name, data, layout)
+
+
+# =================== parallel h5 compilation ===================
+def _limit_worker_memory(max_memory: int | None):
+    """
+    Initializer of worker processes to limit the virtual memory of the worker to ``max_memory`` bytes
+    """
+    if max_memory is None:
+        return
+    try:
+        import resource
+    except ImportError:  # pragma: no cover
+        # resource module is not available on Windows
+        warnings.warn("Memory limit of worker processes is not supported on this platform")
+        return
+    _, hard_limit = resource.getrlimit(resource.RLIMIT_AS)
+    resource.setrlimit(resource.RLIMIT_AS, (max_memory, hard_limit))
 
 
-def compile_xp_continuous_h5(save_correlation_matrix: bool = False):
+def _convert_to_h5(converter, csv_path: Path, h5_path: Path):
+    """
+    Convert a csv file to h5 file with ``converter``, partially written h5 file is removed if failed
+    """
+    try:
+        converter(csv_path, h5_path)
+    except BaseException:
+        h5_path.unlink(missing_ok=True)
+        raise
+
+
+def _compile_h5_files(
+    converter,
+    csv_paths: list[Path],
+    desc: str,
+    n_workers: int = 1,
+    max_memory_per_worker: int | None = None,
+):
+    """
+    Convert csv.gz files to h5 files next to them with ``converter``, files are independent
+    so they can be converted in ``n_workers`` worker processes each writing its own h5 file
+
+    Parameters
+    ----------
+    converter : callable
+        Module-level function (or a ``functools.partial`` of it) which takes a csv path and a h5 path
+    csv_paths : list[Path]
+        List of csv.gz files
+    desc : str
+        Description of the progress bar
+    n_workers : int, optional (default=1)
+        Number of worker processes, 1 means converting files in the current process
+    max_memory_per_worker : int, optional (default=None)
+        Maximum virtual memory in bytes of each worker process, no limit if None
+    """
+    h5_paths = [i.with_name(f"{i.name[:-7]}.h5") for i in csv_paths]
+    if n_workers <= 1:
+        for csv_path, h5_path in zip(tqdm.tqdm(csv_paths, desc=desc), h5_paths):
+            _convert_to_h5(converter, csv_path, h5_path)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=n_workers,
+        mp_context=multiprocessing.get_context(),
+        initializer=_limit_worker_memory,
+        initargs=(max_memory_per_worker,),
+    ) as executor:
+        futures = {
+            executor.submit(_convert_to_h5, converter, csv_path, h5_path): csv_path
+            for csv_path, h5_path in zip(csv_paths, h5_paths)
+        }
+        try:
+            for future in tqdm.tqdm(
+                concurrent.futures.as_completed(futures),
+                total=len(futures),
+                desc=desc,
+            ):
+                try:
+                    future.result()
+                except Exception as e:
+                    raise RuntimeError(f"Failed to compile {futures[future]}") from e
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+
+def compile_xp_continuous_h5(
+    save_correlation_matrix: bool = False,
+    n_workers: int = 1,
+    max_memory_per_worker: int | None = None,
+    layout: str | dict = "default",
+):
     """
     Compile xp_continuous_mean_spectrum csv.gz files into h5 files
 
@@ -175,193 +400,1751 @@ def compile_xp_continuous_h5(save_correlation_matrix: bool = False):
     ----------
     save_correlation_matrix : bool, optional (default=False)
         Whether to save the correlation matrix
+    n_workers : int, optional (default=1)
+        Number of worker processes to compile files in parallel
+    max_memory_per_worker : int, optional (default=None)
+        Maximum memory in bytes of each worker process (not supported on Windows), no limit if None
+    layout : str | dict, optional (default="default")
+        Chunking and compression of datasets, either a profile name ("default", "random_access", "lzf" or "gzip")
+        or a dictionary of "chunk_rows", "compression", "compression_opts" and "shuffle" to override the default profile
     """
-    root_path = astro_data_path.joinpath(
+    layout = _get_h5_layout(layout)
+    root_path = mygaiadb.astro_data_path.joinpath(
         "gaia_mirror",
         "Gaia",
         "gdr3",
         "Spectroscopy",
         "xp_continuous_mean_spectrum",
     )
-    for i_path in tqdm.tqdm(
+    _compile_h5_files(
+        partial(
+            _xp_continuous_csv_to_h5,
+            save_correlation_matrix=save_correlation_matrix,
+            layout=layout,
+        ),
         list(root_path.glob("*.csv.gz")),
         desc="XP coeffs",
-    ):
-        # XpContinuousMeanSpectrum_614517-614573's bp_basis_function_id is problematic, need special treatment
-        if "614517-614573" in str(i_path):  # pragma: no cover
-            file_path_f = vstack(
-                [
-                    ascii.read(i_path, data_end=31212),
-                    ascii.read(i_path, data_start=31213),
-                ]
-            )
-        else:
-            file_path_f = ascii.read(i_path)
+        n_workers=n_workers,
+        max_memory_per_worker=max_memory_per_worker,
+    )
 
-        bp_basis_function_id = np.asarray(
-            file_path_f["bp_basis_function_id"], dtype=np.int16
-        )
-        bp_degrees_of_freedom = np.asarray(
-            file_path_f["bp_degrees_of_freedom"], dtype=np.int16
-        )
-        bp_n_parameters = np.asarray(file_path_f["bp_n_parameters"], dtype=np.int8)
-        bp_n_measurements = np.asarray(file_path_f["bp_n_measurements"], dtype=np.int16)
-        bp_n_rejected_measurements = np.asarray(
-            file_path_f["bp_n_rejected_measurements"], dtype=np.int16
-        )
-        bp_standard_deviation = np.asarray(
-            file_path_f["bp_standard_deviation"], dtype=np.float32
-        )
-        bp_chi_squared = np.asarray(file_path_f["bp_chi_squared"], dtype=np.float32)
-        bp_coefficient_errors = np.stack(file_path_f["bp_coefficient_errors"])
-        bp_coefficients = np.stack(file_path_f["bp_coefficients"])
-        bp_n_relevant_bases = np.asarray(
-            file_path_f["bp_n_relevant_bases"], dtype=np.int16
-        )
-        bp_relative_shrinking = np.asarray(
-            file_path_f["bp_relative_shrinking"], dtype=np.float32
-        )
 
-        rp_basis_function_id = np.asarray(
-            file_path_f["rp_basis_function_id"], dtype=np.int16
-        )
-        rp_degrees_of_freedom = np.asarray(
-            file_path_f["rp_degrees_of_freedom"], dtype=np.int16
-        )
-        rp_n_parameters = np.asarray(file_path_f["rp_n_parameters"], dtype=np.int8)
-        rp_n_measurements = np.asarray(file_path_f["rp_n_measurements"], dtype=np.int16)
-        rp_n_rejected_measurements = np.asarray(
-            file_path_f["rp_n_rejected_measurements"], dtype=np.int16
-        )
-        rp_standard_deviation = np.asarray(
-            file_path_f["rp_standard_deviation"], dtype=np.float32
-        )
-        rp_chi_squared = np.asarray(file_path_f["rp_chi_squared"], dtype=np.float32)
-        rp_coefficient_errors = np.stack(file_path_f["rp_coefficient_errors"])
-        rp_coefficients = np.stack(file_path_f["rp_coefficients"])
-        rp_n_relevant_bases = np.asarray(
-            file_path_f["rp_n_relevant_bases"], dtype=np.int16
-        )
-        rp_relative_shrinking = np.asarray(
-            file_path_f["rp_relative_shrinking"], dtype=np.float32
-        )
+def _mean_spectrum_csv_to_h5(
+    csv_path: Path, h5_path: Path, layout: dict = _H5_LAYOUT_PROFILES["default"]
+):  # pragma: no cover
+    """
+    Convert a RvsMeanSpectrum_*.csv.gz or XpSampledMeanSpectrum_*.csv.gz file to h5 file
+    """
+    file_path_f = ascii.read(csv_path)
+    flux = np.vstack(file_path_f["flux"])
+    flux_error = np.vstack(file_path_f["flux_error"])
 
-        file_names_wo_ext = i_path.name[:-7]
-        with h5py.File(
-            root_path.joinpath(
-                f"{file_names_wo_ext}.h5",
-            ),
-            "w",
-        ) as h5f:
-            h5f.create_dataset("source_id", data=file_path_f["source_id"].data)
-            h5f.create_dataset("solution_id", data=file_path_f["solution_id"].data)
-            h5f.create_dataset("bp_basis_function_id", data=bp_basis_function_id)
-            h5f.create_dataset("bp_degrees_of_freedom", data=bp_degrees_of_freedom)
-            h5f.create_dataset("bp_n_parameters", data=bp_n_parameters)
-            h5f.create_dataset("bp_n_measurements", data=bp_n_measurements)
-            h5f.create_dataset(
-                "bp_n_rejected_measurements", data=bp_n_rejected_measurements
-            )
-            h5f.create_dataset("bp_standard_deviation", data=bp_standard_deviation)
-            h5f.create_dataset("bp_chi_squared", data=bp_chi_squared)
-            if save_correlation_matrix:
-                bp_coefficient_correlations = np.stack(
-                    file_path_f["bp_coefficient_correlations"]
-                )
-                h5f.create_dataset(
-                    "bp_coefficient_correlations", data=bp_coefficient_correlations
-                )
-                del bp_coefficient_correlations  # prevent potential memory issue
-            h5f.create_dataset("bp_coefficient_errors", data=bp_coefficient_errors)
-            h5f.create_dataset("bp_coefficients", data=bp_coefficients)
-            h5f.create_dataset("bp_n_relevant_bases", data=bp_n_relevant_bases)
-            h5f.create_dataset("bp_relative_shrinking", data=bp_relative_shrinking)
-
-            h5f.create_dataset("rp_basis_function_id", data=rp_basis_function_id)
-            h5f.create_dataset("rp_degrees_of_freedom", data=rp_degrees_of_freedom)
-            h5f.create_dataset("rp_n_parameters", data=rp_n_parameters)
-            h5f.create_dataset("rp_n_measurements", data=rp_n_measurements)
-            h5f.create_dataset(
-                "rp_n_rejected_measurements", data=rp_n_rejected_measurements
+    with h5py.File(h5_path, "w") as f:
+        for name, data in [
+            ("source_id", file_path_f["source_id"].data),
+            ("solution_id", file_path_f["solution_id"].data),
+            ("ra", file_path_f["ra"].data),
+            ("dec", file_path_f["dec"].data),
+            ("flux", flux),
+            ("flux_error", flux_error),
+        ]:
+            f.create_dataset(
+                name, data=data, **_h5_dataset_kwargs(layout, data.shape, data.dtype)
             )
-            h5f.create_dataset("rp_standard_deviation", data=rp_standard_deviation)
-            h5f.create_dataset("rp_chi_squared", data=rp_chi_squared)
-            if save_correlation_matrix:
-                rp_coefficient_correlations = np.stack(
-                    file_path_f["rp_coefficient_correlations"]
-                )
-                h5f.create_dataset(
-                    "rp_coefficient_correlations", data=rp_coefficient_correlations
-                )
-                del rp_coefficient_correlations  # prevent potential memory issue
-            h5f.create_dataset("rp_coefficient_errors", data=rp_coefficient_errors)
-            h5f.create_dataset("rp_coefficients", data=rp_coefficients)
-            h5f.create_dataset("rp_n_relevant_bases", data=rp_n_relevant_bases)
-            h5f.create_dataset("rp_relative_shrinking", data=rp_relative_shrinking)
-        # prevent potential memory issue
-        del file_path_f
-        gc.collect()
 
 
-def compile_rvs_h5():  # pragma: no cover
+def compile_rvs_h5(
+    n_workers: int = 1,
+    max_memory_per_worker: int | None = None,
+    layout: str | dict = "default",
+):  # pragma: no cover
     """
     Compile rvs_mean_spectrum csv.gz files into h5 files
+
+    Parameters
+    ----------
+    n_workers : int, optional (default=1)
+        Number of worker processes to compile files in parallel
+    max_memory_per_worker : int, optional (default=None)
+        Maximum memory in bytes of each worker process (not supported on Windows), no limit if None
+    layout : str | dict, optional (default="default")
+        Chunking and compression of datasets, either a profile name ("default", "random_access", "lzf" or "gzip")
+        or a dictionary of "chunk_rows", "compression", "compression_opts" and "shuffle" to override the default profile
     """
-    root_path = astro_data_path.joinpath(
+    layout = _get_h5_layout(layout)
+    root_path = mygaiadb.astro_data_path.joinpath(
         "gaia_mirror",
         "Gaia",
         "gdr3",
         "Spectroscopy",
         "rvs_mean_spectrum",
     )
-    for i_path in tqdm.tqdm(
+    _compile_h5_files(
+        partial(_mean_spectrum_csv_to_h5, layout=layout),
         list(root_path.glob("*.csv.gz")),
         desc="RVS spec",
-    ):
-        file_path_f = ascii.read(i_path)
-        flux = np.vstack(file_path_f["flux"])
-        flux_error = np.vstack(file_path_f["flux_error"])
-
-        file_names_wo_ext = i_path.name[:-7]
-        with h5py.File(root_path.joinpath(f"{file_names_wo_ext}.h5"), "w") as f:
-            f.create_dataset("source_id", data=file_path_f["source_id"].data)
-            f.create_dataset("solution_id", data=file_path_f["solution_id"].data)
-            f.create_dataset("ra", data=file_path_f["ra"].data)
-            f.create_dataset("dec", data=file_path_f["dec"].data)
-            f.create_dataset("flux", data=flux)
-            f.create_dataset("flux_error", data=flux_error)
+        n_workers=n_workers,
+        max_memory_per_worker=max_memory_per_worker,
+    )
 
 
-def comile_xp_mean_spec_h5():  # pragma: no cover
+def comile_xp_mean_spec_h5(
+    n_workers: int = 1,
+    max_memory_per_worker: int | None = None,
+    layout: str | dict = "default",
+):  # pragma: no cover
     """
     Compile xp_sampled_mean_spectrum csv.gz files into h5 files
+
+    Parameters
+    ----------
+    n_workers : int, optional (default=1)
+        Number of worker processes to compile files in parallel
+    max_memory_per_worker : int, optional (default=None)
+        Maximum memory in bytes of each worker process (not supported on Windows), no limit if None
+    layout : str | dict, optional (default="default")
+        Chunking and compression of datasets, either a profile name ("default", "random_access", "lzf" or "gzip")
+        or a dictionary of "chunk_rows", "compression", "compression_opts" and "shuffle" to override the default profile
     """
-    root_path = astro_data_path.joinpath(
+    layout = _get_h5_layout(layout)
+    root_path = mygaiadb.astro_data_path.joinpath(
         "gaia_mirror",
         "Gaia",
         "gdr3",
         "Spectroscopy",
         "xp_sampled_mean_spectrum",
     )
-    for i_path in tqdm.tqdm(list(root_path.glob("*.csv.gz")), desc="XP specs"):
-        file_path_f = ascii.read(i_path)
-        flux = np.vstack(file_path_f["flux"])
-        flux_error = np.vstack(file_path_f["flux_error"])
+    _compile_h5_files(
+        partial(_mean_spectrum_csv_to_h5, layout=layout),
+        list(root_path.glob("*.csv.gz")),
+        desc="XP specs",
+        n_workers=n_workers,
+        max_memory_per_worker=max_memory_per_worker,
+    )
+
+
+# =================== catalog columns and dtypes ===================
+# we have added "grvs_mag" to the table on top of gaia_source_lite on Gaia Archive
+# use "Int32" type for int columns with NaN
+_GAIA_SOURCE_DTYPES = {
+    "source_id": np.int64,
+    "random_index": np.int64,
+    "ra": np.float64,
+    "ra_error": np.float64,
+    "dec": np.float64,
+    "dec_error": np.float64,
+    "parallax": np.float64,
+    "parallax_error": np.float64,
+    "parallax_over_error": np.float32,
+    "pmra": np.float64,
+    "pmra_error": np.float64,
+    "pmdec": np.float64,
+    "pmdec_error": np.float64,
+    "ra_dec_corr": np.float32,
+    "ra_parallax_corr": np.float32,
+    "ra_pmra_corr": np.float32,
+    "ra_pmdec_corr": np.float32,
+    "dec_parallax_corr": np.float32,
+    "dec_pmra_corr": np.float32,
+    "dec_pmdec_corr": np.float32,
+    "parallax_pmra_corr": np.float32,
+    "parallax_pmdec_corr": np.float32,
+    "pmra_pmdec_corr": np.float32,
+    "astrometric_params_solved": "Int32",
+    "nu_eff_used_in_astrometry": np.float32,
+    "pseudocolour": np.float64,
+    "pseudocolour_error": np.float64,
+    "astrometric_matched_transits": "Int32",
+    "ipd_gof_harmonic_amplitude": np.float32,
+    "ipd_frac_multi_peak": "Int32",
+    "ipd_frac_odd_win": "Int32",
+    "ruwe": np.float32,
+    "phot_g_mean_flux": np.float64,
+    "phot_g_mean_flux_over_error": np.float32,
+    "phot_g_mean_mag": np.float32,
+    "phot_bp_mean_flux": np.float64,
+    "phot_bp_mean_flux_over_error": np.float32,
+    "phot_bp_mean_mag": np.float32,
+    "phot_rp_mean_flux": np.float64,
+    "phot_rp_mean_flux_over_error": np.float32,
+    "phot_rp_mean_mag": np.float32,
+    "phot_bp_rp_excess_factor": np.float32,
+    "bp_rp": np.float32,
+    "radial_velocity": np.float64,
+    "radial_velocity_error": np.float64,
+    "rv_nb_transits": "Int32",
+    "rv_expected_sig_to_noise": np.float32,
+    "rv_renormalised_gof": np.float32,
+    "rv_chisq_pvalue": np.float32,
+    "rvs_spec_sig_to_noise": np.float32,
+    "grvs_mag": np.float32,
+    "l": np.float64,
+    "b": np.float64,
+    "has_xp_continuous": bool,
+    "has_xp_sampled": bool,
+    "has_rvs": bool,
+}
+
+_GAIA_ASTROPHYSICAL_DTYPES = {
+    "source_id": np.int64,
+    "classprob_dsc_combmod_quasar": np.float32,
+    "classprob_dsc_combmod_galaxy": np.float32,
+    "classprob_dsc_combmod_star": np.float32,
+    "classprob_dsc_combmod_whitedwarf": np.float32,
+    "classprob_dsc_combmod_binarystar": np.float32,
+    "classprob_dsc_specmod_quasar": np.float32,
+    "classprob_dsc_specmod_galaxy": np.float32,
+    "classprob_dsc_specmod_star": np.float32,
+    "classprob_dsc_specmod_whitedwarf": np.float32,
+    "classprob_dsc_specmod_binarystar": np.float32,
+    "classprob_dsc_allosmod_quasar": np.float32,
+    "classprob_dsc_allosmod_galaxy": np.float32,
+    "classprob_dsc_allosmod_star": np.float32,
+    "teff_gspphot": np.float32,
+    "teff_gspphot_lower": np.float32,
+    "teff_gspphot_upper": np.float32,
+    "logg_gspphot": np.float32,
+    "logg_gspphot_lower": np.float32,
+    "logg_gspphot_upper": np.float32,
+    "mh_gspphot": np.float32,
+    "mh_gspphot_lower": np.float32,
+    "mh_gspphot_upper": np.float32,
+    "distance_gspphot": np.float32,
+    "distance_gspphot_lower": np.float32,
+    "distance_gspphot_upper": np.float32,
+    "azero_gspphot": np.float32,
+    "azero_gspphot_lower": np.float32,
+    "azero_gspphot_upper": np.float32,
+    "ag_gspphot": np.float32,
+    "ag_gspphot_lower": np.float32,
+    "ag_gspphot_upper": np.float32,
+    "abp_gspphot": np.float32,
+    "abp_gspphot_lower": np.float32,
+    "abp_gspphot_upper": np.float32,
+    "arp_gspphot": np.float32,
+    "arp_gspphot_lower": np.float32,
+    "arp_gspphot_upper": np.float32,
+    "ebpminrp_gspphot": np.float32,
+    "ebpminrp_gspphot_lower": np.float32,
+    "ebpminrp_gspphot_upper": np.float32,
+    "mg_gspphot": np.float32,
+    "mg_gspphot_lower": np.float32,
+    "mg_gspphot_upper": np.float32,
+    "radius_gspphot": np.float32,
+    "radius_gspphot_lower": np.float32,
+    "radius_gspphot_upper": np.float32,
+    "logposterior_gspphot": np.float32,
+    "mcmcaccept_gspphot": np.float32,
+    "libname_gspphot": str,
+    "teff_gspspec": np.float32,
+    "teff_gspspec_lower": np.float32,
+    "teff_gspspec_upper": np.float32,
+    "logg_gspspec": np.float32,
+    "logg_gspspec_lower": np.float32,
+    "logg_gspspec_upper": np.float32,
+    "mh_gspspec": np.float32,
+    "mh_gspspec_lower": np.float32,
+    "mh_gspspec_upper": np.float32,
+    "alphafe_gspspec": np.float32,
+    "alphafe_gspspec_lower": np.float32,
+    "alphafe_gspspec_upper": np.float32,
+    "flags_gspspec": str,
+    "activityindex_espcs": np.float32,
+    "activityindex_espcs_uncertainty": np.float32,
+    "activityindex_espcs_input": str,
+}
+
+# only the first part, not all actually
+# https://irsa.ipac.caltech.edu/data/2MASS/docs/releases/allsky/doc/sec2_2a.html
+_TMASS_ALLCOL = [
+    "ra",
+    "dec",
+    "err_maj",
+    "err_min",
+    "err_ang",
+    "designation",
+    # Primary Photometric Information
+    "j_m",
+    "j_cmsig",
+    "j_msigcom",
+    "j_snr",
+    "h_m",
+    "h_cmsig",
+    "h_msigcom",
+    "h_snr",
+    "k_m",
+    "k_cmsig",
+    "k_msigcom",
+    "k_snr",
+    # Primary Source Quality Information
+    "ph_qual",
+    "rd_flg",
+    "bl_flg",
+    "cc_flg",
+    "ndet",
+    "prox",
+    "pxpa",
+    "pxcntr",
+    "gal_contam",
+    "mp_flg",
+    # Additional Positional and Identification Information
+    "pts_key/cntr",
+    "hemis",
+    "date",
+    "scan",
+    "glon",
+    "glat",
+    "x_scan",
+    "jdate",
+    # Additional Photometric Information
+    "j_psfchi",
+    "h_psfchi",
+    "k_psfchi" "j_m_stdap",
+    "j_msig_stdap",
+    "h_m_stdap",
+    "h_msig_stdap",
+    "k_m_stdap",
+    "k_msig_stdap",
+    # Additional Source Quality Information
+    "dist_edge_ns",
+    "dist_edge_ew",
+    "dist_edge_flg",
+    "dup_src",
+    "use_src",
+    # Optical Source Association Information
+    "a",
+    "dist_opt",
+    "phi_opt",
+    "b_m_opt",
+    "vr_m_opt",
+    "nopt_mchs",
+    # Cross-Index Information
+    "ext_key",
+    "scan_key",
+    "coadd_key",
+    "coadd",
+]
+
+_TMASS_DTYPES = {
+    "ra": np.float64,
+    "dec": np.float64,
+    "designation": str,
+    "j_m": np.float32,
+    "j_cmsig": np.float32,
+    "j_msigcom": np.float32,
+    "j_snr": np.float32,
+    "h_m": np.float32,
+    "h_cmsig": np.float32,
+    "h_msigcom": np.float32,
+    "h_snr": np.float32,
+    "k_m": np.float32,
+    "k_cmsig": np.float32,
+    "k_msigcom": np.float32,
+    "k_snr": np.float32,
+    "ph_qual": str,
+    "rd_flg": str,
+    "bl_flg": str,
+    "cc_flg": str,
+    "ndet": str,
+    "prox": np.float32,
+}
+
+# only the first part, not all actually
+# https://wise2.ipac.caltech.edu/docs/release/allwise/expsup/sec2_1a.html
+_ALLWISE_ALLCOL = [
+    # Basic Position and Identification Information
+    "designation",
+    "ra",
+    "dec",
+    "sigra",
+    "sigdec",
+    "sigradec",
+    "glon",
+    "glat",
+    "elon",
+    "elat",
+    "wx",
+    "wy",
+    "cntr",
+    "source_id",
+    "coadd_id",
+    "src",
+    # Primary Photometric Information
+    "w1mpro",
+    "w1sigmpro",
+    "w1snr",
+    "w1rchi2",
+    "w2mpro",
+    "w2sigmpro",
+    "w2snr",
+    "w2rchi2",
+    "w3mpro",
+    "w3sigmpro",
+    "w3snr",
+    "w3rchi2",
+    "w4mpro",
+    "w4sigmpro",
+    "w4snr",
+    "w4rchi2",
+    "rchi2",
+    "nb",
+    "na",
+    "w1sat",
+    "w2sat",
+    "w3sat",
+    "w4sat",
+    "satnum",
+    # Motion Fit Parameters
+    "ra_pm",
+    "dec_pm",
+    "sigra_pm",
+    "sigdec_pm",
+    "sigradec_pm",
+    "pmra",
+    "sigpmra",
+    "pmdec",
+    "sigpmdec",
+    "w1rchi2_pm",
+    "w2rchi2_pm",
+    "w3rchi2_pm",
+    "w4rchi2_pm",
+    "rchi2_pm",
+    "pmcode",
+    # Measurement Quality and Source Reliability Information
+    "cc_flags",
+    "rel",
+    "ext_flg",
+    "var_flg",
+    "ph_qual",
+    "det_bit",
+    "moon_lev",
+    "w1nm",
+    "w1m",
+    "w2nm",
+    "w2m",
+    "w3nm",
+    "w3m",
+    "w4nm",
+    "w4m",
+    "w1cov",
+    "w2cov",
+    "w3cov",
+    "w4cov",
+    "w1cc_map",
+    "w1cc_map_str",
+    "w2cc_map",
+    "w2cc_map_str",
+    "w3cc_map",
+    "w3cc_map_str",
+    "w4cc_map",
+    "w4cc_map_str",
+    "use_src",
+    "best_use_src",
+    "ngrp",
+    # Additional Photometric Information
+    "w1flux",
+    "w1sigflux",
+    "w1sky",
+    "w1sigsk",
+    "w1conf",
+    "w2flux",
+    "w2sigflux",
+    "w2sky",
+    "w2sigsk",
+    "w2conf",
+    "w3flux",
+    "w3sigflux",
+    "w3sky",
+    "w3sigsk",
+    "w3conf",
+    "w4flux",
+    "w4sigflux",
+    "w4sky",
+    "w4sigsk",
+    "w4conf",
+    "w1mag",
+    "w1sigm",
+    "w1flg",
+    "w1mcor",
+    "w2mag",
+    "w2sigm",
+    "w2flg",
+    "w2mcor",
+    "w3mag",
+    "w3sigm",
+    "w3flg",
+    "w3mcor",
+    "w4mag",
+    "w4sigm",
+    "w4flg",
+    "w4mcor",
+    "w1mag_1",
+    "w1sigm_1",
+    "w1flg_1",
+    "w2mag_1",
+    "w2sigm_1",
+    "w2flg_1",
+    "w3mag_1",
+    "w3sigm_1",
+    "w3flg_1",
+    "w4mag_1",
+    "w4sigm_1",
+    "w4flg_1",
+    "w1mag_2",
+    "w1sigm_2",
+    "w1flg_2",
+    "w2mag_2",
+    "w2sigm_2",
+    "w2flg_2",
+    "w3mag_2",
+    "w3sigm_2",
+    "w3flg_2",
+    "w4mag_2",
+    "w4sigm_2",
+    "w4flg_2",
+    "w1mag_3",
+    "w1sigm_3",
+    "w1flg_3",
+    "w2mag_3",
+    "w2sigm_3",
+    "w2flg_3",
+    "w3mag_3",
+    "w3sigm_3",
+    "w3flg_3",
+    "w4mag_3",
+    "w4sigm_3",
+    "w4flg_3",
+    "w1mag_4",
+    "w1sigm_4",
+    "w1flg_4",
+    "w2mag_4",
+    "w2sigm_4",
+    "w2flg_4",
+    "w3mag_4",
+    "w3sigm_4",
+    "w3flg_4",
+    "w4mag_4",
+    "w4sigm_4",
+    "w4flg_4",
+    "w1mag_5",
+    "w1sigm_5",
+    "w1flg_5",
+    "w2mag_5",
+    "w2sigm_5",
+    "w2flg_5",
+    "w3mag_5",
+    "w3sigm_5",
+    "w3flg_5",
+    "w4mag_5",
+    "w4sigm_5",
+    "w4flg_5",
+    "w1mag_6",
+    "w1sigm_6",
+    "w1flg_6",
+    "w2mag_6",
+    "w2sigm_6",
+    "w2flg_6",
+    "w3mag_6",
+    "w3sigm_6",
+    "w3flg_6",
+    "w4mag_6",
+    "w4sigm_6",
+    "w4flg_6",
+    "w1mag_7",
+    "w1sigm_7",
+    "w1flg_7",
+    "w2mag_7",
+    "w2sigm_7",
+    "w2flg_7",
+    "w3mag_7",
+    "w3sigm_7",
+    "w3flg_7",
+    "w4mag_7",
+    "w4sigm_7",
+    "w4flg_7",
+    "w1mag_",
+    "w1sigm_8",
+    "w1flg_8",
+    "w2mag_8",
+    "w2sigm_8",
+    "w2flg_8",
+    "w3mag_8",
+    "w3sigm_8",
+    "w3flg_8",
+    "w4mag_8",
+    "w4sigm_8",
+    "w4flg_8",
+    "w1magp",
+    "w1sigp1",
+    "w1sigp2",
+    "w1k",
+    "w1ndf",
+    "w1mlq",
+    "w1mjdmin",
+    "w1mjdmax",
+    "w1mjdmean",
+    "w2magp",
+    "w2sigp1",
+    "w2sigp2",
+    "w2k",
+    "w2ndf",
+    "w2mlq",
+    "w2mjdmin",
+    "w2mjdmax",
+    "w2mjdmean",
+    "w3magp",
+    "w3sigp1",
+    "w3sigp2",
+    "w3k",
+    "w3ndf",
+    "w3mlq",
+    "w3mjdmin",
+    "w3mjdmax",
+    "w3mjdmean",
+    "w4magp",
+    "w4sigp1",
+    "w4sigp2",
+    "w4k",
+    "w4ndf",
+    "w4mlq",
+    "w4mjdmin",
+    "w4mjdmax",
+    "w4mjdmean",
+    "rho12",
+    "rho23",
+    "rho34",
+    "q12",
+    "q23",
+    "q34",
+    "xscprox",
+    "w1rsemi",
+    "w1ba",
+    "w1pa",
+    "w1gmag",
+    "w1gerr",
+    "w1gflg",
+    "w2rsemi",
+    "w2ba",
+    "w2pa",
+    "w2gmag",
+    "w2gerr",
+    "w2gflg",
+    "w3rsemi",
+    "w3ba",
+    "w3pa",
+    "w3gmag",
+    "w3gerr",
+    "w3gflg",
+    "w4rsemi",
+    "w4ba",
+    "w4pa",
+    "w4gmag",
+    "w4gerr",
+    "w4gflg",
+    "tmass_key",
+    "r_2mass",
+    "pa_2mass",
+    "n_2mass",
+    "j_m_2mass",
+    "j_msig_2mass",
+    "h_m_2mass",
+    "h_msig_2mass",
+    "k_m_2mass",
+    "k_msig_2mass",
+    "x",
+    "y",
+    "z",
+    "spt_ind",
+    "htm20",
+]
+
+_ALLWISE_DTYPES = {
+    "designation": str,  # designation does not seems to be unique, dont use it as primary key
+    "ra": np.float64,
+    "dec": np.float64,
+    "sigra": np.float32,
+    "sigdec": np.float32,
+    "sigradec": np.float32,
+    "w1mpro": np.float32,
+    "w1sigmpro": np.float32,
+    "w1snr": np.float32,
+    "w2mpro": np.float32,
+    "w2sigmpro": np.float32,
+    "w2snr": np.float32,
+    "w3mpro": np.float32,
+    "w3sigmpro": np.float32,
+    "w3snr": np.float32,
+    "w4mpro": np.float32,
+    "w4sigmpro": np.float32,
+    "w4snr": np.float32,
+    "nb": "Int32",
+    "na": "Int32",
+    "cc_flags": str,
+    "ext_flg": "Int32",
+    "var_flg": str,
+    "ph_qual": str,
+    "w1mjdmean": np.float64,
+    "w2mjdmean": np.float64,
+    "w3mjdmean": np.float64,
+    "w4mjdmean": np.float64,
+    "w1gmag": np.float32,
+    "w1gerr": np.float32,
+    "w2gmag": np.float32,
+    "w2gerr": np.float32,
+    "w3gmag": np.float32,
+    "w3gerr": np.float32,
+    "w4gmag": np.float32,
+    "w4gerr": np.float32,
+}
+
+# only the first part, not all actually
+# https://portal.nersc.gov/project/cosmo/data/CatWISE/2020cwcat.sis20200318.txt
+_CATWISE_ALLCOL = [
+    # Note that the first column in the width is occupied by a "pipe" or "bar" delimiter ("|")
+    "source_name",
+    "source_id",
+    "ra",
+    "dec",
+    "sigra",
+    "sigdec",
+    "sigradec",
+    # the following positions reflect the source xy position in the unWISE full depth coadd
+    "wx",
+    "wy",
+    # The next set of columns are aperture/annulus measurements from the unWISE epoch coadds
+    "w1sky",
+    "w1sigsk",
+    "w1conf",
+    "w2sky",
+    "w2sigsk",
+    "w2conf",
+    # WPRO epoch coadd measurements
+    "w1fitr",
+    "w2fitr",
+    "w1snr",
+    "w2snr",
+    "w1flux",
+    "w1sigflux",
+    "w2flux",
+    "w2sigflux",
+    "w1mpro",
+    "w1sigmpro",
+    "w1rchi2",
+    "w2mpro",
+    "w2sigmpro",
+    "w2rchi2",
+    "rchi2",
+    "nb",
+    "na",
+    "w1Sat",
+    "w2Sat",
+    # full depth coadd measurements: WAPPco, standard aperture w/ aperture correction;
+    # the standard (aperture corrected) aperture radius is 8.25 arcsec.
+    "w1mag",
+    "w1sigm",
+    "w1flg",
+    "w1Cov",
+    "w2mag",
+    "w2sigm",
+    "w2flg",
+    "w2Cov",
+    # full depth coadd measurements: WAPPco, circular apertures, no aperture correction is applied;
+    # radii:    5.50   8.25  11.00  13.75  16.50  19.25  22.00  24.75 arcsec
+    "w1mag_1",
+    "w1sigm_1",
+    "w1flg_1",
+    "w2mag_1",
+    "w2sigm_1",
+    "w2flg_1",
+    "w1mag_2",
+    "w1sigm_2",
+    "w1flg_2",
+    "w2mag_2",
+    "w2sigm_2",
+    "w2flg_2",
+    "w1mag_3",
+    "w1sigm_3",
+    "w1flg_3",
+    "w2mag_3",
+    "w2sigm_3",
+    "w2flg_3",
+    "w1mag_4",
+    "w1sigm_4",
+    "w1flg_4",
+    "w2mag_4",
+    "w2sigm_4",
+    "w2flg_4",
+    "w1mag_5",
+    "w1sigm_5",
+    "w1flg_5",
+    "w2mag_5",
+    "w2sigm_5",
+    "w2flg_5",
+    "w1mag_6",
+    "w1sigm_6",
+    "w1flg_6",
+    "w2mag_6",
+    "w2sigm_6",
+    "w2flg_6",
+    "w1mag_7",
+    "w1sigm_7",
+    "w1flg_7",
+    "w2mag_7",
+    "w2sigm_7",
+    "w2flg_7",
+    "w1mag_8",
+    "w1sigm_8",
+    "w1flg_8",
+    "w2mag_8",
+    "w2sigm_8",
+    "w2flg_8",
+    # the following are "N of M" counters for WPRO measurements
+    # w?M   - The number of individual epochs for band ? that are
+    #         available to make a profile-fit measurement.
+    # w?NM  - The number of individual epochs for band ? on which
+    #         WPRO extracted a flux measurement that has snr>3.
+    # w?mLQ - variability indicator mLogQ for the flux array
+    "w1NM",
+    "w1M",
+    "w1magP",
+    "w1sigP1",
+    "w1sigP2",
+    "w1k",
+    "w1Ndf",
+    "w1mLQ",
+    "w1mJDmin",
+    "w1mJDmax",
+    "w1mJDmean",
+    "w2NM",
+    "w2M",
+    "w2magP",
+    "w2sigP1",
+    "w2sigP2",
+    "w2k",
+    "w2Ndf",
+    "w2mLQ",
+    "w2mJDmin",
+    "w2mJDmax",
+    "w2mJDmean",
+    "rho12",
+    "q12",
+    "nIters",
+    "nSteps",
+    "mdetID",
+    "p1",
+    "p2",
+    "MeanObsMJD",
+    "ra_pm",
+    "dec_pm",
+    "sigra_pm",
+    "sigdec_pm",
+    "sigradec_pm",
+    "PMRA",
+    "PMDec",
+    "sigPMRA",
+    "sigPMDec",
+    "w1snr_pm",
+    "w2snr_pm",
+    "w1flux_pm",
+    "w1sigflux_pm",
+    "w2flux_pm",
+    "w2sigflux_pm",
+    "w1mpro_pm",
+    "w1sigmpro_pm",
+    "w1rchi2_pm",
+    "w2mpro_pm",
+    "w2sigmpro_pm",
+    "w2rchi2_pm",
+    "rchi2_pm",
+    "pmcode",
+    "nIters_pm",
+    "nSteps_pm",
+    "dist",
+    "dw1mag",
+    "rch2w1",
+    "dw2mag",
+    "rch2w2",
+    "elon_avg",
+    "elonSig",
+    "elat_avg",
+    "elatSig",
+    "Delon",
+    "DelonSig",
+    "Delat",
+    "DelatSig",
+    "DelonSNR",
+    "DelatSNR",
+    "chi2pmra",
+    "chi2pmdec",
+    "ka",
+    "k1",
+    "k2",
+    "km",
+    "par_pm",
+    "par_pmSig",
+    "par_stat",
+    "par_sigma",
+    "dist_x",
+    "cc_flags",
+    "w1cc_map",
+    "w1cc_map_str",
+    "w2cc_map",
+    "w2cc_map_str",
+    "n_aw",
+    "ab_flags",
+    "w1ab_map",
+    "w1ab_map_str",
+    "w2ab_map",
+    "w2ab_map_str",
+    "glon",
+    "glat",
+    "elon",
+    "elat",
+    "unwise_objid",
+]
+
+_CATWISE_DTYPES = {
+    "source_name": str,  # source_name does not seems to be unique, dont use it as primary key
+    "source_id": str,
+    "ra": np.float64,
+    "dec": np.float64,
+    "sigra": np.float32,
+    "sigdec": np.float32,
+    "sigradec": np.float32,
+    "w1snr": np.float32,  # 18
+    "w2snr": np.float32,  # 19
+    "w1mpro": np.float32,  # 24
+    "w1sigmpro": np.float32,  # 25
+    "w2mpro": np.float32,  # 27
+    "w2sigmpro": np.float32,  # 28
+    "nb": "Int32",  # 31
+    "na": "Int32",  # 32
+    "w1mag": np.float32,  # 35
+    "w1flg": "Int32",  # 37
+    "w2mag": np.float32,  # 39
+    "w2flg": "Int32",  # 41
+    "w1k": np.float32,  # 96
+    "w1mJDmean": np.float64,  # 101
+    "w2k": np.float32,  # 107
+    "w2mJDmean": np.float64,  # 112
+    # "cc_flags": str,
+    "w1ab_map": "Int32",
+    "w2ab_map": "Int32",
+    "unwise_objid": str,
+}
+
+
+# =================== catalog readers ===================
+# Readers are module-level generators so they can be sent to worker processes,
+# each of them yields the parsed content of one file as pandas DataFrame(s).
+# Every reader has an ``engine`` argument to use pandas or multi-threaded pyarrow CSV parser
+_READER_ENGINES = ["pandas", "pyarrow"]
+
+
+def _check_engine(engine: str):
+    """
+    Check if the CSV parser engine is supported and available
+    """
+    if engine not in _READER_ENGINES:
+        raise ValueError(
+            f"Unknown engine '{engine}', only {_READER_ENGINES} are supported"
+        )
+    if engine == "pyarrow" and importlib.util.find_spec("pyarrow") is None:
+        raise ImportError("Package pyarrow is required to use engine='pyarrow'")
+
+
+def _arrow_type(dtype):
+    """
+    Turn a dtype in the dtype dictionaries in this module to pyarrow type
+    """
+    import pyarrow as pa
+
+    if dtype == "Int32":
+        return pa.int32()
+    elif dtype is str:
+        return pa.string()
+    else:
+        return pa.from_numpy_dtype(dtype)
+
+
+def _arrow_to_pandas(table):
+    """
+    Turn a pyarrow Table to pandas DataFrame with the same dtypes as pandas engine
+    """
+    import pyarrow as pa
+
+    # nullable integer in the dtype dictionaries are pandas "Int32"
+    return table.to_pandas(types_mapper={pa.int32(): pd.Int32Dtype()}.get)
+
+
+def _read_csv_arrow(
+    source,
+    dtypes: dict | None = None,
+    column_indices: list[int] | None = None,
+    delimiter: str = ",",
+    skip_rows: int = 0,
+    null_values: list[str] | None = None,
+    strip_columns: list[str] | None = None,
+    batch_size: int | None = None,
+):
+    """
+    Read CSV with multi-threaded pyarrow parser and yield pandas DataFrame(s)
+
+    Parameters
+    ----------
+    source : Path or file-like
+        CSV file, compression is inferred from file extension
+    dtypes : dict, optional
+        Dictionary of column names to dtypes in this module, types are inferred if None
+    column_indices : list[int], optional
+        If given, the file has no header and these are the indices of the columns in ``dtypes``
+    delimiter : str, optional (default=",")
+        Delimiter of the file
+    skip_rows : int, optional (default=0)
+        Number of rows to skip at the beginning of the file
+    null_values : list[str], optional
+        Strings to be treated as null, pyarrow default if None
+    strip_columns : list[str], optional
+        Columns to remove leading and trailing whitespaces
+    batch_size : int, optional
+        If given, the file is streamed and every DataFrame has about ``batch_size`` rows
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from pyarrow import csv
+
+    read_options = csv.ReadOptions(
+        use_threads=True,
+        skip_rows=skip_rows,
+        autogenerate_column_names=column_indices is not None,
+    )
+    convert_options = csv.ConvertOptions(strings_can_be_null=True)
+    if null_values is not None:
+        convert_options.null_values = null_values
+    if dtypes is not None:
+        if column_indices is not None:
+            # pyarrow names columns as f0, f1, ... in files without header
+            arrow_names = [f"f{i}" for i in column_indices]
+        else:
+            arrow_names = list(dtypes.keys())
+        convert_options.include_columns = arrow_names
+        convert_options.column_types = {
+            name: _arrow_type(dtype) for name, dtype in zip(arrow_names, dtypes.values())
+        }
+    parse_options = csv.ParseOptions(delimiter=delimiter)
+
+    def to_pandas(table):
+        if dtypes is not None:
+            table = table.rename_columns(list(dtypes.keys()))
+        for name in strip_columns or []:
+            idx = table.schema.get_field_index(name)
+            table = table.set_column(
+                idx, name, pc.utf8_trim_whitespace(table.column(idx))
+            )
+        return _arrow_to_pandas(table)
+
+    if batch_size is None:
+        yield to_pandas(
+            csv.read_csv(
+                source,
+                read_options=read_options,
+                parse_options=parse_options,
+                convert_options=convert_options,
+            )
+        )
+        return
+
+    batches, n_rows = [], 0
+    with csv.open_csv(
+        source,
+        read_options=read_options,
+        parse_options=parse_options,
+        convert_options=convert_options,
+    ) as stream:
+        for batch in stream:
+            batches.append(batch)
+            n_rows += batch.num_rows
+            if n_rows >= batch_size:
+                yield to_pandas(pa.Table.from_batches(batches))
+                batches, n_rows = [], 0
+    if n_rows > 0:
+        yield to_pandas(pa.Table.from_batches(batches))
+
+
+def _read_best_neighbour(path: Path, engine: str = "pandas"):
+    if engine == "pyarrow":
+        yield from _read_csv_arrow(path)
+        return
+    yield pd.read_csv(path, header=0, sep=",")
+
+
+def _read_gaia_source(path: Path, engine: str = "pandas"):
+    if engine == "pyarrow":
+        # 1000 lines of comments before header
+        yield from _read_csv_arrow(path, _GAIA_SOURCE_DTYPES, skip_rows=1000)
+        return
+    yield pd.read_csv(
+        path,
+        header=1,
+        sep=",",
+        skiprows=999,
+        usecols=_GAIA_SOURCE_DTYPES.keys(),
+        dtype=_GAIA_SOURCE_DTYPES,
+    )
+
+
+def _read_gaia_astrophysical_parameters(path: Path, engine: str = "pandas"):
+    if engine == "pyarrow":
+        # 1541 lines of comments before header
+        yield from _read_csv_arrow(path, _GAIA_ASTROPHYSICAL_DTYPES, skip_rows=1541)
+        return
+    yield pd.read_csv(
+        path,
+        header=1,
+        sep=",",
+        skiprows=1540,
+        usecols=_GAIA_ASTROPHYSICAL_DTYPES.keys(),
+        dtype=_GAIA_ASTROPHYSICAL_DTYPES,
+    )
+
+
+# number of rows per batch when streaming the 2MASS and allwise dumps
+_STREAMING_BATCH_SIZE = 500_000
+
+
+def _read_tmass(
+    path: Path, batch_size: int = _STREAMING_BATCH_SIZE, engine: str = "pandas"
+):
+    # types need to be fixed since every batch is parsed separately,
+    # numbers are kept in double precision to be stored exactly as in the files
+    dtypes = {k: str if v is str else np.float64 for k, v in _TMASS_DTYPES.items()}
+    if engine == "pyarrow":
+        yield from _read_csv_arrow(
+            path,
+            dtypes,
+            column_indices=[_TMASS_ALLCOL.index(i) for i in dtypes.keys()],
+            delimiter="|",
+            null_values=["\\N"],
+            strip_columns=["designation"],
+            batch_size=batch_size,
+        )
+        return
+    yield from pd.read_csv(
+        path,
+        header=None,
+        sep="|",
+        usecols=[_TMASS_ALLCOL.index(i) for i in dtypes.keys()],
+        names=dtypes.keys(),
+        dtype={k: v for k, v in dtypes.items() if k != "designation"},
+        # turn null to proper NaN
+        na_values=["\\N"],
+        # dont allow white space in names since gaia best neightbour do not have white space
+        converters={"designation": str.strip},
+        chunksize=batch_size,
+    )
+
+
+def _read_allwise(
+    path: Path, batch_size: int = _STREAMING_BATCH_SIZE, engine: str = "pandas"
+):
+    if engine == "pyarrow":
+        yield from _read_csv_arrow(
+            path,
+            _ALLWISE_DTYPES,
+            column_indices=[_ALLWISE_ALLCOL.index(i) for i in _ALLWISE_DTYPES.keys()],
+            delimiter="|",
+            batch_size=batch_size,
+        )
+        return
+    yield from pd.read_csv(
+        path,
+        header=None,
+        sep="|",
+        usecols=[_ALLWISE_ALLCOL.index(i) for i in _ALLWISE_DTYPES.keys()],
+        names=_ALLWISE_DTYPES.keys(),
+        dtype=_ALLWISE_DTYPES,
+        chunksize=batch_size,
+    )
+
+
+def _catwise_to_csv(path: Path) -> io.BytesIO:
+    """
+    Turn a catwise IPAC table to single space delimited CSV without header which pyarrow can read
+    """
+    with gzip.open(path, "rb") as f:
+        content = f.read()
+    # skip header lines which start with "\" or "|"
+    pos = 0
+    while content[pos : pos + 1] in (b"\\", b"|"):
+        pos = content.index(b"\n", pos) + 1
+    # columns are separated by variable number of spaces, remove leading spaces and repeated spaces
+    # then trailing spaces. Done with numpy since regular expression is too slow for files this large
+    content = np.frombuffer(content, dtype=np.uint8, offset=pos)
+    space = content == ord(" ")
+    after_space = np.ones_like(space)
+    after_space[1:] = space[:-1] | (content[:-1] == ord("\n"))
+    content = content[~(space & after_space)]
+    before_newline = np.ones(len(content), dtype=bool)
+    before_newline[:-1] = content[1:] == ord("\n")
+    content = content[~((content == ord(" ")) & before_newline)]
+    return io.BytesIO(content.tobytes())
+
+
+def _read_catwise(path: Path, engine: str = "pandas"):
+    if engine == "pyarrow":
+        for data in _read_csv_arrow(
+            _catwise_to_csv(path),
+            _CATWISE_DTYPES,
+            column_indices=[_CATWISE_ALLCOL.index(i) for i in _CATWISE_DTYPES.keys()],
+            delimiter=" ",
+        ):
+            # HEALPix level 12 index to be used as positional key like the one in Gaia source_id
+            data["healpix12"] = radec_to_healpix(data["ra"], data["dec"], level=12)
+            yield data
+        return
+    try:
+        data = pd.read_table(
+            path,
+            sep=r"\s+",
+            skiprows=19,
+            usecols=[_CATWISE_ALLCOL.index(i) for i in _CATWISE_DTYPES.keys()],
+            names=_CATWISE_DTYPES.keys(),
+            dtype=_CATWISE_DTYPES,
+        )
+    except ValueError:  # sometimes there are 20 rows of comments
+        data = pd.read_table(
+            path,
+            sep=r"\s+",
+            skiprows=20,
+            usecols=[_CATWISE_ALLCOL.index(i) for i in _CATWISE_DTYPES.keys()],
+            names=_CATWISE_DTYPES.keys(),
+            dtype=_CATWISE_DTYPES,
+        )
+    data["healpix12"] = radec_to_healpix(data["ra"], data["dec"], level=12)
+    yield data
+
+
+# =================== parallel ingest engine ===================
+def _ingest_worker(reader, file_paths: list[Path], queue):
+    """
+    Worker process to parse files with ``reader`` and put the batches into ``queue``
+
+    Files are parsed in the order given, every file starts with its checksum and is followed by
+    an end-of-file marker so the writer knows when to move on to the next worker
+    """
+    for path in file_paths:
+        try:
+            queue.put(("begin", _file_checksum(path)))
+            for batch in reader(path):
+                queue.put(("batch", batch))
+        except Exception:
+            queue.put(("error", traceback.format_exc()))
+            return
+        queue.put(("eof", None))
+
+
+def _file_checksum(path: Path, block_size: int = 2**24) -> str:
+    """
+    MD5 checksum of a file, the same as the ``_MD5SUM.txt`` provided by Gaia archive
+    """
+    md5 = hashlib.md5()
+    with open(path, "rb") as f:
+        while block := f.read(block_size):
+            md5.update(block)
+    return md5.hexdigest()
+
+
+def _get_from_worker(queue, process):
+    """
+    Blocking get from a worker's queue which fails loudly if the worker died (e.g., killed for using too much memory)
+    """
+    while True:
+        try:
+            return queue.get(timeout=1)
+        except Empty:
+            if not process.is_alive():
+                try:  # in case the worker put something right before exiting
+                    return queue.get(timeout=1)
+                except Empty:
+                    raise RuntimeError(
+                        f"Ingest worker {process.name} exited unexpectedly with exit code {process.exitcode}"
+                    ) from None
+
+
+def _iter_parsed_files(
+    file_paths: list[Path], reader, n_workers: int = 1, queue_depth: int = 4
+):
+    """
+    Parse files with ``reader`` and yield ``(path, checksum, batches)`` in the same order as ``file_paths``
+
+    ``batches`` is an iterator of pandas DataFrame for that file and must be exhausted before
+    moving on to the next file. If ``n_workers > 1``, files are distributed round-robin to
+    ``n_workers`` worker processes, each has its own bounded queue of at most ``queue_depth``
+    batches so memory usage stays flat even if the writer is slower than the workers.
+
+    Parameters
+    ----------
+    file_paths : list[Path]
+        List of files to parse
+    reader : callable
+        Module-level generator function (or a ``functools.partial`` of it) which yields pandas DataFrame(s) given a file path
+    n_workers : int, optional (default=1)
+        Number of worker processes to parse files, 1 means parsing files in the current process
+    queue_depth : int, optional (default=4)
+        Maximum number of parsed batches waiting in the queue of each worker
+    """
+    n_workers = min(n_workers, len(file_paths))
+    if n_workers <= 1:
+        for path in file_paths:
+            yield path, _file_checksum(path), reader(path)
+        return
+
+    ctx = multiprocessing.get_context()
+    queues = [ctx.Queue(maxsize=queue_depth) for _ in range(n_workers)]
+    workers = [
+        ctx.Process(
+            target=_ingest_worker,
+            args=(reader, file_paths[i::n_workers], queues[i]),
+            name=f"mygaiadb-ingest-{i}",
+            daemon=True,
+        )
+        for i in range(n_workers)
+    ]
+    for worker in workers:
+        worker.start()
+
+    def batches_from_worker(path, queue, process):
+        while True:
+            kind, payload = _get_from_worker(queue, process)
+            if kind == "batch":
+                yield payload
+            elif kind == "eof":
+                return
+            else:
+                raise RuntimeError(f"Failed to parse {path}\n{payload}")
+
+    try:
+        for idx, path in enumerate(file_paths):
+            queue, worker = queues[idx % n_workers], workers[idx % n_workers]
+            kind, payload = _get_from_worker(queue, worker)
+            if kind != "begin":
+                raise RuntimeError(f"Failed to parse {path}\n{payload}")
+            yield path, payload, batches_from_worker(path, queue, worker)
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+        for queue in queues:
+            queue.close()
+
+
+# =================== SQLite settings for compiling ===================
+# settings to bulk ingest catalogs, durability is traded for speed so a crash in the middle of
+# writing a file may corrupt the database. page_size only takes effect if set before the first table is created
+_BULK_LOAD_PRAGMAS = {
+    "page_size": 4096,
+    "journal_mode": "OFF",
+    "synchronous": "OFF",
+    "cache_size": -2097152,  # negative means KiB, i.e. 2GiB
+    "locking_mode": "EXCLUSIVE",
+    "temp_store": "MEMORY",
+}
+
+# settings to restore after bulk ingest for a database which will only be read afterward
+_SAFE_PRAGMAS = {
+    "journal_mode": "DELETE",
+    "synchronous": "FULL",
+    "locking_mode": "NORMAL",
+    "temp_store": "DEFAULT",
+}
+
+
+def _connect_for_compile(db_path: Path, bulk_load: bool = True) -> sqlite3.Connection:
+    """
+    Open a connection in autocommit mode (transactions are managed explicitly) to compile a database
+
+    Parameters
+    ----------
+    db_path : Path
+        Path to the database
+    bulk_load : bool, optional (default=True)
+        Whether to use the bulk ingest settings in ``_BULK_LOAD_PRAGMAS``
+    """
+    Path(db_path).touch()
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    if bulk_load:
+        for key, value in _BULK_LOAD_PRAGMAS.items():
+            conn.execute(f"PRAGMA {key} = {value}")
+    return conn
+
+
+def _close_after_compile(conn: sqlite3.Connection, bulk_load: bool = True):
+    """
+    Switch a database back to safe settings after compiling and close the connection
+    """
+    if bulk_load:
+        for key, value in _SAFE_PRAGMAS.items():
+            conn.execute(f"PRAGMA {key} = {value}")
+        # exclusive lock is only released when the database is accessed again
+        conn.execute("SELECT count(*) FROM sqlite_schema").fetchall()
+    conn.close()
+
+
+def _execute_schema(conn: sqlite3.Connection, schema: str):
+    """
+    Create table with a schema file in ``data/sql_schema`` if the table does not exist yet
+    """
+    schema_filename = mygaiadb_path.joinpath("data", "sql_schema", schema)
+    with open(schema_filename) as f:
+        lines = f.read().replace("\n", "")
+    conn.execute(lines.replace("CREATE TABLE ", "CREATE TABLE IF NOT EXISTS ", 1))
+
+
+# =================== ingest manifest ===================
+# every compiled database keeps a record of ingested files so compiling can be resumed
+_MANIFEST_TABLE = "mygaiadb_ingest_manifest"
+
+
+def _create_manifest(conn: sqlite3.Connection):
+    conn.execute(
+        f"""CREATE TABLE IF NOT EXISTS {_MANIFEST_TABLE} (
+            table_name varchar,
+            file_name varchar,
+            file_size bigint,
+            checksum character(32),
+            row_count bigint,
+            first_rowid bigint,
+            committed_at varchar,
+            PRIMARY KEY (table_name, file_name)
+        );"""
+    )
+
+
+def _rollback_partial_ingest(conn: sqlite3.Connection, table_name: str):
+    """
+    Remove rows from files which were not completely ingested (e.g., compiling crashed)
+
+    Files are written one after another by a single writer, so rows of an unfinished file
+    are the ones with rowid larger than or equal to the first rowid recorded for that file
+    """
+    partial = conn.execute(
+        f"SELECT file_name, first_rowid FROM {_MANIFEST_TABLE} WHERE table_name = ? AND committed_at IS NULL",
+        (table_name,),
+    ).fetchall()
+    if len(partial) == 0:
+        return
+    print(
+        f"Rolling back partially ingested file(s) in {table_name}: {', '.join(i[0] for i in partial)}"
+    )
+    conn.execute("BEGIN")
+    conn.execute(
+        f"DELETE FROM {table_name} WHERE rowid >= ?",
+        (min(i[1] for i in partial),),
+    )
+    conn.execute(
+        f"DELETE FROM {_MANIFEST_TABLE} WHERE table_name = ? AND committed_at IS NULL",
+        (table_name,),
+    )
+    conn.execute("COMMIT")
+
+
+def _files_to_ingest(
+    conn: sqlite3.Connection, table_name: str, file_paths: list[Path]
+) -> list[Path]:
+    """
+    Get the files which are not ingested yet according to the manifest, files are identified by name and size
+    """
+    ingested = dict(
+        conn.execute(
+            f"SELECT file_name, file_size FROM {_MANIFEST_TABLE} WHERE table_name = ? AND committed_at IS NOT NULL",
+            (table_name,),
+        ).fetchall()
+    )
+    if (
+        len(ingested) == 0
+        and conn.execute(f"SELECT 1 FROM {table_name} LIMIT 1").fetchone() is not None
+    ):
+        raise FileExistsError(
+            f"Table {table_name} already has rows but no ingest manifest, it was probably compiled by an older version of MyGaiaDB. Please delete the database to compile it again."
+        )
+    remaining = []
+    for path in file_paths:
+        if path.name not in ingested:
+            remaining.append(path)
+        elif ingested[path.name] != path.stat().st_size:
+            raise ValueError(
+                f"{path} has changed since it was ingested into {table_name}. Please delete the database to compile it again."
+            )
+    if len(remaining) < len(file_paths):
+        print(
+            f"Skipping {len(file_paths) - len(remaining)} file(s) already ingested into {table_name}"
+        )
+    return remaining
+
+
+def _dataframe_to_rows(data: pd.DataFrame):
+    """
+    Turn a pandas DataFrame into an iterator of row tuples which sqlite3 can bind, missing values are turned into None
+    """
+    columns = []
+    for name in data.columns:
+        col = data[name]
+        if isinstance(col.dtype, pd.api.extensions.ExtensionDtype):
+            # nullable types like "Int32" use pd.NA which sqlite3 does not understand
+            columns.append(col.astype(object).where(col.notna(), None).tolist())
+        else:
+            # NaN in float or object columns will be stored as NULL by sqlite
+            columns.append(col.tolist())
+    return zip(*columns)
+
+
+def _insert_dataframe(conn: sqlite3.Connection, table_name: str, data: pd.DataFrame):
+    """
+    Insert a pandas DataFrame to a table with ``executemany``, transaction needs to be managed by the caller
+    """
+    columns = ", ".join(f'"{i}"' for i in data.columns)
+    placeholders = ", ".join(["?"] * len(data.columns))
+    conn.executemany(
+        f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})",
+        _dataframe_to_rows(data),
+    )
+
+
+def _ingest_files(
+    conn: sqlite3.Connection,
+    table_name: str,
+    file_paths: list[Path],
+    reader,
+    n_workers: int = 1,
+    queue_depth: int = 4,
+) -> dict:
+    """
+    Ingest files into a SQLite table, parsing is done by ``n_workers`` processes while
+    the current process is the only writer to the database. Each file is inserted in one transaction
+    and recorded in the ingest manifest, so files which are already ingested will be skipped and
+    files which were partially ingested will be rolled back and ingested again.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to the database in autocommit mode
+    table_name : str
+        Name of the table to append to
+    file_paths : list[Path]
+        List of files to ingest
+    reader : callable
+        Module-level generator function (or a ``functools.partial`` of it) which yields pandas DataFrame(s) given a file path
+    n_workers : int, optional (default=1)
+        Number of worker processes to parse files
+    queue_depth : int, optional (default=4)
+        Maximum number of parsed batches waiting in the queue of each worker
+
+    Returns
+    -------
+    stats: dict
+        Number of rows ingested, time taken in seconds and ingest rate in rows per second
+    """
+    _create_manifest(conn)
+    _rollback_partial_ingest(conn, table_name)
+    file_paths = _files_to_ingest(conn, table_name, file_paths)
+
+    total_rows = 0
+    start_time = time.perf_counter()
+    with contextlib.closing(
+        _iter_parsed_files(file_paths, reader, n_workers, queue_depth)
+    ) as parsed_files:
+        pbar = tqdm.tqdm(parsed_files, total=len(file_paths), desc=table_name)
+        for path, checksum, batches in pbar:
+            # mark the file as in progress before writing any row
+            first_rowid = conn.execute(
+                f"SELECT IFNULL(MAX(rowid), 0) + 1 FROM {table_name}"
+            ).fetchone()[0]
+            conn.execute(
+                f"INSERT OR REPLACE INTO {_MANIFEST_TABLE} (table_name, file_name, file_size, checksum, first_rowid) VALUES (?, ?, ?, ?, ?)",
+                (table_name, path.name, path.stat().st_size, checksum, first_rowid),
+            )
+            conn.execute("BEGIN")
+            try:
+                file_rows = 0
+                for data in batches:
+                    _insert_dataframe(conn, table_name, data)
+                    file_rows += len(data)
+                conn.execute(
+                    f"UPDATE {_MANIFEST_TABLE} SET row_count = ?, committed_at = ? WHERE table_name = ? AND file_name = ?",
+                    (
+                        file_rows,
+                        datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                        table_name,
+                        path.name,
+                    ),
+                )
+                conn.execute("COMMIT")
+                total_rows += file_rows
+            except BaseException:
+                # only effective if journaling is on, see _BULK_LOAD_PRAGMAS
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            elapsed = time.perf_counter() - start_time
+            pbar.set_postfix_str(f"{total_rows / elapsed:,.0f} rows/s")
+    elapsed = time.perf_counter() - start_time
+    stats = {
+        "rows": total_rows,
+        "seconds": elapsed,
+        "rows_per_second": total_rows / elapsed if elapsed > 0 else 0.0,
+    }
+    print(
+        f"Ingested {total_rows:,} rows into {table_name} in {elapsed:.1f}s ({stats['rows_per_second']:,.0f} rows/s)"
+    )
+    return stats
+
+
+# =================== indexing ===================
+# indexes of every database, databases are separate files so they can be indexed at the same time
+_SQL_INDEXES = {
+    "gaia": [
+        """CREATE INDEX IF NOT EXISTS allwise_best_neighbour_sourceid_designation ON allwise_best_neighbour (source_id, original_ext_source_id);""",
+        """CREATE INDEX IF NOT EXISTS tmasspscxsc_best_neighbour_sourceid_designation ON tmasspscxsc_best_neighbour (source_id, original_ext_source_id);""",
+    ],
+    "tmass": [
+        # 9m46s
+        """CREATE INDEX IF NOT EXISTS twomass_psc_designation_mags ON twomass_psc (designation, j_m, h_m, k_m);""",
+    ],
+    "allwise": [
+        # 22m56s
+        """CREATE INDEX IF NOT EXISTS allwise_designation_mags ON allwise (designation, w1mpro, w2mpro, w3mpro, w4mpro, w1snr, w2snr, w3snr, w4snr, ph_qual);""",
+    ],
+    "catwise": [
+        # unwise_objid is primary key so it is indexed already, this covers commonly used columns
+        """CREATE INDEX IF NOT EXISTS catwise_unwiseobjid_mags ON catwise (unwise_objid, w1mpro, w2mpro, w1snr, w2snr);""",
+        """CREATE INDEX IF NOT EXISTS catwise_healpix12 ON catwise (healpix12);""",
+    ],
+}
+# names of paths in mygaiadb of SQL databases, paths are only resolved when needed
+_SQL_DB_PATHS = {
+    "gaia": "gaia_sql_db_path",
+    "tmass": "tmass_sql_db_path",
+    "allwise": "allwise_sql_db_path",
+    "catwise": "catwise_sql_db_path",
+}
+
+
+def _sql_db_path(database: str) -> Path:
+    """
+    Path of a SQL database
+    """
+    return getattr(mygaiadb, _SQL_DB_PATHS[database])
+
+
+def _create_indexes(conn: sqlite3.Connection, database: str):
+    """
+    Create all indexes of a database in ``_SQL_INDEXES``
+    """
+    for statement in _SQL_INDEXES[database]:
+        index_name = statement.split(" ON ")[0].split()[-1]
+        print(f"Start doing {index_name} indexing")
+        conn.execute(statement)
 
-        file_names_wo_ext = i_path.name[:-7]
-        with h5py.File(root_path.joinpath(f"{file_names_wo_ext}.h5"), "w") as f:
-            f.create_dataset("source_id", data=file_path_f["source_id"].data)
-            f.create_dataset("solution_id", data=file_path_f["solution_id"].data)
-            f.create_dataset("ra", data=file_path_f["ra"].data)
-            f.create_dataset("dec", data=file_path_f["dec"].data)
-            f.create_dataset("flux", data=flux)
-            f.create_dataset("flux_error", data=flux_error)
+
+def _add_catwise_healpix12(conn: sqlite3.Connection, batch_size: int = 1_000_000):
+    """
+    Add healpix12 column to catwise table compiled by older version and fill it in batches
+    """
+    columns = [i[1] for i in conn.execute("PRAGMA table_info(catwise)").fetchall()]
+    if "healpix12" in columns:
+        return
+    print("Adding healpix12 column to catwise table")
+    conn.execute("ALTER TABLE catwise ADD COLUMN healpix12 bigint")
+    last_rowid = 0
+    while True:
+        rows = conn.execute(
+            "SELECT rowid, ra, dec FROM catwise WHERE rowid > ? ORDER BY rowid LIMIT ?",
+            (last_rowid, batch_size),
+        ).fetchall()
+        if len(rows) == 0:
+            break
+        rowid, ra, dec = np.array(rows, dtype=np.float64).T
+        rowid = rowid.astype(np.int64)
+        conn.execute("BEGIN")
+        conn.executemany(
+            "UPDATE catwise SET healpix12 = ? WHERE rowid = ?",
+            zip(radec_to_healpix(ra, dec, level=12).tolist(), rowid.tolist()),
+        )
+        conn.execute("COMMIT")
+        last_rowid = int(rowid[-1])
+
+
+def _index_database(database: str, bulk_load: bool = True, threads: int = 4):
+    """
+    Create indexes of a compiled database with its own connection, so it can run in a thread
+    """
+    db_path = _sql_db_path(database)
+    # databases are set to read-only when loaded by LocalGaiaSQL
+    mode = db_path.stat().st_mode
+    db_path.chmod(mode | stat.S_IWUSR)
+    try:
+        conn = _connect_for_compile(db_path, bulk_load=bulk_load)
+        # allow SQLite to sort with multiple threads when creating indexes
+        conn.execute(f"PRAGMA threads = {threads}")
+        if database == "catwise":
+            _add_catwise_healpix12(conn)
+        _create_indexes(conn, database)
+        _close_after_compile(conn, bulk_load=bulk_load)
+    finally:
+        db_path.chmod(mode)
+
+
+def compile_sql_indexes(
+    databases: list[str] | None = None,
+    n_workers: int = 4,
+    threads: int = 4,
+    bulk_load: bool = True,
+):
+    """
+    Create indexes of compiled SQL databases, every database is indexed in its own thread at the same time.
+    This is useful if SQL databases were compiled with ``indexing=False``
+
+    Parameters
+    ----------
+    databases : list[str], optional (default=None)
+        Databases to index among "gaia", "tmass", "allwise" and "catwise", all compiled databases if None
+    n_workers : int, optional (default=4)
+        Number of databases to index at the same time
+    threads : int, optional (default=4)
+        Number of threads SQLite can use to sort when creating an index in each database
+    bulk_load : bool, optional (default=True)
+        Whether to turn off journaling and syncing during indexing and lock the database exclusively,
+        the database is switched back to safe settings when finished
+    """
+    if databases is None:
+        databases = [i for i in _SQL_DB_PATHS if _sql_db_path(i).exists()]
+    for database in databases:
+        if database not in _SQL_DB_PATHS:
+            raise ValueError(
+                f"Unknown database '{database}', only {list(_SQL_DB_PATHS.keys())} are supported"
+            )
+        if not _sql_db_path(database).exists():
+            raise FileNotFoundError(
+                f"Database does not exist at {_sql_db_path(database)}, please compile it first"
+            )
+    with concurrent.futures.ThreadPoolExecutor(max_workers=n_workers) as executor:
+        futures = [
+            executor.submit(_index_database, database, bulk_load, threads)
+            for database in databases
+        ]
+        for future in futures:
+            future.result()
 
 
 def compile_gaia_sql_db(
     do_gaia_source_table: bool = True,
     do_gaia_astrophysical_table: bool = True,
     indexing: bool = True,
+    n_workers: int = 1,
+    queue_depth: int = 4,
+    bulk_load: bool = True,
+    engine: str = "pandas",
 ):
     """
     This function compile Gaia SQL database
@@ -374,13 +2157,20 @@ def compile_gaia_sql_db(
         Whether to compile astrophysical_parameters table
     indexing : bool, optional (default=True)
         Whether to do SQL indexing on pre-determined columns
+    n_workers : int, optional (default=1)
+        Number of worker processes to decompress and parse files while the current process writes to the database
+    queue_depth : int, optional (default=4)
+        Maximum number of parsed batches waiting to be written per worker, higher means more memory usage
+    bulk_load : bool, optional (default=True)
+        Whether to turn off journaling and syncing during the build and lock the database exclusively,
+        the database is switched back to safe settings when finished
+    engine : str, optional (default="pandas")
+        CSV parser to use, either "pandas" or "pyarrow" (multi-threaded, requires pyarrow installed)
     """
+    _check_engine(engine)
     # The whole script takes about ~24 hours to complete
-    Path(gaia_sql_db_path).touch()
-    conn = sqlite3.connect(gaia_sql_db_path)
-    c = conn.cursor()
+    conn = _connect_for_compile(mygaiadb.gaia_sql_db_path, bulk_load=bulk_load)
 
-    # we have added "grvs_mag" to the table on top of gaia_source_lite on Gaia Archive
     # will take ~11 hours to run
     if do_gaia_source_table:
         # =================== setup Gaia schema and first two tables ===================
@@ -390,192 +2180,58 @@ def compile_gaia_sql_db(
             "allwise_best_neighbour_schema.sql",
             "tmasspscxsc_best_neighbour_schema.sql",
         ]:
-            schema_filename = mygaiadb_path.joinpath("data", "sql_schema", f"{schema}")
-
-            with open(schema_filename) as f:
-                lines = f.read().replace("\n", "")
-            c.execute(lines)
+            _execute_schema(conn, schema)
 
         for name, table_name in zip(
-            [_GAIA_DR3_ALLWISE_NEIGHBOUR_PARENT, _GAIA_DR3_2MASS_NEIGHBOUR_PARENT],
+            [mygaiadb.data._GAIA_DR3_ALLWISE_NEIGHBOUR_PARENT, mygaiadb.data._GAIA_DR3_2MASS_NEIGHBOUR_PARENT],
             ["allwise_best_neighbour", "tmasspscxsc_best_neighbour"],
         ):
-            for p in tqdm.tqdm(list(name.glob("*.csv.gz"))):
-                # load the data into a Pandas DataFrame
-                data = pd.read_csv(p, header=0, sep=",")
-                # write the data to a sqlite table
-                data.to_sql(f"{table_name}", conn, if_exists="append", index=False)
+            _ingest_files(
+                conn,
+                table_name,
+                list(name.glob("*.csv.gz")),
+                partial(_read_best_neighbour, engine=engine),
+                n_workers=n_workers,
+                queue_depth=queue_depth,
+            )
 
         # =================== populate gaia_source lite table ===================
-        # use "Int32" type for int columns with NaN
-        for p in tqdm.tqdm(list(_GAIA_DR3_GAIASOURCE_PARENT.glob("*.csv.gz"))):
-            dtypes = {
-                "source_id": np.int64,
-                "random_index": np.int64,
-                "ra": np.float64,
-                "ra_error": np.float64,
-                "dec": np.float64,
-                "dec_error": np.float64,
-                "parallax": np.float64,
-                "parallax_error": np.float64,
-                "parallax_over_error": np.float32,
-                "pmra": np.float64,
-                "pmra_error": np.float64,
-                "pmdec": np.float64,
-                "pmdec_error": np.float64,
-                "ra_dec_corr": np.float32,
-                "ra_parallax_corr": np.float32,
-                "ra_pmra_corr": np.float32,
-                "ra_pmdec_corr": np.float32,
-                "dec_parallax_corr": np.float32,
-                "dec_pmra_corr": np.float32,
-                "dec_pmdec_corr": np.float32,
-                "parallax_pmra_corr": np.float32,
-                "parallax_pmdec_corr": np.float32,
-                "pmra_pmdec_corr": np.float32,
-                "astrometric_params_solved": "Int32",
-                "nu_eff_used_in_astrometry": np.float32,
-                "pseudocolour": np.float64,
-                "pseudocolour_error": np.float64,
-                "astrometric_matched_transits": "Int32",
-                "ipd_gof_harmonic_amplitude": np.float32,
-                "ipd_frac_multi_peak": "Int32",
-                "ipd_frac_odd_win": "Int32",
-                "ruwe": np.float32,
-                "phot_g_mean_flux": np.float64,
-                "phot_g_mean_flux_over_error": np.float32,
-                "phot_g_mean_mag": np.float32,
-                "phot_bp_mean_flux": np.float64,
-                "phot_bp_mean_flux_over_error": np.float32,
-                "phot_bp_mean_mag": np.float32,
-                "phot_rp_mean_flux": np.float64,
-                "phot_rp_mean_flux_over_error": np.float32,
-                "phot_rp_mean_mag": np.float32,
-                "phot_bp_rp_excess_factor": np.float32,
-                "bp_rp": np.float32,
-                "radial_velocity": np.float64,
-                "radial_velocity_error": np.float64,
-                "rv_nb_transits": "Int32",
-                "rv_expected_sig_to_noise": np.float32,
-                "rv_renormalised_gof": np.float32,
-                "rv_chisq_pvalue": np.float32,
-                "rvs_spec_sig_to_noise": np.float32,
-                "grvs_mag": np.float32,
-                "l": np.float64,
-                "b": np.float64,
-                "has_xp_continuous": bool,
-                "has_xp_sampled": bool,
-                "has_rvs": bool,
-            }
-            data = pd.read_csv(
-                p, header=1, sep=",", skiprows=999, usecols=dtypes.keys(), dtype=dtypes
-            )
-            # write the data to a sqlite table
-            data.to_sql("gaia_source", conn, if_exists="append", index=False)
+        _ingest_files(
+            conn,
+            "gaia_source",
+            list(mygaiadb.data._GAIA_DR3_GAIASOURCE_PARENT.glob("*.csv.gz")),
+            partial(_read_gaia_source, engine=engine),
+            n_workers=n_workers,
+            queue_depth=queue_depth,
+        )
 
     if do_gaia_astrophysical_table:
-        schema_filename = mygaiadb_path.joinpath(
-            "data", "sql_schema", "astrophysical_parameters_lite_schema.sql"
+        _execute_schema(conn, "astrophysical_parameters_lite_schema.sql")
+        # =================== populate astrophysical_parameters lite table ===================
+        _ingest_files(
+            conn,
+            "astrophysical_parameters",
+            list(mygaiadb.data._GAIA_DR3_ASTROPHYS_PARENT.glob("*.csv.gz")),
+            partial(_read_gaia_astrophysical_parameters, engine=engine),
+            n_workers=n_workers,
+            queue_depth=queue_depth,
         )
 
-        with open(schema_filename) as f:
-            lines = f.read().replace("\n", "")
-        c.execute(lines)
-        # =================== populate gaia_source lite table ===================
-        # we have added "grvs_mag" to the table on top of gaia_source_lite on Gaia Archive
-        # will take ~11 hours to run
-
-        for p in tqdm.tqdm(list(_GAIA_DR3_ASTROPHYS_PARENT.glob("*.csv.gz"))):
-            dtypes = {
-                "source_id": np.int64,
-                "classprob_dsc_combmod_quasar": np.float32,
-                "classprob_dsc_combmod_galaxy": np.float32,
-                "classprob_dsc_combmod_star": np.float32,
-                "classprob_dsc_combmod_whitedwarf": np.float32,
-                "classprob_dsc_combmod_binarystar": np.float32,
-                "classprob_dsc_specmod_quasar": np.float32,
-                "classprob_dsc_specmod_galaxy": np.float32,
-                "classprob_dsc_specmod_star": np.float32,
-                "classprob_dsc_specmod_whitedwarf": np.float32,
-                "classprob_dsc_specmod_binarystar": np.float32,
-                "classprob_dsc_allosmod_quasar": np.float32,
-                "classprob_dsc_allosmod_galaxy": np.float32,
-                "classprob_dsc_allosmod_star": np.float32,
-                "teff_gspphot": np.float32,
-                "teff_gspphot_lower": np.float32,
-                "teff_gspphot_upper": np.float32,
-                "logg_gspphot": np.float32,
-                "logg_gspphot_lower": np.float32,
-                "logg_gspphot_upper": np.float32,
-                "mh_gspphot": np.float32,
-                "mh_gspphot_lower": np.float32,
-                "mh_gspphot_upper": np.float32,
-                "distance_gspphot": np.float32,
-                "distance_gspphot_lower": np.float32,
-                "distance_gspphot_upper": np.float32,
-                "azero_gspphot": np.float32,
-                "azero_gspphot_lower": np.float32,
-                "azero_gspphot_upper": np.float32,
-                "ag_gspphot": np.float32,
-                "ag_gspphot_lower": np.float32,
-                "ag_gspphot_upper": np.float32,
-                "abp_gspphot": np.float32,
-                "abp_gspphot_lower": np.float32,
-                "abp_gspphot_upper": np.float32,
-                "arp_gspphot": np.float32,
-                "arp_gspphot_lower": np.float32,
-                "arp_gspphot_upper": np.float32,
-                "ebpminrp_gspphot": np.float32,
-                "ebpminrp_gspphot_lower": np.float32,
-                "ebpminrp_gspphot_upper": np.float32,
-                "mg_gspphot": np.float32,
-                "mg_gspphot_lower": np.float32,
-                "mg_gspphot_upper": np.float32,
-                "radius_gspphot": np.float32,
-                "radius_gspphot_lower": np.float32,
-                "radius_gspphot_upper": np.float32,
-                "logposterior_gspphot": np.float32,
-                "mcmcaccept_gspphot": np.float32,
-                "libname_gspphot": str,
-                "teff_gspspec": np.float32,
-                "teff_gspspec_lower": np.float32,
-                "teff_gspspec_upper": np.float32,
-                "logg_gspspec": np.float32,
-                "logg_gspspec_lower": np.float32,
-                "logg_gspspec_upper": np.float32,
-                "mh_gspspec": np.float32,
-                "mh_gspspec_lower": np.float32,
-                "mh_gspspec_upper": np.float32,
-                "alphafe_gspspec": np.float32,
-                "alphafe_gspspec_lower": np.float32,
-                "alphafe_gspspec_upper": np.float32,
-                "flags_gspspec": str,
-                "activityindex_espcs": np.float32,
-                "activityindex_espcs_uncertainty": np.float32,
-                "activityindex_espcs_input": str,
-            }
-            data = pd.read_csv(
-                p, header=1, sep=",", skiprows=1540, usecols=dtypes.keys(), dtype=dtypes
-            )
-            # write the data to a sqlite table
-            data.to_sql(
-                "astrophysical_parameters", conn, if_exists="append", index=False
-            )
-
     # =================== indexing ===================
     if indexing:
         print("=================== indexing ===================")
-        print("Start doing allwise_best_neighbour_sourceid_designation indexing")
-        c.execute(
-            """CREATE INDEX allwise_best_neighbour_sourceid_designation ON allwise_best_neighbour (source_id, original_ext_source_id);"""
-        )
-        print("Start doing tmasspscxsc_best_neighbour_sourceid_designation indexing")
-        c.execute(
-            """CREATE INDEX tmasspscxsc_best_neighbour_sourceid_designation ON tmasspscxsc_best_neighbour (source_id, original_ext_source_id);"""
-        )
+        _create_indexes(conn, "gaia")
+    _close_after_compile(conn, bulk_load=bulk_load)
 
 
-def compile_tmass_sql_db(indexing: bool = True):
+def compile_tmass_sql_db(
+    indexing: bool = True,
+    n_workers: int = 1,
+    queue_depth: int = 4,
+    bulk_load: bool = True,
+    batch_size: int = _STREAMING_BATCH_SIZE,
+    engine: str = "pandas",
+):
     """
     This function compile 2MASS point source SQL database
 
@@ -583,143 +2239,49 @@ def compile_tmass_sql_db(indexing: bool = True):
     ----------
     indexing : bool, optional (default=True)
         Whether to do SQL indexing on pre-determined columns
+    n_workers : int, optional (default=1)
+        Number of worker processes to decompress and parse files while the current process writes to the database
+    queue_depth : int, optional (default=4)
+        Maximum number of parsed batches waiting to be written per worker, higher means more memory usage
+    bulk_load : bool, optional (default=True)
+        Whether to turn off journaling and syncing during the build and lock the database exclusively,
+        the database is switched back to safe settings when finished
+    batch_size : int, optional (default=500000)
+        Number of rows to parse and insert at a time, files are streamed so memory usage is bounded by
+        ``batch_size`` (times ``queue_depth`` and ``n_workers``) instead of the size of the files
+    engine : str, optional (default="pandas")
+        CSV parser to use, either "pandas" or "pyarrow" (multi-threaded, requires pyarrow installed)
     """
-    Path(tmass_sql_db_path).touch()
-    conn = sqlite3.connect(tmass_sql_db_path)
-    c = conn.cursor()
+    _check_engine(engine)
+    conn = _connect_for_compile(mygaiadb.tmass_sql_db_path, bulk_load=bulk_load)
 
     # =================== 2MASS ===================
     # this section will take 1 hour to run
-    schema_filename = mygaiadb_path.joinpath(
-        "data", "sql_schema", "twomass_psc_lite_schema.sql"
-    )
-
-    with open(schema_filename) as f:
-        lines = f.read().replace("\n", "")
-    c.execute(lines)
-
-    # only the first part, not all actually
-    # https://irsa.ipac.caltech.edu/data/2MASS/docs/releases/allsky/doc/sec2_2a.html
-    tmass_allcol = [
-        "ra",
-        "dec",
-        "err_maj",
-        "err_min",
-        "err_ang",
-        "designation",
-        # Primary Photometric Information
-        "j_m",
-        "j_cmsig",
-        "j_msigcom",
-        "j_snr",
-        "h_m",
-        "h_cmsig",
-        "h_msigcom",
-        "h_snr",
-        "k_m",
-        "k_cmsig",
-        "k_msigcom",
-        "k_snr",
-        # Primary Source Quality Information
-        "ph_qual",
-        "rd_flg",
-        "bl_flg",
-        "cc_flg",
-        "ndet",
-        "prox",
-        "pxpa",
-        "pxcntr",
-        "gal_contam",
-        "mp_flg",
-        # Additional Positional and Identification Information
-        "pts_key/cntr",
-        "hemis",
-        "date",
-        "scan",
-        "glon",
-        "glat",
-        "x_scan",
-        "jdate",
-        # Additional Photometric Information
-        "j_psfchi",
-        "h_psfchi",
-        "k_psfchi" "j_m_stdap",
-        "j_msig_stdap",
-        "h_m_stdap",
-        "h_msig_stdap",
-        "k_m_stdap",
-        "k_msig_stdap",
-        # Additional Source Quality Information
-        "dist_edge_ns",
-        "dist_edge_ew",
-        "dist_edge_flg",
-        "dup_src",
-        "use_src",
-        # Optical Source Association Information
-        "a",
-        "dist_opt",
-        "phi_opt",
-        "b_m_opt",
-        "vr_m_opt",
-        "nopt_mchs",
-        # Cross-Index Information
-        "ext_key",
-        "scan_key",
-        "coadd_key",
-        "coadd",
-    ]
+    _execute_schema(conn, "twomass_psc_lite_schema.sql")
 
-    for p in tqdm.tqdm(list(_2MASS_PARENT.glob("psc_*.gz"))):
-        dtypes = {
-            "ra": np.float64,
-            "dec": np.float64,
-            "designation": str,
-            "j_m": np.float32,
-            "j_cmsig": np.float32,
-            "j_msigcom": np.float32,
-            "j_snr": np.float32,
-            "h_m": np.float32,
-            "h_cmsig": np.float32,
-            "h_msigcom": np.float32,
-            "h_snr": np.float32,
-            "k_m": np.float32,
-            "k_cmsig": np.float32,
-            "k_msigcom": np.float32,
-            "k_snr": np.float32,
-            "ph_qual": str,
-            "rd_flg": str,
-            "bl_flg": str,
-            "cc_flg": str,
-            "ndet": str,
-            "prox": np.float32,
-        }
-        data = pd.read_csv(
-            p,
-            header=None,
-            sep="|",
-            usecols=[tmass_allcol.index(i) for i in dtypes.keys()],
-            names=dtypes.keys(),
-            # turn null to proper NaN
-            na_values=["\\N"],
-            # dont allow white space in names since gaia best neightbour do not have white space
-            converters={"designation": str.strip},
-        )
-        data = data.replace(r"\N", np.nan)
-        data.astype(dtypes)
-
-        # write the data to a sqlite table
-        data.to_sql("twomass_psc", conn, if_exists="append", index=False)
+    _ingest_files(
+        conn,
+        "twomass_psc",
+        list(mygaiadb.data._2MASS_PARENT.glob("psc_*.gz")),
+        partial(_read_tmass, batch_size=batch_size, engine=engine),
+        n_workers=n_workers,
+        queue_depth=queue_depth,
+    )
 
     # =================== indexing ===================
     if indexing:
-        # 9m46s
-        print("Doing Indexing")
-        c.execute(
-            """CREATE INDEX twomass_psc_designation_mags ON twomass_psc (designation, j_m, h_m, k_m);"""
-        )
+        _create_indexes(conn, "tmass")
+    _close_after_compile(conn, bulk_load=bulk_load)
 
 
-def compile_allwise_sql_db(indexing: bool = True):
+def compile_allwise_sql_db(
+    indexing: bool = True,
+    n_workers: int = 1,
+    queue_depth: int = 4,
+    bulk_load: bool = True,
+    batch_size: int = _STREAMING_BATCH_SIZE,
+    engine: str = "pandas",
+):
     """
     This function compile allwise SQL database
 
@@ -727,390 +2289,47 @@ def compile_allwise_sql_db(indexing: bool = True):
     ----------
     indexing : bool, optional (default=True)
         Whether to do SQL indexing on pre-determined columns
+    n_workers : int, optional (default=1)
+        Number of worker processes to decompress and parse files while the current process writes to the database
+    queue_depth : int, optional (default=4)
+        Maximum number of parsed batches waiting to be written per worker, higher means more memory usage
+    bulk_load : bool, optional (default=True)
+        Whether to turn off journaling and syncing during the build and lock the database exclusively,
+        the database is switched back to safe settings when finished
+    batch_size : int, optional (default=500000)
+        Number of rows to parse and insert at a time, files are streamed so memory usage is bounded by
+        ``batch_size`` (times ``queue_depth`` and ``n_workers``) instead of the size of the files
+    engine : str, optional (default="pandas")
+        CSV parser to use, either "pandas" or "pyarrow" (multi-threaded, requires pyarrow installed)
     """
-    Path(allwise_sql_db_path).touch()
-    conn = sqlite3.connect(allwise_sql_db_path)
-    c = conn.cursor()
+    _check_engine(engine)
+    conn = _connect_for_compile(mygaiadb.allwise_sql_db_path, bulk_load=bulk_load)
 
     # this section will take ~16 hours to run
-    schema_filename = mygaiadb_path.joinpath(
-        "data", "sql_schema", "allwise_lite_schema.sql"
-    )
-
-    with open(schema_filename) as f:
-        lines = f.read().replace("\n", "")
-    c.execute(lines)
-
-    # only the first part, not all actually
-    # https://wise2.ipac.caltech.edu/docs/release/allwise/expsup/sec2_1a.html
-    allwise_allcol = [
-        # Basic Position and Identification Information
-        "designation",
-        "ra",
-        "dec",
-        "sigra",
-        "sigdec",
-        "sigradec",
-        "glon",
-        "glat",
-        "elon",
-        "elat",
-        "wx",
-        "wy",
-        "cntr",
-        "source_id",
-        "coadd_id",
-        "src",
-        # Primary Photometric Information
-        "w1mpro",
-        "w1sigmpro",
-        "w1snr",
-        "w1rchi2",
-        "w2mpro",
-        "w2sigmpro",
-        "w2snr",
-        "w2rchi2",
-        "w3mpro",
-        "w3sigmpro",
-        "w3snr",
-        "w3rchi2",
-        "w4mpro",
-        "w4sigmpro",
-        "w4snr",
-        "w4rchi2",
-        "rchi2",
-        "nb",
-        "na",
-        "w1sat",
-        "w2sat",
-        "w3sat",
-        "w4sat",
-        "satnum",
-        # Motion Fit Parameters
-        "ra_pm",
-        "dec_pm",
-        "sigra_pm",
-        "sigdec_pm",
-        "sigradec_pm",
-        "pmra",
-        "sigpmra",
-        "pmdec",
-        "sigpmdec",
-        "w1rchi2_pm",
-        "w2rchi2_pm",
-        "w3rchi2_pm",
-        "w4rchi2_pm",
-        "rchi2_pm",
-        "pmcode",
-        # Measurement Quality and Source Reliability Information
-        "cc_flags",
-        "rel",
-        "ext_flg",
-        "var_flg",
-        "ph_qual",
-        "det_bit",
-        "moon_lev",
-        "w1nm",
-        "w1m",
-        "w2nm",
-        "w2m",
-        "w3nm",
-        "w3m",
-        "w4nm",
-        "w4m",
-        "w1cov",
-        "w2cov",
-        "w3cov",
-        "w4cov",
-        "w1cc_map",
-        "w1cc_map_str",
-        "w2cc_map",
-        "w2cc_map_str",
-        "w3cc_map",
-        "w3cc_map_str",
-        "w4cc_map",
-        "w4cc_map_str",
-        "use_src",
-        "best_use_src",
-        "ngrp",
-        # Additional Photometric Information
-        "w1flux",
-        "w1sigflux",
-        "w1sky",
-        "w1sigsk",
-        "w1conf",
-        "w2flux",
-        "w2sigflux",
-        "w2sky",
-        "w2sigsk",
-        "w2conf",
-        "w3flux",
-        "w3sigflux",
-        "w3sky",
-        "w3sigsk",
-        "w3conf",
-        "w4flux",
-        "w4sigflux",
-        "w4sky",
-        "w4sigsk",
-        "w4conf",
-        "w1mag",
-        "w1sigm",
-        "w1flg",
-        "w1mcor",
-        "w2mag",
-        "w2sigm",
-        "w2flg",
-        "w2mcor",
-        "w3mag",
-        "w3sigm",
-        "w3flg",
-        "w3mcor",
-        "w4mag",
-        "w4sigm",
-        "w4flg",
-        "w4mcor",
-        "w1mag_1",
-        "w1sigm_1",
-        "w1flg_1",
-        "w2mag_1",
-        "w2sigm_1",
-        "w2flg_1",
-        "w3mag_1",
-        "w3sigm_1",
-        "w3flg_1",
-        "w4mag_1",
-        "w4sigm_1",
-        "w4flg_1",
-        "w1mag_2",
-        "w1sigm_2",
-        "w1flg_2",
-        "w2mag_2",
-        "w2sigm_2",
-        "w2flg_2",
-        "w3mag_2",
-        "w3sigm_2",
-        "w3flg_2",
-        "w4mag_2",
-        "w4sigm_2",
-        "w4flg_2",
-        "w1mag_3",
-        "w1sigm_3",
-        "w1flg_3",
-        "w2mag_3",
-        "w2sigm_3",
-        "w2flg_3",
-        "w3mag_3",
-        "w3sigm_3",
-        "w3flg_3",
-        "w4mag_3",
-        "w4sigm_3",
-        "w4flg_3",
-        "w1mag_4",
-        "w1sigm_4",
-        "w1flg_4",
-        "w2mag_4",
-        "w2sigm_4",
-        "w2flg_4",
-        "w3mag_4",
-        "w3sigm_4",
-        "w3flg_4",
-        "w4mag_4",
-        "w4sigm_4",
-        "w4flg_4",
-        "w1mag_5",
-        "w1sigm_5",
-        "w1flg_5",
-        "w2mag_5",
-        "w2sigm_5",
-        "w2flg_5",
-        "w3mag_5",
-        "w3sigm_5",
-        "w3flg_5",
-        "w4mag_5",
-        "w4sigm_5",
-        "w4flg_5",
-        "w1mag_6",
-        "w1sigm_6",
-        "w1flg_6",
-        "w2mag_6",
-        "w2sigm_6",
-        "w2flg_6",
-        "w3mag_6",
-        "w3sigm_6",
-        "w3flg_6",
-        "w4mag_6",
-        "w4sigm_6",
-        "w4flg_6",
-        "w1mag_7",
-        "w1sigm_7",
-        "w1flg_7",
-        "w2mag_7",
-        "w2sigm_7",
-        "w2flg_7",
-        "w3mag_7",
-        "w3sigm_7",
-        "w3flg_7",
-        "w4mag_7",
-        "w4sigm_7",
-        "w4flg_7",
-        "w1mag_",
-        "w1sigm_8",
-        "w1flg_8",
-        "w2mag_8",
-        "w2sigm_8",
-        "w2flg_8",
-        "w3mag_8",
-        "w3sigm_8",
-        "w3flg_8",
-        "w4mag_8",
-        "w4sigm_8",
-        "w4flg_8",
-        "w1magp",
-        "w1sigp1",
-        "w1sigp2",
-        "w1k",
-        "w1ndf",
-        "w1mlq",
-        "w1mjdmin",
-        "w1mjdmax",
-        "w1mjdmean",
-        "w2magp",
-        "w2sigp1",
-        "w2sigp2",
-        "w2k",
-        "w2ndf",
-        "w2mlq",
-        "w2mjdmin",
-        "w2mjdmax",
-        "w2mjdmean",
-        "w3magp",
-        "w3sigp1",
-        "w3sigp2",
-        "w3k",
-        "w3ndf",
-        "w3mlq",
-        "w3mjdmin",
-        "w3mjdmax",
-        "w3mjdmean",
-        "w4magp",
-        "w4sigp1",
-        "w4sigp2",
-        "w4k",
-        "w4ndf",
-        "w4mlq",
-        "w4mjdmin",
-        "w4mjdmax",
-        "w4mjdmean",
-        "rho12",
-        "rho23",
-        "rho34",
-        "q12",
-        "q23",
-        "q34",
-        "xscprox",
-        "w1rsemi",
-        "w1ba",
-        "w1pa",
-        "w1gmag",
-        "w1gerr",
-        "w1gflg",
-        "w2rsemi",
-        "w2ba",
-        "w2pa",
-        "w2gmag",
-        "w2gerr",
-        "w2gflg",
-        "w3rsemi",
-        "w3ba",
-        "w3pa",
-        "w3gmag",
-        "w3gerr",
-        "w3gflg",
-        "w4rsemi",
-        "w4ba",
-        "w4pa",
-        "w4gmag",
-        "w4gerr",
-        "w4gflg",
-        "tmass_key",
-        "r_2mass",
-        "pa_2mass",
-        "n_2mass",
-        "j_m_2mass",
-        "j_msig_2mass",
-        "h_m_2mass",
-        "h_msig_2mass",
-        "k_m_2mass",
-        "k_msig_2mass",
-        "x",
-        "y",
-        "z",
-        "spt_ind",
-        "htm20",
-    ]
-
-    for p in tqdm.tqdm(list(_ALLWISE_PARENT.glob("wise-allwise-cat-*.bz2"))):
-        dtypes = {
-            "designation": str,  # designation does not seems to be unique, dont use it as primary key
-            "ra": np.float64,
-            "dec": np.float64,
-            "sigra": np.float32,
-            "sigdec": np.float32,
-            "sigradec": np.float32,
-            "w1mpro": np.float32,
-            "w1sigmpro": np.float32,
-            "w1snr": np.float32,
-            "w2mpro": np.float32,
-            "w2sigmpro": np.float32,
-            "w2snr": np.float32,
-            "w3mpro": np.float32,
-            "w3sigmpro": np.float32,
-            "w3snr": np.float32,
-            "w4mpro": np.float32,
-            "w4sigmpro": np.float32,
-            "w4snr": np.float32,
-            "nb": "Int32",
-            "na": "Int32",
-            "cc_flags": str,
-            "ext_flg": "Int32",
-            "var_flg": str,
-            "ph_qual": str,
-            "w1mjdmean": np.float64,
-            "w2mjdmean": np.float64,
-            "w3mjdmean": np.float64,
-            "w4mjdmean": np.float64,
-            "w1gmag": np.float32,
-            "w1gerr": np.float32,
-            "w2gmag": np.float32,
-            "w2gerr": np.float32,
-            "w3gmag": np.float32,
-            "w3gerr": np.float32,
-            "w4gmag": np.float32,
-            "w4gerr": np.float32,
-        }
-        data = pd.read_csv(
-            p,
-            header=None,
-            sep="|",
-            usecols=[allwise_allcol.index(i) for i in dtypes.keys()],
-            names=dtypes.keys(),
-            dtype=dtypes,
-        )
+    _execute_schema(conn, "allwise_lite_schema.sql")
 
-        # write the data to a sqlite table
-        data.to_sql("allwise", conn, if_exists="append", index=False)
+    _ingest_files(
+        conn,
+        "allwise",
+        list(mygaiadb.data._ALLWISE_PARENT.glob("wise-allwise-cat-*.bz2")),
+        partial(_read_allwise, batch_size=batch_size, engine=engine),
+        n_workers=n_workers,
+        queue_depth=queue_depth,
+    )
 
     # =================== indexing ===================
     if indexing:
-        # 22m56s
-        print("Doing Indexing")
-        c.execute(
-            """CREATE INDEX allwise_designation_mags ON allwise (designation, w1mpro, w2mpro, w3mpro, w4mpro, w1snr, w2snr, w3snr, w4snr, ph_qual);"""
-        )
+        _create_indexes(conn, "allwise")
+    _close_after_compile(conn, bulk_load=bulk_load)
 
 
-def compile_catwise_sql_db(indexing: bool = True):
+def compile_catwise_sql_db(
+    indexing: bool = True,
+    n_workers: int = 1,
+    queue_depth: int = 4,
+    bulk_load: bool = True,
+    engine: str = "pandas",
+):
     """
     This function compile allwise SQL database
 
@@ -1118,278 +2337,32 @@ def compile_catwise_sql_db(indexing: bool = True):
     ----------
     indexing : bool, optional (default=True)
         Whether to do SQL indexing on pre-determined columns
+    n_workers : int, optional (default=1)
+        Number of worker processes to decompress and parse files while the current process writes to the database
+    queue_depth : int, optional (default=4)
+        Maximum number of parsed batches waiting to be written per worker, higher means more memory usage
+    bulk_load : bool, optional (default=True)
+        Whether to turn off journaling and syncing during the build and lock the database exclusively,
+        the database is switched back to safe settings when finished
+    engine : str, optional (default="pandas")
+        CSV parser to use, either "pandas" or "pyarrow" (multi-threaded, requires pyarrow installed)
     """
-    Path(catwise_sql_db_path).touch()
-    conn = sqlite3.connect(catwise_sql_db_path)
-    c = conn.cursor()
+    _check_engine(engine)
+    conn = _connect_for_compile(mygaiadb.catwise_sql_db_path, bulk_load=bulk_load)
 
     # this section will take ~16 hours to run
-    schema_filename = mygaiadb_path.joinpath(
-        "data", "sql_schema", "catwise_lite_schema.sql"
-    )
-
-    with open(schema_filename) as f:
-        lines = f.read().replace("\n", "")
-    c.execute(lines)
-
-    # only the first part, not all actually
-    # https://portal.nersc.gov/project/cosmo/data/CatWISE/2020cwcat.sis20200318.txt
-    catwise_allcol = [
-        # Note that the first column in the width is occupied by a "pipe" or "bar" delimiter ("|")
-        "source_name",
-        "source_id",
-        "ra",
-        "dec",
-        "sigra",
-        "sigdec",
-        "sigradec",
-        # the following positions reflect the source xy position in the unWISE full depth coadd
-        "wx",
-        "wy",
-        # The next set of columns are aperture/annulus measurements from the unWISE epoch coadds
-        "w1sky",
-        "w1sigsk",
-        "w1conf",
-        "w2sky",
-        "w2sigsk",
-        "w2conf",
-        # WPRO epoch coadd measurements
-        "w1fitr",
-        "w2fitr",
-        "w1snr",
-        "w2snr",
-        "w1flux",
-        "w1sigflux",
-        "w2flux",
-        "w2sigflux",
-        "w1mpro",
-        "w1sigmpro",
-        "w1rchi2",
-        "w2mpro",
-        "w2sigmpro",
-        "w2rchi2",
-        "rchi2",
-        "nb",
-        "na",
-        "w1Sat",
-        "w2Sat",
-        # full depth coadd measurements: WAPPco, standard aperture w/ aperture correction;
-        # the standard (aperture corrected) aperture radius is 8.25 arcsec.
-        "w1mag",
-        "w1sigm",
-        "w1flg",
-        "w1Cov",
-        "w2mag",
-        "w2sigm",
-        "w2flg",
-        "w2Cov",
-        # full depth coadd measurements: WAPPco, circular apertures, no aperture correction is applied;
-        # radii:    5.50   8.25  11.00  13.75  16.50  19.25  22.00  24.75 arcsec
-        "w1mag_1",
-        "w1sigm_1",
-        "w1flg_1",
-        "w2mag_1",
-        "w2sigm_1",
-        "w2flg_1",
-        "w1mag_2",
-        "w1sigm_2",
-        "w1flg_2",
-        "w2mag_2",
-        "w2sigm_2",
-        "w2flg_2",
-        "w1mag_3",
-        "w1sigm_3",
-        "w1flg_3",
-        "w2mag_3",
-        "w2sigm_3",
-        "w2flg_3",
-        "w1mag_4",
-        "w1sigm_4",
-        "w1flg_4",
-        "w2mag_4",
-        "w2sigm_4",
-        "w2flg_4",
-        "w1mag_5",
-        "w1sigm_5",
-        "w1flg_5",
-        "w2mag_5",
-        "w2sigm_5",
-        "w2flg_5",
-        "w1mag_6",
-        "w1sigm_6",
-        "w1flg_6",
-        "w2mag_6",
-        "w2sigm_6",
-        "w2flg_6",
-        "w1mag_7",
-        "w1sigm_7",
-        "w1flg_7",
-        "w2mag_7",
-        "w2sigm_7",
-        "w2flg_7",
-        "w1mag_8",
-        "w1sigm_8",
-        "w1flg_8",
-        "w2mag_8",
-        "w2sigm_8",
-        "w2flg_8",
-        # the following are "N of M" counters for WPRO measurements
-        # w?M   - The number of individual epochs for band ? that are
-        #         available to make a profile-fit measurement.
-        # w?NM  - The number of individual epochs for band ? on which
-        #         WPRO extracted a flux measurement that has snr>3.
-        # w?mLQ - variability indicator mLogQ for the flux array
-        "w1NM",
-        "w1M",
-        "w1magP",
-        "w1sigP1",
-        "w1sigP2",
-        "w1k",
-        "w1Ndf",
-        "w1mLQ",
-        "w1mJDmin",
-        "w1mJDmax",
-        "w1mJDmean",
-        "w2NM",
-        "w2M",
-        "w2magP",
-        "w2sigP1",
-        "w2sigP2",
-        "w2k",
-        "w2Ndf",
-        "w2mLQ",
-        "w2mJDmin",
-        "w2mJDmax",
-        "w2mJDmean",
-        "rho12",
-        "q12",
-        "nIters",
-        "nSteps",
-        "mdetID",
-        "p1",
-        "p2",
-        "MeanObsMJD",
-        "ra_pm",
-        "dec_pm",
-        "sigra_pm",
-        "sigdec_pm",
-        "sigradec_pm",
-        "PMRA",
-        "PMDec",
-        "sigPMRA",
-        "sigPMDec",
-        "w1snr_pm",
-        "w2snr_pm",
-        "w1flux_pm",
-        "w1sigflux_pm",
-        "w2flux_pm",
-        "w2sigflux_pm",
-        "w1mpro_pm",
-        "w1sigmpro_pm",
-        "w1rchi2_pm",
-        "w2mpro_pm",
-        "w2sigmpro_pm",
-        "w2rchi2_pm",
-        "rchi2_pm",
-        "pmcode",
-        "nIters_pm",
-        "nSteps_pm",
-        "dist",
-        "dw1mag",
-        "rch2w1",
-        "dw2mag",
-        "rch2w2",
-        "elon_avg",
-        "elonSig",
-        "elat_avg",
-        "elatSig",
-        "Delon",
-        "DelonSig",
-        "Delat",
-        "DelatSig",
-        "DelonSNR",
-        "DelatSNR",
-        "chi2pmra",
-        "chi2pmdec",
-        "ka",
-        "k1",
-        "k2",
-        "km",
-        "par_pm",
-        "par_pmSig",
-        "par_stat",
-        "par_sigma",
-        "dist_x",
-        "cc_flags",
-        "w1cc_map",
-        "w1cc_map_str",
-        "w2cc_map",
-        "w2cc_map_str",
-        "n_aw",
-        "ab_flags",
-        "w1ab_map",
-        "w1ab_map_str",
-        "w2ab_map",
-        "w2ab_map_str",
-        "glon",
-        "glat",
-        "elon",
-        "elat",
-        "unwise_objid",
-    ]
+    _execute_schema(conn, "catwise_lite_schema.sql")
 
-    for p in tqdm.tqdm(list(_CATWISE_PARENT.glob("*/*cat_b0.tbl.gz"))):
-        dtypes = {
-            "source_name": str,  # source_name does not seems to be unique, dont use it as primary key
-            "source_id": str,
-            "ra": np.float64,
-            "dec": np.float64,
-            "sigra": np.float32,
-            "sigdec": np.float32,
-            "sigradec": np.float32,
-            "w1snr": np.float32,  # 18
-            "w2snr": np.float32,  # 19
-            "w1mpro": np.float32,  # 24
-            "w1sigmpro": np.float32,  # 25
-            "w2mpro": np.float32,  # 27
-            "w2sigmpro": np.float32,  # 28
-            "nb": "Int32",  # 31
-            "na": "Int32",  # 32
-            "w1mag": np.float32,  # 35
-            "w1flg": "Int32",  # 37
-            "w2mag": np.float32,  # 39
-            "w2flg": "Int32",  # 41
-            "w1k": np.float32,  # 96
-            "w1mJDmean": np.float64,  # 101
-            "w2k": np.float32,  # 107
-            "w2mJDmean": np.float64,  # 112
-            # "cc_flags": str,
-            "w1ab_map": "Int32",
-            "w2ab_map": "Int32",
-            "unwise_objid": str,
-        }
-        try:
-            data = pd.read_table(
-                p,
-                sep=r"\s+",
-                skiprows=19,
-                usecols=[catwise_allcol.index(i) for i in dtypes.keys()],
-                names=dtypes.keys(),
-                dtype=dtypes,
-            )
-        except ValueError:  # sometimes there are 20 rows of comments
-            data = pd.read_table(
-                p,
-                sep=r"\s+",
-                skiprows=20,
-                usecols=[catwise_allcol.index(i) for i in dtypes.keys()],
-                names=dtypes.keys(),
-                dtype=dtypes,
-            )
-
-        # write the data to a sqlite table
-        data.to_sql("catwise", conn, if_exists="append", index=False)
+    _ingest_files(
+        conn,
+        "catwise",
+        list(mygaiadb.data._CATWISE_PARENT.glob("*/*cat_b0.tbl.gz")),
+        partial(_read_catwise, engine=engine),
+        n_workers=n_workers,
+        queue_depth=queue_depth,
+    )
 
     # =================== indexing ===================
     if indexing:
-        warnings.warn("Indexing for CATWISE is not implemented yet")
+        _create_indexes(conn, "catwise")
+    _close_after_compile(conn, bulk_load=bulk_load)
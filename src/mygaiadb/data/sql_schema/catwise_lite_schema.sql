@@ -25,5 +25,6 @@ CREATE TABLE catwise (
     w1ab_map smallint,
     w2ab_map smallint,
     unwise_objid character(20),
+    healpix12 bigint,
     PRIMARY KEY (unwise_objid)
 );
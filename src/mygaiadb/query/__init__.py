@@ -1,10 +1,32 @@
-from .query import LocalGaiaSQL
-from .callbacks import QueryCallback, ZeroPointCallback, DustCallback, LambdaCallback
+import importlib
+
+# names are imported from their modules when first used, so importing mygaiadb.query is cheap
+_LAZY_IMPORTS = {
+    "LocalGaiaSQL": ".query",
+    "QueryCache": ".cache",
+    "QueryCallback": ".callbacks",
+    "ZeroPointCallback": ".callbacks",
+    "DustCallback": ".callbacks",
+    "LambdaCallback": ".callbacks",
+}
 
 __all__ = [
     "LocalGaiaSQL",
+    "QueryCache",
     "QueryCallback",
     "ZeroPointCallback",
     "DustCallback",
     "LambdaCallback",
 ]
+
+
+def __getattr__(name: str):
+    if name in _LAZY_IMPORTS:
+        value = getattr(importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,369 @@
+import ast
+import functools
+import math
+import re
+import sqlite3
+
+import numpy as np
+
+from mygaiadb.query.plan import _table_aliases
+from mygaiadb.utils import (
+    _angular_distance,
+    _radec_to_vec,
+    _vec_to_radec,
+    healpix_disc_ranges,
+)
+
+# tables with a column of HEALPix index (in NESTED scheme) of ra and dec, shift of the level 12 index in the column
+_HEALPIX_COLUMNS = {
+    "gaia_source": ("source_id", 35),
+    "catwise": ("healpix12", 0),
+}
+# maximum number of HEALPix ranges in one predicate, ranges of lower level pixels are used for larger shapes
+_ADQL_MAX_RANGES = 400
+_GEOMETRY_FUNC_RE = re.compile(r"\b(CONTAINS|INTERSECTS|DISTANCE)\s*\(", re.IGNORECASE)
+_SHAPE_RE = re.compile(r"^\s*(POINT|CIRCLE|BOX|POLYGON)\s*\(", re.IGNORECASE)
+_COLUMN_RE = re.compile(r"^(?:(\w+)\.)?(\w+)$")
+# "1 = CONTAINS(...)" and "CONTAINS(...) = 1", the literal 1 must not be a part of a number (e.g., 21 or 1.5)
+_TRUE_BEFORE_RE = re.compile(r"(?<![\w.])1\s*=\s*$")
+_TRUE_AFTER_RE = re.compile(r"\s*=\s*1(?![\w.])")
+# the comparison is a whole predicate only between these tokens, otherwise an operator with higher precedence than =
+# binds to it (e.g., "x - 1 = CONTAINS(...)" is "(x - 1) = CONTAINS(...)")
+_PREDICATE_START_RE = re.compile(
+    r"(?:^|[(,]|\b(?:WHERE|AND|OR|ON|HAVING|WHEN|THEN|ELSE))\s*$", re.IGNORECASE
+)
+_PREDICATE_END_RE = re.compile(
+    r"\s*(?:$|[),;]|(?:AND|OR|ORDER|GROUP|LIMIT|HAVING|WHEN|THEN|ELSE|END|UNION|INTERSECT|EXCEPT|WINDOW)\b)",
+    re.IGNORECASE,
+)
+_SHAPE_N_ARGS = {"point": 2, "circle": 3, "box": 4}
+
+
+def _distance(ra1, dec1, ra2, dec2):
+    """
+    Angular distance in degrees between two coordinates in degrees with the haversine formula, NULL if any is NULL
+    """
+    if ra1 is None or dec1 is None or ra2 is None or dec2 is None:
+        return None
+    ra1, dec1, ra2, dec2 = map(math.radians, (ra1, dec1, ra2, dec2))
+    a = (
+        math.sin((dec2 - dec1) / 2) ** 2
+        + math.cos(dec1) * math.cos(dec2) * math.sin((ra2 - ra1) / 2) ** 2
+    )
+    return math.degrees(2 * math.asin(min(1.0, math.sqrt(a))))
+
+
+def _contains_circle(ra, dec, ra0, dec0, radius):
+    distance = _distance(ra, dec, ra0, dec0)
+    return None if distance is None or radius is None else int(distance <= radius)
+
+
+def _contains_box(ra, dec, ra0, dec0, width, height):
+    if None in (ra, dec, ra0, dec0, width, height):
+        return None
+    d_ra = (ra - ra0 + 180) % 360 - 180
+    return int(abs(dec - dec0) <= height / 2 and (width >= 360 or abs(d_ra) <= width / 2))
+
+
+def _unit_vector(ra: float, dec: float) -> tuple[float, float, float]:
+    ra, dec = math.radians(ra), math.radians(dec)
+    return math.cos(dec) * math.cos(ra), math.cos(dec) * math.sin(ra), math.sin(dec)
+
+
+@functools.lru_cache(maxsize=64)
+def _gnomonic_polygon(vertices: tuple[float, ...]):
+    """
+    Center and tangent plane basis of a polygon and its vertices in gnomonic projection around the center, where edges
+    (great circles) are straight lines
+    """
+    vecs = np.array([_unit_vector(*vertices[i : i + 2]) for i in range(0, len(vertices), 2)])
+    center = vecs.sum(axis=0)
+    center /= np.linalg.norm(center)
+    e1 = np.cross([0.0, 0.0, 1.0], center)
+    if np.linalg.norm(e1) < 1e-12:  # center at a pole
+        e1 = np.array([1.0, 0.0, 0.0])
+    e1 /= np.linalg.norm(e1)
+    e2 = np.cross(center, e1)
+    dot = vecs @ center
+    if np.any(dot <= 0):
+        raise ValueError("POLYGON must be smaller than a hemisphere")
+    xy = np.stack([vecs @ e1 / dot, vecs @ e2 / dot], axis=1)
+    return center, e1, e2, xy.tolist()
+
+
+def _contains_polygon(ra, dec, *vertices):
+    if ra is None or dec is None or None in vertices:
+        return None
+    center, e1, e2, xy = _gnomonic_polygon(tuple(float(i) for i in vertices))
+    vec = _unit_vector(ra, dec)
+    dot = vec[0] * center[0] + vec[1] * center[1] + vec[2] * center[2]
+    if dot <= 0:
+        return 0
+    x = (vec[0] * e1[0] + vec[1] * e1[1] + vec[2] * e1[2]) / dot
+    y = (vec[0] * e2[0] + vec[1] * e2[1] + vec[2] * e2[2]) / dot
+    # ray casting
+    inside = False
+    for (x1, y1), (x2, y2) in zip(xy, xy[1:] + xy[:1]):
+        if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+            inside = not inside
+    return int(inside)
+
+
+def _register_adql_functions(conn: sqlite3.Connection):
+    """
+    Register SQL functions used by translated ADQL geometry predicates on a connection
+    """
+    conn.create_function("mygaiadb_distance", 4, _distance, deterministic=True)
+    conn.create_function(
+        "mygaiadb_contains_circle", 5, _contains_circle, deterministic=True
+    )
+    conn.create_function("mygaiadb_contains_box", 6, _contains_box, deterministic=True)
+    conn.create_function(
+        "mygaiadb_contains_polygon", -1, _contains_polygon, deterministic=True
+    )
+
+
+def _closing_paren(query: str, start: int) -> int:
+    """
+    Index of the parenthesis closing the one at start, string literals are skipped
+    """
+    depth, i = 0, start
+    while i < len(query):
+        char = query[i]
+        if char == "'":
+            i = query.index("'", i + 1)
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    raise ValueError(f"Unbalanced parentheses in query: {query[start:]}")
+
+
+def _split_args(text: str) -> list[str]:
+    """
+    Split arguments of a function call at commas not in parentheses or string literals
+    """
+    args, depth, start, in_string = [], 0, 0, False
+    for i, char in enumerate(text):
+        if char == "'":
+            in_string = not in_string
+        elif in_string:
+            continue
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            args.append(text[start:i].strip())
+            start = i + 1
+    args.append(text[start:].strip())
+    return args
+
+
+def _parse_shape(text: str) -> tuple[str, list[str]] | None:
+    """
+    Name and arguments (without coordinate system) of ADQL POINT, CIRCLE, BOX or POLYGON, None if it is not one of them
+    """
+    m = _SHAPE_RE.match(text)
+    if m is None:
+        return None
+    end = _closing_paren(text, m.end() - 1)
+    if text[end + 1 :].strip():
+        return None
+    name, args = m.group(1).lower(), _split_args(text[m.end() : end])
+    if args and args[0].startswith("'"):  # coordinate system, e.g., 'ICRS'
+        args = args[1:]
+    n_args = _SHAPE_N_ARGS.get(name)
+    if (n_args is not None and len(args) != n_args) or (
+        name == "polygon" and (len(args) < 6 or len(args) % 2)
+    ):
+        raise ValueError(f"Wrong number of arguments of {name.upper()} in {text}")
+    return name, args
+
+
+def _literal(expr: str) -> float | None:
+    """
+    Value of a numeric constant expression (e.g., ``1./3600``), None if it is not constant
+    """
+    try:
+        node = ast.parse(expr.strip(), mode="eval").body
+    except SyntaxError:
+        return None
+
+    def evaluate(node):
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            return float(node.value)
+        elif isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.UAdd, ast.USub)):
+            value = evaluate(node.operand)
+            return -value if isinstance(node.op, ast.USub) else value
+        elif isinstance(node, ast.BinOp) and isinstance(
+            node.op, (ast.Add, ast.Sub, ast.Mult, ast.Div)
+        ):
+            left, right = evaluate(node.left), evaluate(node.right)
+            if isinstance(node.op, ast.Add):
+                return left + right
+            elif isinstance(node.op, ast.Sub):
+                return left - right
+            elif isinstance(node.op, ast.Mult):
+                return left * right
+            return left / right
+        raise ValueError
+
+    try:
+        return evaluate(node)
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+def _bounding_disc(name: str, values: list[float]) -> tuple[float, float, float]:
+    """
+    Center and radius in degrees of a disc covering a CIRCLE, BOX or POLYGON. The farthest points from the center of a
+    POLYGON are its corners. For a BOX, the distance along edges of constant Dec grows towards the corners, but along
+    edges of constant RA of a wide BOX the farthest point can be between the corners, so it is added as well
+    """
+    if name == "circle":
+        return values[0], values[1], values[2]
+    elif name == "box":
+        ra0, dec0, width, height = values
+        if width >= 360:
+            return ra0, dec0, 180.0
+        dec_min, dec_max = (float(np.clip(dec0 + i * height / 2, -90, 90)) for i in (-1, 1))
+        # on an edge of constant RA, cos(distance) = sin(dec0) sin(dec) + cos(dec0) cos(width / 2) cos(dec) is
+        # smallest at dec = phi + 180 degrees with phi = atan2(sin(dec0), cos(dec0) cos(width / 2)), clipped to the edge
+        phi = np.rad2deg(
+            np.arctan2(np.sin(np.deg2rad(dec0)), np.cos(np.deg2rad(dec0)) * np.cos(np.deg2rad(width / 2)))
+        )
+        dec_far = float(np.clip((phi + 360) % 360 - 180, dec_min, dec_max))
+        corners = [
+            (ra0 + i * width / 2, dec)
+            for i in (-1, 1)
+            for dec in (dec_min, dec_max, dec_far)
+        ]
+    else:
+        center = _gnomonic_polygon(tuple(values))[0]
+        ra0, dec0 = (float(i) for i in _vec_to_radec(center))
+        corners = list(zip(values[::2], values[1::2]))
+    corners = np.array(corners)
+    radius = np.rad2deg(
+        _angular_distance(
+            _radec_to_vec(ra0, dec0)[:, None], _radec_to_vec(corners[:, 0], corners[:, 1])
+        )
+    ).max()
+    # margin for round-off error
+    return ra0, dec0, float(min(radius * (1 + 1e-9) + 1e-9, 180.0))
+
+
+def _healpix_condition(column: str, shift: int, ra: float, dec: float, radius: float) -> str:
+    """
+    Condition of HEALPix index ranges (in a column with level 12 HEALPix index shifted by shift bits) covering a disc
+    """
+    level = 12
+    if radius > 0:  # approximate number of ranges is 3 * 2**level * sin(radius)
+        level = int(np.clip(np.log2(_ADQL_MAX_RANGES / (3 * np.sin(np.deg2rad(min(radius, 90))))), 0, 12))
+    ranges = healpix_disc_ranges(ra, dec, radius, level=level)
+    while len(ranges) > _ADQL_MAX_RANGES and level > 0:
+        level -= 1
+        ranges = healpix_disc_ranges(ra, dec, radius, level=level)
+    shift += 2 * (12 - level)
+    return "(" + " OR ".join(
+        f"{column} BETWEEN {first << shift} AND {((last + 1) << shift) - 1}"
+        for first, last in ranges.tolist()
+    ) + ")"
+
+
+def _translate_predicate(func: str, args: list[str], aliases: dict[str, str]) -> tuple[str, str | None]:
+    """
+    SQL of an ADQL geometry function and the condition of HEALPix ranges which is true for all rows where the function is
+    true (None if the condition cannot be found), None and None if the function is not translated
+    """
+    shapes = [_parse_shape(i) for i in args]
+    if func == "distance":
+        if len(shapes) != 2 or any(i is None or i[0] != "point" for i in shapes):
+            return None, None
+        return f"mygaiadb_distance({', '.join(shapes[0][1] + shapes[1][1])})", None
+    if len(shapes) != 2 or None in shapes:
+        return None, None
+    if func == "intersects" and shapes[1][0] == "point":
+        shapes = shapes[::-1]
+    (point, point_args), (shape, shape_args) = shapes
+    if point != "point" or shape == "point":
+        return None, None
+    sql = f"mygaiadb_contains_{shape}({', '.join(point_args + shape_args)})"
+
+    # columns of HEALPix index if the point is ra and dec of a table which has it and the shape is constant
+    ra_col, dec_col = _COLUMN_RE.match(point_args[0]), _COLUMN_RE.match(point_args[1])
+    values = [_literal(i) for i in shape_args]
+    if ra_col is None or dec_col is None or None in values:
+        return sql, None
+    if (ra_col.group(2).lower(), dec_col.group(2).lower()) != ("ra", "dec") or ra_col.group(1) != dec_col.group(1):
+        return sql, None
+    prefix = ra_col.group(1)
+    if prefix is not None:
+        table = aliases.get(prefix.lower())
+    else:  # unqualified columns are only unambiguous with one table
+        tables = set(aliases.values())
+        table = tables.pop() if len(tables) == 1 else None
+    if table not in _HEALPIX_COLUMNS:
+        return sql, None
+    column, shift = _HEALPIX_COLUMNS[table]
+    column = column if prefix is None else f"{prefix}.{column}"
+    return sql, _healpix_condition(column, shift, *_bounding_disc(shape, values))
+
+
+@functools.lru_cache(maxsize=1024)
+def translate_adql(query: str) -> str:
+    """
+    Translate ADQL geometry functions in a query to SQLite. ``CONTAINS()`` and ``INTERSECTS()`` of ``POINT()`` with
+    ``CIRCLE()``, ``BOX()`` or ``POLYGON()`` are turned into exact checks with SQL functions registered by ``LocalGaiaSQL``,
+    and if the point is ``ra`` and ``dec`` of ``gaia_source`` (or ``catwise``) and the shape is constant, comparisons like
+    ``1 = CONTAINS(...)`` are also restricted to ranges of ``source_id`` (or ``healpix12``) of HEALPix pixels covering the
+    shape so the primary key (or index) is searched instead of scanning the whole table. ``DISTANCE()`` of two points is
+    turned into angular distance in degrees. Translated queries are cached.
+
+    ``BOX(ra, dec, width, height)`` is the range of RA and Dec around the center (in degrees), edges of ``POLYGON()`` are
+    great circles and polygons must be smaller than a hemisphere
+
+    Parameters
+    ----------
+    query : str
+        Query string with ADQL geometry functions
+
+    Returns
+    -------
+    query: str
+        SQLite query string
+    """
+    aliases = None
+    pos = 0
+    while (m := _GEOMETRY_FUNC_RE.search(query, pos)) is not None:
+        end = _closing_paren(query, m.end() - 1)
+        if aliases is None:
+            aliases = _table_aliases(query)
+        sql, condition = _translate_predicate(
+            m.group(1).lower(), _split_args(query[m.end() : end]), aliases
+        )
+        if sql is None:  # e.g., a column named contains
+            pos = m.end()
+            continue
+        start, end = m.start(), end + 1
+        # ranges can only be used if the predicate must be true
+        before = _TRUE_BEFORE_RE.search(query[:start])
+        after = _TRUE_AFTER_RE.match(query, end)
+        if before is not None:
+            predicate_start, predicate_end = before.start(), end
+        elif after is not None:
+            predicate_start, predicate_end = start, after.end()
+        if (
+            condition is not None
+            and (before is not None or after is not None)
+            and _PREDICATE_START_RE.search(query[:predicate_start]) is not None
+            and _PREDICATE_END_RE.match(query, predicate_end) is not None
+        ):
+            start, end = predicate_start, predicate_end
+            sql = f"({condition} AND {sql} = 1)"
+        query = query[:start] + sql + query[end:]
+        pos = start + len(sql)
+    return query
@@ -0,0 +1,322 @@
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import uuid
+from typing import TYPE_CHECKING
+
+import mygaiadb
+from mygaiadb import __version__
+from mygaiadb.query.callbacks import QueryCallback
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# types of attributes of callbacks which are part of their identity, others (e.g., modules and dust maps) are not
+_CALLBACK_ATTR_TYPES = (str, int, float, bool, type(None))
+
+
+def _callback_identity(callback: QueryCallback) -> dict:
+    """
+    Identity of a callback which does not change between sessions: its class, simple attributes and the code,
+    constants, default arguments and closure of its function
+    """
+    func = getattr(callback.func, "__func__", callback.func)
+    identity = {
+        "class": f"{type(callback).__module__}.{type(callback).__qualname__}",
+        "attrs": {
+            k: v
+            for k, v in sorted(vars(callback).items())
+            if isinstance(v, _CALLBACK_ATTR_TYPES) and k != "initialized"
+        },
+    }
+    code = getattr(func, "__code__", None)
+    if code is not None:
+        closure = [c.cell_contents for c in func.__closure__ or []]
+        identity["code"] = hashlib.sha256(
+            code.co_code
+            + repr((code.co_consts, code.co_names, func.__defaults__, closure)).encode()
+        ).hexdigest()
+    else:  # e.g., numpy ufunc
+        identity["code"] = repr(func)
+    return identity
+
+
+class QueryCache:
+    """
+    Persistent cache of query results, each result is saved as a parquet file (requires pyarrow) and indexed in a SQLite
+    database in the cache folder. The least recently used results are evicted when the total size is larger than ``max_size``
+
+    Parameters
+    ----------
+    cache_dir : str, optional (default=None)
+        Folder of the cache, ``~/.mygaiadb/query_cache`` if None
+    max_size : int, optional (default=10 * 1024**3)
+        Maximum total size of cached results in bytes
+    """
+
+    def __init__(self, cache_dir: str | None = None, max_size: int = 10 * 1024**3):
+        if cache_dir is None:
+            cache_dir = mygaiadb.mygaiadb_folder.joinpath("query_cache")
+        self.cache_dir = os.path.abspath(os.path.expanduser(cache_dir))
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.index_path = os.path.join(self.cache_dir, "index.db")
+        with self._connect() as conn:
+            conn.execute(
+                """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                query TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+            )
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # the index can be shared by multiple processes, so wait for locks instead of failing right away
+        conn = sqlite3.connect(self.index_path, timeout=30)
+        try:
+            with conn:  # commit or rollback
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def key(
+        query: str,
+        callbacks: list[QueryCallback] | None = None,
+        db_paths: list[str] | None = None,
+    ) -> str:
+        """
+        Cache key of a query from the query string, identity of callbacks and modification time and size of databases
+
+        Parameters
+        ----------
+        query : str
+            Query string after preprocessing
+        callbacks : list[QueryCallback], optional (default=None)
+            List of mygaiadb callbacks
+        db_paths : list[str], optional (default=None)
+            Paths of databases attached when the query is run
+
+        Returns
+        -------
+        key: str
+        """
+        databases = []
+        for path in db_paths or []:
+            st = os.stat(path)
+            databases.append([str(path), st.st_mtime_ns, st.st_size])
+        identity = {
+            "version": __version__,
+            # whitespaces do not change the result
+            "query": " ".join(query.split()),
+            "callbacks": [_callback_identity(i) for i in callbacks or []],
+            "databases": databases,
+        }
+        return hashlib.sha256(
+            json.dumps(identity, sort_keys=True, default=repr).encode()
+        ).hexdigest()
+
+    def path(self, key: str) -> str | None:
+        """
+        Path of the parquet file of a key and mark it as used, None (and counted as a miss) if it is not cached
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                """SELECT filename FROM entries WHERE key = ?""", (key,)
+            ).fetchone()
+            if row is not None and os.path.exists(
+                path := os.path.join(self.cache_dir, row[0])
+            ):
+                conn.execute(
+                    """UPDATE entries SET last_access = ? WHERE key = ?""",
+                    (time.time(), key),
+                )
+                self.hits += 1
+                return path
+            elif row is not None:  # file removed by hand
+                conn.execute("""DELETE FROM entries WHERE key = ?""", (key,))
+        self.misses += 1
+        return None
+
+    def get(self, key: str) -> pd.DataFrame | None:
+        """
+        Get a cached result as pandas dataframe, None if it is not cached
+        """
+        import pandas as pd
+
+        path = self.path(key)
+        return None if path is None else pd.read_parquet(path)
+
+    def new_file(self) -> str:
+        """
+        Path of a new temporary file in the cache folder to be written and then added with ``add()``
+        """
+        return os.path.join(self.cache_dir, f"{uuid.uuid4().hex}.parquet.tmp")
+
+    def add(self, key: str, tmp_path: str, query: str):
+        """
+        Add a parquet file written to a path from ``new_file()`` to the cache, then evict least recently used results
+        """
+        filename = f"{key}.parquet"
+        os.replace(tmp_path, os.path.join(self.cache_dir, filename))
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                """INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)""",
+                (
+                    key,
+                    filename,
+                    os.path.getsize(os.path.join(self.cache_dir, filename)),
+                    " ".join(query.split()),
+                    now,
+                    now,
+                ),
+            )
+        self.evict()
+
+    def put(self, key: str, df: pd.DataFrame, query: str):
+        """
+        Save a result to the cache, results which cannot be saved as parquet (e.g., with duplicate column names) are
+        not cached
+        """
+        if not df.columns.is_unique:
+            return
+        tmp_path = self.new_file()
+        try:
+            df.to_parquet(tmp_path, index=False)
+        except ValueError:  # pyarrow.ArrowInvalid is a ValueError
+            pass
+        else:
+            self.add(key, tmp_path, query)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def writer(self, key: str, query: str) -> "_CacheWriter":
+        """
+        Writer to save a result to the cache in chunks of pandas dataframe, the result is added when it is committed
+        """
+        return _CacheWriter(self, key, query)
+
+    def evict(self):
+        """
+        Remove least recently used results until the total size is not larger than ``max_size``
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                """SELECT key, filename, size FROM entries ORDER BY last_access DESC"""
+            ).fetchall()
+            total = 0
+            for key, filename, size in rows:
+                total += size
+                if total > self.max_size:
+                    self._remove(conn, key, filename)
+
+    def _remove(self, conn: sqlite3.Connection, key: str, filename: str):
+        conn.execute("""DELETE FROM entries WHERE key = ?""", (key,))
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(os.path.join(self.cache_dir, filename))
+
+    def invalidate(self, query: str | None = None):
+        """
+        Remove cached results of a query (with any callbacks and database versions) or all cached results if None
+
+        Parameters
+        ----------
+        query : str, optional (default=None)
+            Query string, after preprocessing if the query is run with ``LocalGaiaSQL``
+        """
+        with self._connect() as conn:
+            if query is None:
+                rows = conn.execute("""SELECT key, filename FROM entries""").fetchall()
+            else:
+                rows = conn.execute(
+                    """SELECT key, filename FROM entries WHERE query = ?""",
+                    (" ".join(query.split()),),
+                ).fetchall()
+            for key, filename in rows:
+                self._remove(conn, key, filename)
+
+    def stats(self) -> dict:
+        """
+        Get statistics of the cache
+
+        Returns
+        -------
+        result: dict
+            Number of hits and misses in this session, number of cached results and their total size in bytes
+        """
+        with self._connect() as conn:
+            n_entries, size = conn.execute(
+                """SELECT count(*), coalesce(sum(size), 0) FROM entries"""
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": n_entries,
+            "size": size,
+        }
+
+
+class _CacheWriter:
+    """
+    Write chunks of a result to a parquet file in the cache folder, the file is added to the cache by ``commit()`` and
+    removed by ``close()`` otherwise. Types of chunks must be the same as the first chunk and column names must be unique,
+    otherwise the result is not cached.
+    """
+
+    def __init__(self, cache: QueryCache, key: str, query: str):
+        self.cache = cache
+        self.key = key
+        self.query = query
+        self.tmp_path = cache.new_file()
+        self.writer = None
+        self.schema = None
+        self.failed = False
+
+    def write(self, df: pd.DataFrame):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self.failed:
+            return
+        try:
+            if not df.columns.is_unique:
+                raise ValueError("Duplicate column names cannot be saved as parquet")
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self.writer is None:
+                self.schema = table.schema
+                self.writer = pq.ParquetWriter(self.tmp_path, self.schema)
+            self.writer.write_table(table.cast(self.schema))
+        except (ValueError, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            # types are inferred for each chunk, e.g., a column with only NULL in the first chunk,
+            # pyarrow.ArrowInvalid is a ValueError
+            self.failed = True
+            self.close()
+
+    def commit(self):
+        if self.failed or self.writer is None:
+            return self.close()
+        self.writer.close()
+        self.writer = None
+        self.cache.add(self.key, self.tmp_path, self.query)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.tmp_path)
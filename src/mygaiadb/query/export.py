@@ -0,0 +1,99 @@
+import numpy as np
+
+
+def _sql_to_arrow_type(decltype: str):
+    """
+    Turn a declared type of a column in SQL schema to pyarrow type, None if the column is not declared (e.g., an expression)
+
+    Follows SQLite type affinity rules, except that ``real`` and ``float`` are single precision and ``double`` is double
+    precision as in Gaia archive, and ``boolean`` is boolean
+    """
+    import pyarrow as pa
+
+    decltype = decltype.lower()
+    if decltype == "":
+        return None
+    elif decltype == "boolean":
+        return pa.bool_()
+    elif decltype == "smallint":
+        return pa.int16()
+    elif "int" in decltype:
+        return pa.int64()
+    elif "char" in decltype or "clob" in decltype or "text" in decltype:
+        return pa.string()
+    elif "doub" in decltype:
+        return pa.float64()
+    elif "real" in decltype or "floa" in decltype:
+        return pa.float32()
+    else:
+        return None
+
+
+def _to_arrow_array(values: tuple, arrow_type):
+    """
+    Turn values of a column from sqlite3 to pyarrow array with the type from SQL schema if any
+    """
+    import pyarrow as pa
+
+    if arrow_type is None:
+        array = pa.array(values)
+        # column with only NULL in the first chunk has no type
+        return array.cast(pa.float64()) if pa.types.is_null(array.type) else array
+    try:
+        return pa.array(values, type=arrow_type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # e.g., integers 0 and 1 in boolean columns
+        return pa.array(values).cast(arrow_type)
+
+
+class _H5TableWriter:
+    """
+    Write pyarrow tables with the same schema to a h5 file incrementally, one resizable dataset per column.
+    NULL is NaN in float columns, the smallest integer in integer columns, False in boolean columns and empty string in
+    string columns, fill values are saved as attribute "fillvalue" of datasets
+    """
+
+    def __init__(self, filename: str, schema, metadata: dict | None = None):
+        import h5py
+        import pyarrow as pa
+
+        self.h5f = h5py.File(filename, "w")
+        if metadata is not None:
+            self.h5f.attrs.update(metadata)
+        self.fill_values = {}
+        for field in schema:
+            if pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+                dtype, fill_value = h5py.string_dtype(), ""
+            elif pa.types.is_boolean(field.type):
+                dtype, fill_value = np.bool_, False
+            elif pa.types.is_integer(field.type):
+                dtype = field.type.to_pandas_dtype()
+                fill_value = np.iinfo(dtype).min
+            else:
+                dtype, fill_value = field.type.to_pandas_dtype(), np.nan
+            self.fill_values[field.name] = fill_value
+            self.h5f.create_dataset(
+                field.name,
+                shape=(0,),
+                maxshape=(None,),
+                dtype=dtype,
+                chunks=True,
+                fillvalue=fill_value,
+            )
+            self.h5f[field.name].attrs["fillvalue"] = fill_value
+
+    def write_table(self, table):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        for name, column in zip(table.column_names, table.columns):
+            # NULL in float columns are NaN already
+            if column.null_count > 0 and not pa.types.is_floating(column.type):
+                column = pc.fill_null(column, self.fill_values[name])
+            dataset = self.h5f[name]
+            start = dataset.shape[0]
+            dataset.resize((start + len(column),))
+            dataset[start:] = column.to_numpy(zero_copy_only=False)
+
+    def close(self):
+        self.h5f.close()
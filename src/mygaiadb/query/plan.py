@@ -0,0 +1,259 @@
+import re
+import sqlite3
+
+# big tables (approximate number of rows) which take hours to scan, and the attached database of them
+_BIG_TABLES = {
+    "gaia_source": ("gaiadr3", 1_811_709_771),
+    "twomass_psc": ("tmass", 470_992_970),
+    "allwise": ("allwise", 747_634_026),
+    "catwise": ("catwise", 1_890_715_640),
+}
+# indexes to join catalogs with designations in gaiadr3 best neighbour tables
+_DESIGNATION_INDEXES = {
+    "twomass_psc": "twomass_psc_designation_mags",
+    "allwise": "allwise_designation_mags",
+}
+_JOIN_SUGGESTIONS = {
+    "gaia_source": "Join gaia_source on source_id, which is the primary key",
+    "twomass_psc": "Join twomass_psc on designation = original_ext_source_id of gaiadr3.tmasspscxsc_best_neighbour",
+    "allwise": "Join allwise on designation = original_ext_source_id of gaiadr3.allwise_best_neighbour",
+    "catwise": "Join catwise on unwise_objid, which is the primary key, or on healpix12",
+}
+_SCAN_SUGGESTIONS = {
+    "gaia_source": "Restrict source_id to ranges as source_id encodes the level 12 HEALPix index (e.g., with cone_search() "
+    "or mygaiadb.utils.healpix_disc_ranges()), or scan partitions in parallel with parallel_query()",
+    "twomass_psc": "Start from gaiadr3.tmasspscxsc_best_neighbour and join twomass_psc on designation",
+    "allwise": "Start from gaiadr3.allwise_best_neighbour and join allwise on designation",
+    "catwise": "Restrict healpix12 to ranges (e.g., with mygaiadb.utils.healpix_disc_ranges()) which are searched with "
+    "index catwise_healpix12",
+}
+# covering indexes are only suggested if a query reads at most this many columns of a table
+_MAX_COVERING_COLUMNS = 12
+
+_LOOP_RE = re.compile(
+    r"^(?P<op>SCAN|SEARCH)\s+(?:TABLE\s+)?(?P<name>\S+)(?:\s+AS\s+(?P<alias>\S+))?(?:\s+USING\s+(?P<using>.*))?$"
+)
+_USING_RE = re.compile(
+    r"^(?P<kind>(?:AUTOMATIC\s+)?(?:PARTIAL\s+)?(?:COVERING\s+)?INDEX|(?:INTEGER\s+)?PRIMARY\s+KEY)"
+    r"\s*(?P<index>[^\s(]+)?\s*(?:\((?P<constraint>.*)\))?$"
+)
+_FROM_CLAUSE_RE = re.compile(
+    r"\bFROM\b(.*?)(?=\bWHERE\b|\bGROUP\b|\bORDER\b|\bLIMIT\b|\bHAVING\b|\bWINDOW\b|\bUNION\b|\bEXCEPT\b|\bINTERSECT\b|\bSELECT\b|\)|$)",
+    re.IGNORECASE | re.DOTALL,
+)
+_JOIN_RE = re.compile(
+    r",|\b(?:NATURAL\s+)?(?:(?:LEFT|RIGHT|FULL)\s+)?(?:(?:OUTER|INNER|CROSS)\s+)?JOIN\b",
+    re.IGNORECASE,
+)
+_TABLE_REF_RE = re.compile(r"^\s*(?:\w+\.)?(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+_NOT_ALIASES = {"on", "using", "indexed", "not", "natural"}
+
+
+def _table_aliases(query: str) -> dict[str, str]:
+    """
+    Names of tables by their aliases (or names if not aliased) in FROM clauses of a query, all in lower case
+    """
+    aliases = {}
+    for clause in _FROM_CLAUSE_RE.findall(query):
+        for ref in _JOIN_RE.split(clause):
+            m = _TABLE_REF_RE.match(ref)
+            if m is None:
+                continue
+            table, alias = m.group(1).lower(), (m.group(2) or "").lower()
+            aliases[table] = table
+            if alias and alias not in _NOT_ALIASES:
+                aliases[alias] = table
+    return aliases
+
+
+def _columns_read(conn: sqlite3.Connection, query: str) -> dict[str, set[str]]:
+    """
+    Columns of each table read by a query, found with an authorizer while the query is compiled (but not run)
+    """
+    columns = {}
+
+    def authorizer(action, table, column, db_name, trigger):
+        if action == sqlite3.SQLITE_READ and table and column:
+            columns.setdefault(table.lower(), set()).add(column.lower())
+        return sqlite3.SQLITE_OK
+
+    conn.set_authorizer(authorizer)
+    try:
+        conn.execute(f"EXPLAIN QUERY PLAN {query}").fetchall()
+    finally:
+        conn.set_authorizer(None)
+    return columns
+
+
+def _table_indexes(conn: sqlite3.Connection, table: str) -> dict[str, list[str]] | None:
+    """
+    Columns of each index of a big table, None if the database of the table is not attached
+    """
+    schema = _BIG_TABLES[table][0]
+    indexes = {}
+    try:
+        for row in conn.execute(f"PRAGMA {schema}.index_list({table})").fetchall():
+            indexes[row[1]] = [
+                i[2]
+                for i in conn.execute(f"PRAGMA {schema}.index_info({row[1]})").fetchall()
+            ]
+    except sqlite3.Error:
+        return None
+    return indexes
+
+
+def _plan_loops(plan: list[tuple]) -> list[dict]:
+    """
+    Loops (SCAN and SEARCH steps) of an execution plan from ``EXPLAIN QUERY PLAN``, a loop is inner if it runs for each
+    row of another loop, i.e., it comes after another loop in the same subquery or it is in a correlated subquery
+    """
+    nodes = {0: {"inner": False, "n_loops": 0}}
+    loops = []
+    for row in plan:
+        node_id, parent_id, detail = row[0], row[1], row[3]
+        parent = nodes.get(parent_id, nodes[0])
+        inner = parent["inner"] or detail.startswith("CORRELATED")
+        m = _LOOP_RE.match(detail)
+        if m is not None:
+            inner = inner or parent["n_loops"] > 0
+            parent["n_loops"] += 1
+            using = _USING_RE.match(m.group("using") or "")
+            loops.append(
+                {
+                    "detail": detail,
+                    "op": m.group("op"),
+                    "name": (m.group("alias") or m.group("name")).lower(),
+                    "table": m.group("name").lower(),
+                    "kind": "" if using is None else " ".join(using.group("kind").split()),
+                    "index": None if using is None else using.group("index"),
+                    "constraint": None if using is None else using.group("constraint"),
+                    "inner": inner,
+                }
+            )
+        nodes[node_id] = {"inner": inner, "n_loops": 0}
+    return loops
+
+
+def _covering_index(table: str, keys: list[str], columns: set[str]) -> str | None:
+    """
+    Statement to create a covering index of a table with key columns first and then other columns read by a query
+    """
+    columns = keys + sorted(columns - set(keys))
+    if len(columns) > _MAX_COVERING_COLUMNS or len(columns) == 0:
+        return None
+    return (
+        f"CREATE INDEX IF NOT EXISTS {table}_{'_'.join(columns)} ON {table} ({', '.join(columns)}); "
+        f"in the {_BIG_TABLES[table][0]} database"
+    )
+
+
+def _analyze_plan(
+    plan: list[tuple],
+    query: str,
+    columns: dict[str, set[str]] | None = None,
+    indexes: dict[str, dict[str, list[str]]] | None = None,
+) -> list[dict]:
+    """
+    Find steps of an execution plan on big tables which are slow
+
+    Parameters
+    ----------
+    plan : list[tuple]
+        Rows of ``EXPLAIN QUERY PLAN``
+    query : str
+        Query string, to find tables of aliases
+    columns : dict, optional (default=None)
+        Columns read by the query of each table, to suggest covering indexes
+    indexes : dict, optional (default=None)
+        Columns of each index of each big table (None if its database is not attached), to check if existing indexes
+        can be used
+
+    Returns
+    -------
+    findings: list[dict]
+        Findings with keys "severity" ("critical" if the query can take days, "warning" if it scans a big table and
+        "info" for possible improvements), "table", "alias", "detail" (step of the plan), "message" and "suggestion"
+    """
+    aliases = _table_aliases(query)
+    columns = columns or {}
+    indexes = indexes or {}
+    findings = []
+    for loop in _plan_loops(plan):
+        table = aliases.get(loop["name"], loop["table"])
+        if table not in _BIG_TABLES:
+            continue
+        n_rows = _BIG_TABLES[table][1]
+
+        def add(severity, message, suggestion):
+            findings.append(
+                {
+                    "severity": severity,
+                    "table": table,
+                    "alias": loop["name"],
+                    "detail": loop["detail"],
+                    "message": message,
+                    "suggestion": suggestion,
+                }
+            )
+
+        if loop["kind"].startswith("AUTOMATIC"):
+            add(
+                "critical",
+                f"SQLite builds a temporary index of {table} (~{n_rows:,} rows) for this query as the join condition "
+                f"is not on an indexed column",
+                _JOIN_SUGGESTIONS[table],
+            )
+        elif loop["op"] == "SCAN" and loop["inner"]:
+            add(
+                "critical",
+                f"Full scan of {table} (~{n_rows:,} rows) in a nested loop, the whole table is read again for each row "
+                f"of the outer loop",
+                _JOIN_SUGGESTIONS[table],
+            )
+        elif loop["op"] == "SCAN":
+            add(
+                "warning",
+                f"Full scan of {table} (~{n_rows:,} rows)"
+                + (f" with index {loop['index']}" if loop["index"] else ""),
+                _SCAN_SUGGESTIONS[table],
+            )
+        else:  # search with an index
+            read = columns.get(table, set())
+            table_indexes = indexes.get(table)
+            designation_index = _DESIGNATION_INDEXES.get(table)
+            if (
+                designation_index is not None
+                and loop["index"] != designation_index
+                and "designation" in (loop["constraint"] or "")
+            ):
+                if table_indexes is not None and designation_index not in table_indexes:
+                    suggestion = (
+                        f"Index {designation_index} does not exist, create it with "
+                        f"mygaiadb.data.compile_sql_indexes(['{_BIG_TABLES[table][0]}'])"
+                    )
+                elif table_indexes is None or read <= set(table_indexes[designation_index]):
+                    suggestion = f"Add INDEXED BY {designation_index} after {table} in the query"
+                else:
+                    missing = sorted(read - set(table_indexes[designation_index]))
+                    suggestion = f"Index {designation_index} does not have columns {missing} read by the query, remove them from the query"
+                    if (statement := _covering_index(table, ["designation"], read)) is not None:
+                        suggestion += f" or create a covering index: {statement}"
+                add(
+                    "warning",
+                    f"Join with {table} does not use index {designation_index}",
+                    suggestion,
+                )
+            elif (
+                table != "gaia_source"  # rows of gaia_source are too wide to be covered
+                and loop["index"] is not None
+                and "COVERING" not in loop["kind"]
+            ):
+                keys = (table_indexes or {}).get(loop["index"], [])[:1]
+                if (statement := _covering_index(table, keys, read)) is not None:
+                    add(
+                        "info",
+                        f"Rows of {table} are looked up in the table after searching index {loop['index']}, "
+                        f"which is a random read for each row",
+                        f"Create a covering index with all columns read by the query: {statement}",
+                    )
+    return findings
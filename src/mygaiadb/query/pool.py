@@ -0,0 +1,119 @@
+import contextlib
+import pathlib
+import queue
+import sqlite3
+import threading
+
+# pragmas which are set for each attached database instead of once for the connection
+_SCHEMA_PRAGMAS = ("mmap_size", "cache_size")
+_TEMP_STORE_OPTIONS = ("DEFAULT", "FILE", "MEMORY")
+
+
+def _readonly_uri(path: str, immutable: bool = False) -> str:
+    """
+    URI to open a database as read-only, SQLite does not lock or check for changes of an immutable database
+    """
+    uri = f"{pathlib.Path(path).as_uri()}?mode=ro"
+    return f"{uri}&immutable=1" if immutable else uri
+
+
+def _set_pragmas(conn: sqlite3.Connection, pragmas: dict, schemas: list[str]):
+    """
+    Set pragmas of a connection, ``mmap_size`` and ``cache_size`` are set for all schemas
+    """
+    for key, value in pragmas.items():
+        if key in _SCHEMA_PRAGMAS:
+            for schema in schemas:
+                conn.execute(f"PRAGMA {schema}.{key} = {int(value)}")
+        else:
+            conn.execute(f"PRAGMA {key} = {value}")
+
+
+class _ConnectionPool:
+    """
+    Pool of SQLite connections shared by threads. Connections are created by ``connect()`` when needed up to ``size``
+    connections, and a thread waits for a connection to be returned if all of them are in use. A thread which already
+    holds a connection (e.g., while iterating a query) gets the same connection again so it never waits for itself.
+    If given, ``prepare(conn)`` is called each time a connection is checked out (e.g., to attach databases).
+    """
+
+    def __init__(self, connect, size: int, prepare=None):
+        if size < 1:
+            raise ValueError("pool_size must be at least 1")
+        self._connect = connect
+        self._prepare = prepare
+        self.size = size
+        # most recently returned connection first, its page cache is most likely warm
+        self._idle = queue.LifoQueue()
+        self._connections = []
+        self._held = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _checkout(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            create = len(self._connections) < self.size
+            if create:  # reserve a place so other threads do not create more than size connections
+                self._connections.append(None)
+        if not create:
+            return self._idle.get()
+        try:
+            conn = self._connect()
+        except BaseException:
+            with self._lock:
+                self._connections.remove(None)
+            raise
+        with self._lock:
+            self._connections[self._connections.index(None)] = conn
+        return conn
+
+    @contextlib.contextmanager
+    def connection(self):
+        """
+        Context manager to check out a connection from the pool
+        """
+        if self._closed:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        ident = threading.get_ident()
+        with self._lock:
+            held = self._held.get(ident)
+            if held is not None:
+                held[1] += 1
+        if held is None:
+            held = [self._checkout(), 1]
+            with self._lock:
+                self._held[ident] = held
+        try:
+            if self._prepare is not None:
+                self._prepare(held[0])
+            yield held[0]
+        finally:
+            with self._lock:
+                held[1] -= 1
+                release = held[1] == 0
+                if release:
+                    del self._held[ident]
+            if release:
+                self._idle.put(held[0])
+
+    def in_use(self) -> list[sqlite3.Connection]:
+        """
+        Connections which are checked out at the moment
+        """
+        with self._lock:
+            return [i[0] for i in self._held.values()]
+
+    def close(self):
+        """
+        Close all connections, connections in use are closed as well
+        """
+        self._closed = True
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            if conn is not None:
+                conn.close()
@@ -0,0 +1,98 @@
+import contextlib
+import datetime
+import json
+import threading
+import time
+
+# number of SQLite virtual machine instructions between calls of the progress handler when profiling,
+# VM steps are counted in multiples of this
+_PROFILE_HANDLER_STEPS = 1000
+
+
+class _QueryProfiler:
+    """
+    Record wall time, number of rows and bytes of each stage of a query, stages can be recorded from multiple threads
+    (e.g., formatting csv in the pipeline of ``save_csv()``) and the time of each thread is added up
+    """
+
+    enabled = True
+
+    def __init__(self, query: str, method: str):
+        self.report = {
+            "method": method,
+            "query": query,
+            "start": datetime.datetime.now().isoformat(),
+            "total_time": None,
+            "stages": {},
+            "vm_steps": 0,
+            "plan": [],
+            "error": None,
+        }
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float, rows: int = 0, nbytes: int = 0):
+        with self._lock:
+            stage = self.report["stages"].setdefault(
+                name, {"time": 0.0, "rows": 0, "bytes": 0}
+            )
+            stage["time"] += seconds
+            stage["rows"] += int(rows)
+            stage["bytes"] += int(nbytes)
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """
+        Context to time a stage, number of rows and bytes can be set in the yielded dict
+        """
+        record = {"rows": 0, "bytes": 0}
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            self.add(name, time.perf_counter() - start, record["rows"], record["bytes"])
+
+    def add_vm_steps(self, n_steps: int):
+        with self._lock:
+            self.report["vm_steps"] += n_steps
+
+    def set_plan(self, plan: list[tuple]):
+        # rows of EXPLAIN QUERY PLAN are (id, parent, notused, detail)
+        self.report["plan"] = [
+            {"id": i[0], "parent": i[1], "detail": i[3]} for i in plan
+        ]
+
+    def finish(self, error: BaseException | None = None) -> dict:
+        self.report["total_time"] = time.perf_counter() - self._start
+        if error is not None:
+            self.report["error"] = repr(error)
+        return self.report
+
+
+class _NullProfiler:
+    """
+    Profiler which records nothing, used when profiling is off so queries do not need to check
+    """
+
+    enabled = False
+
+    def add(self, name: str, seconds: float, rows: int = 0, nbytes: int = 0):
+        pass
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        yield {"rows": 0, "bytes": 0}
+
+    def add_vm_steps(self, n_steps: int):
+        pass
+
+
+_NULL_PROFILER = _NullProfiler()
+
+
+def _append_log(filename: str, report: dict):
+    """
+    Append a report to a JSON Lines file
+    """
+    with open(filename, "a") as f:
+        f.write(json.dumps(report, default=str) + "\n")
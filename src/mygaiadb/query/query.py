@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 import contextlib
 import os
 import re
@@ -5,21 +7,197 @@ import sqlite3
 import stat
 import sys
 import sysconfig
+import threading
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from queue import Queue
+from typing import TYPE_CHECKING
 
-import pandas as pd
-from tqdm import tqdm
-
-from mygaiadb import (
-    __version__,
-    allwise_sql_db_path,
-    catwise_sql_db_path,
-    gaia_sql_db_path,
-    mygaiadb_default_db,
-    mygaiadb_usertable_db,
-    tmass_sql_db_path,
-    mygaiadb_path,
-)
+import numpy as np
+from numpy.typing import ArrayLike
+
+import mygaiadb
+from mygaiadb import __version__, mygaiadb_path
+from mygaiadb.query.adql import _register_adql_functions, translate_adql
+from mygaiadb.query.cache import QueryCache
 from mygaiadb.query.callbacks import QueryCallback
+from mygaiadb.query.export import _H5TableWriter, _sql_to_arrow_type, _to_arrow_array
+from mygaiadb.query.profile import (
+    _NULL_PROFILER,
+    _PROFILE_HANDLER_STEPS,
+    _QueryProfiler,
+    _append_log,
+)
+from mygaiadb.query.plan import _BIG_TABLES, _analyze_plan, _columns_read, _table_indexes
+from mygaiadb.query.pool import (
+    _SCHEMA_PRAGMAS,
+    _TEMP_STORE_OPTIONS,
+    _ConnectionPool,
+    _readonly_uri,
+    _set_pragmas,
+)
+from mygaiadb.query.xmatch import _XMATCH_CATALOGS
+from mygaiadb.query.xmatch import positional_xmatch as _positional_xmatch
+from mygaiadb.utils import _angular_distance, _radec_to_vec, healpix_disc_ranges
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from tqdm import tqdm
+
+# maximum number of source_id ranges in one statement, 2 parameters each
+# to stay below the default limit of 999 parameters in old SQLite
+_CONE_SEARCH_MAX_RANGES = 400
+# types of chunks in iter_query()
+_ITER_QUERY_TYPES = ["pandas", "numpy", "arrow"]
+# number of ids inserted in one executemany() call in xmatch()
+_XMATCH_BATCH_SIZE = 1_000_000
+# number of SQLite virtual machine instructions between calls of the progress handler for timeout and max_vm_steps
+_PROGRESS_HANDLER_STEPS = 10000
+
+
+# names of paths in mygaiadb of databases which can be attached by LocalGaiaSQL, paths are only resolved when needed
+_ATTACHABLE_DB_PATHS = {
+    "gaiadr3": "gaia_sql_db_path",
+    "user_table": "mygaiadb_usertable_db",
+    "tmass": "tmass_sql_db_path",
+    "allwise": "allwise_sql_db_path",
+    "catwise": "catwise_sql_db_path",
+}
+# optional catalogs in the order they are attached, and references to them (e.g., ``tmass.twomass_psc``) in queries
+_CATALOG_DB_NAMES = ("tmass", "allwise", "catwise")
+_CATALOG_REFERENCE_RE = re.compile(r"\b(tmass|allwise|catwise)\s*\.", re.IGNORECASE)
+# name of the view of a partition of gaia_source in parallel_query()
+_PARTITION_VIEW = "mygaiadb_partition"
+
+
+def _db_path(name: str):
+    """
+    Path of an attachable database
+    """
+    return getattr(mygaiadb, _ATTACHABLE_DB_PATHS[name])
+
+
+def _connect_readonly(
+    db_names: list[str],
+    load_ext: bool,
+    check_same_thread: bool = True,
+    immutable: bool = False,
+    pragmas: dict | None = None,
+) -> sqlite3.Connection:
+    """
+    Connection with Gaia DR3 as the main database like ``LocalGaiaSQL``, all databases are opened and attached as read-only,
+    catalogs are opened as immutable if immutable is True (user tables never are as they can be changed)
+    """
+    conn = sqlite3.connect(
+        _readonly_uri(mygaiadb.gaia_sql_db_path, immutable),
+        uri=True,
+        check_same_thread=check_same_thread,
+    )
+    try:
+        conn.create_function(
+            "mygaiadb_version", 0, lambda: __version__, deterministic=True
+        )
+        _register_adql_functions(conn)
+        if load_ext:
+            LocalGaiaSQL._load_sqlite3_ext(conn)
+        for name in db_names:
+            uri = _readonly_uri(
+                _db_path(name), immutable and name != "user_table"
+            )
+            conn.execute(f"""ATTACH DATABASE '{uri}' AS {name}""")
+        _set_pragmas(conn, pragmas or {}, ["main"] + db_names)
+    except BaseException:
+        conn.close()
+        raise
+    return conn
+
+
+@contextlib.contextmanager
+def _remove_on_error(filename: str):
+    """
+    Remove a file if anything in the context fails, e.g., a partially written export
+    """
+    try:
+        yield
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(filename)
+        raise
+
+
+def _query_partition(
+    query: str,
+    first_rowid: int,
+    last_rowid: int,
+    db_names: list[str],
+    load_ext: bool,
+    immutable: bool,
+    pragmas: dict,
+) -> pd.DataFrame:
+    """
+    Run a query in a worker process with gaiadr3.gaia_source restricted to rowid between first_rowid and last_rowid,
+    databases are attached as read-only
+    """
+    import pandas as pd
+
+    conn = _connect_readonly(db_names, load_ext, immutable=immutable, pragmas=pragmas)
+    try:
+        # SQLite flattens the view into the query so the rowid range is a range scan on the table itself
+        conn.execute(
+            f"""CREATE TEMP VIEW {_PARTITION_VIEW} AS
+            SELECT * FROM gaiadr3.gaia_source WHERE rowid BETWEEN {int(first_rowid)} AND {int(last_rowid)}"""
+        )
+        return pd.read_sql_query(
+            _GAIA_SOURCE_PATTERN.sub(f"temp.{_PARTITION_VIEW}", query), conn
+        )
+    finally:
+        conn.close()
+
+
+def _xmatch_query(query: str, id_column: str) -> str:
+    """
+    Query joining ids in xmatch.ids with the result of a query. The query is flattened into the join by SQLite, and
+    CROSS JOIN keeps xmatch.ids as the outer loop so the query is searched for each id instead of scanned (SQLite would
+    reorder an INNER JOIN to scan e.g. gaia_source if the query has a WHERE clause or an INNER JOIN)
+    """
+    return f"""
+    SELECT Q.*
+    FROM xmatch.ids as X
+    CROSS JOIN ({query}) as Q on Q.{id_column} = X.source_id
+    """
+
+
+_GAIA_SOURCE_PATTERN = re.compile(r"\bgaiadr3\.gaia_source\b", re.IGNORECASE)
+# clauses which give different result if the query is run on partitions separately
+_NOT_PARTITIONABLE_PATTERN = re.compile(
+    r"\b(LIMIT|GROUP\s+BY|ORDER\s+BY|DISTINCT|UNION|INTERSECT|EXCEPT|OVER)\b", re.IGNORECASE
+)
+# string literals and quoted identifiers, which can have parentheses or keywords in them
+_QUOTED_PATTERN = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"")
+
+
+def _partition_error(conn: sqlite3.Connection, query: str) -> str | None:
+    """
+    Reason why a query gives different result if it is run on partitions of gaiadr3.gaia_source separately, None if it
+    is row-wise. gaia_source must be referenced once in the outer query (not in a subquery or a self-join), and the query
+    cannot aggregate (checked with the bytecode of the query so aggregate functions are told from scalar functions)
+    """
+    stripped = _QUOTED_PATTERN.sub("''", query)
+    refs = list(_GAIA_SOURCE_PATTERN.finditer(stripped))
+    if len(refs) == 0:
+        return "Query must be on gaiadr3.gaia_source to be partitioned"
+    if len(refs) > 1:
+        return "Query referencing gaiadr3.gaia_source more than once (e.g., a self-join or a subquery) cannot be partitioned"
+    before = stripped[: refs[0].start()]
+    if before.count("(") != before.count(")"):
+        return "Query referencing gaiadr3.gaia_source in a subquery cannot be partitioned"
+    if (m := _NOT_PARTITIONABLE_PATTERN.search(stripped)) is not None:
+        return f"Query with {' '.join(m.group(1).upper().split())} cannot be partitioned"
+    opcodes = [i[1] for i in conn.execute(f"EXPLAIN {query}").fetchall()]
+    if any(i.startswith("Agg") for i in opcodes):
+        return "Query with aggregate functions cannot be partitioned"
+    return None
 
 
 class LocalGaiaSQL:
@@ -36,6 +214,34 @@ class LocalGaiaSQL:
         Whether to load sqlite extension
     readonly_guard : bool, optional (default=True)
         Whether to ensure the databases are read-only
+    cache : QueryCache or bool, optional (default=None)
+        Cache of results of ``query()`` and ``iter_query()`` (requires pyarrow), ``True`` for a ``QueryCache`` in
+        ``~/.mygaiadb/query_cache`` with default settings or None to not cache results
+    pool_size : int, optional (default=4)
+        Maximum number of read-only connections in the pool used by queries, so up to ``pool_size`` queries can be run
+        at the same time from different threads. Connections are created when needed and reused
+    immutable : bool, optional (default=False)
+        Whether to open the catalogs as read-only immutable databases, so SQLite does not lock or check for changes of the
+        files (e.g., on network file systems). Only use this if the catalogs are not being changed. User tables are never immutable
+    mmap_size : int, optional (default=None)
+        Maximum number of bytes of each database to read with memory-mapped I/O, SQLite default if None
+    cache_size : int, optional (default=None)
+        Page cache size of each database, number of pages if positive or KiB if negative, SQLite default if None
+    temp_store : str, optional (default=None)
+        Where temporary tables and indices (e.g., for sorting) are stored, one of "DEFAULT", "FILE" and "MEMORY", SQLite default if None
+    threads : int, optional (default=None)
+        Maximum number of auxiliary threads SQLite can use for a query (e.g., for sorting), SQLite default if None
+    profile : bool, optional (default=False)
+        Whether to profile ``query()``, ``iter_query()``, ``save_csv()``, ``save_parquet()``, ``save_feather()`` and
+        ``save_hdf5()``, the report of the last query is ``last_profile``
+    profile_log : str, optional (default=None)
+        JSON Lines file to append reports to if profiling
+    check_plan : bool, optional (default=True)
+        Whether to warn before running a query which can take days according to its execution plan (e.g., a big table
+        is scanned for each row of another table), see ``analyze_query()``
+    lazy_attach : bool, optional (default=False)
+        Whether to attach 2MASS, ALLWISE and CATWISE databases when a query first references them (e.g., ``tmass.``)
+        instead of when this instance is created, their files are only checked (and set read-only) then
     """
 
     def __init__(
@@ -45,26 +251,75 @@ class LocalGaiaSQL:
         load_catwise: bool = True,
         load_ext: bool = True,
         readonly_guard: bool = True,
+        cache: QueryCache | bool | None = None,
+        pool_size: int = 4,
+        immutable: bool = False,
+        mmap_size: int | None = None,
+        cache_size: int | None = None,
+        temp_store: str | None = None,
+        threads: int | None = None,
+        profile: bool = False,
+        profile_log: str | None = None,
+        check_plan: bool = True,
+        lazy_attach: bool = False,
     ):
         self.load_tmass = load_tmass
         self.load_allwise = load_allwise
         self.load_catwise = load_catwise
         self.load_ext = load_ext
         self.readonly_guard = readonly_guard
+        self.cache = QueryCache() if cache is True else cache or None
+        self.immutable = immutable
+        if temp_store is not None and temp_store.upper() not in _TEMP_STORE_OPTIONS:
+            raise ValueError(
+                f"temp_store must be one of {list(_TEMP_STORE_OPTIONS)} but got {temp_store}"
+            )
+        pragmas = {
+            "mmap_size": mmap_size,
+            "cache_size": cache_size,
+            "temp_store": None if temp_store is None else temp_store.upper(),
+            "threads": threads,
+        }
+        self.pragmas = {k: v for k, v in pragmas.items() if v is not None}
+        self.profile = profile
+        self.profile_log = profile_log
+        self.last_profile = None
+        self.check_plan = check_plan
+        self.lazy_attach = lazy_attach
         self.attached_db_name = []
+        # optional catalogs to attach, all of them are attached now unless lazy_attach
+        self._catalog_names = [
+            name
+            for name, load in zip(_CATALOG_DB_NAMES, (load_tmass, load_allwise, load_catwise))
+            if load
+        ]
+        self._attach_lock = threading.Lock()
+        # number of calls of cancel() and progress handlers of connections running queries with limits
+        self._cancel_count = 0
+        self._progress_handlers = {}
 
         # flag for windows or not
         self.win32 = sys.platform.startswith("win32")
 
         self.conn, self.cursor = self._load_db()
+        # thread of the main connection, which can only be used in this thread
+        self._conn_thread = threading.get_ident()
+        # connections with databases attached and extension loaded for queries from any thread
+        self._pool = _ConnectionPool(
+            lambda: _connect_readonly(
+                self._readonly_db_names(),
+                self.load_ext,
+                check_same_thread=False,
+                immutable=self.immutable,
+                pragmas=self.pragmas,
+            ),
+            pool_size,
+            prepare=self._attach_missing if lazy_attach else None,
+        )
 
-        # ipython Auto-completion
-        try:
-            from IPython import get_ipython
-        except ImportError:
-            pass
-        else:
-            if (ipy := get_ipython()) is not None:
+        # ipython Auto-completion, only if running in IPython so IPython is not imported otherwise
+        if (ipython := sys.modules.get("IPython")) is not None:
+            if (ipy := ipython.get_ipython()) is not None:
 
                 def list_all_tables_completer(ipython, event):
                     out = self.list_all_tables()
@@ -118,6 +373,154 @@ class LocalGaiaSQL:
             df[callback.new_col_name] = callback(**func_dist)
         return df
 
+    def _readonly_db_names(self) -> list[str]:
+        """
+        Names of databases attached to read-only connections
+        """
+        return ["gaiadr3", "user_table"] + [
+            i for i in self.attached_db_name if i != "gaiadr3"
+        ]
+
+    def cancel(self):
+        """
+        Cancel all queries running at the moment, can be called from another thread (e.g., a signal handler or a GUI).
+        Cancelled queries raise ``InterruptedError`` and partially written files are removed
+        """
+        self._cancel_count += 1
+        for conn in self._pool.in_use():
+            conn.interrupt()
+        self.conn.interrupt()
+
+    @contextlib.contextmanager
+    def _query_limits(
+        self,
+        conn: sqlite3.Connection,
+        timeout: float | None,
+        max_vm_steps: int | None,
+        profiler=_NULL_PROFILER,
+    ):
+        """
+        Context to run queries on a connection with a timeout in seconds and a maximum number of virtual machine
+        instructions with a progress handler, queries are interrupted and ``TimeoutError`` is raised if exceeded.
+        ``InterruptedError`` is raised if queries are cancelled by ``cancel()``. The progress handler also counts
+        virtual machine instructions for the profiler if profiling
+        """
+        cancel_count = self._cancel_count
+        exceeded = []
+        outer = self._progress_handlers.get(conn)
+        n_steps = 0
+        if timeout is not None or max_vm_steps is not None or profiler.enabled:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            interval = (
+                _PROFILE_HANDLER_STEPS if profiler.enabled else _PROGRESS_HANDLER_STEPS
+            )
+
+            def handler():
+                nonlocal n_steps
+                # a handler of an outer query on the same connection (e.g., iter_query) still applies
+                if outer is not None and outer[0]():
+                    return 1
+                n_steps += interval
+                if max_vm_steps is not None and n_steps > max_vm_steps:
+                    exceeded.append(f"Query exceeded {max_vm_steps} VM steps")
+                    return 1
+                if deadline is not None and time.monotonic() > deadline:
+                    exceeded.append(f"Query exceeded timeout of {timeout} seconds")
+                    return 1
+                return 0
+
+            self._progress_handlers[conn] = (handler, interval)
+            conn.set_progress_handler(handler, interval)
+        try:
+            yield
+        except Exception as e:
+            if exceeded:
+                raise TimeoutError(exceeded[0]) from e
+            elif self._cancel_count != cancel_count and "interrupted" in str(e):
+                raise InterruptedError("Query was cancelled") from e
+            raise
+        finally:
+            profiler.add_vm_steps(n_steps)
+            if self._progress_handlers.get(conn) is not outer:
+                if outer is None:
+                    del self._progress_handlers[conn]
+                    conn.set_progress_handler(None, 0)
+                else:
+                    self._progress_handlers[conn] = outer
+                    conn.set_progress_handler(*outer)
+
+    @contextlib.contextmanager
+    def _profiling(self, query: str, method: str, conn: sqlite3.Connection):
+        """
+        Context to profile a query with the query plan if profiling, otherwise a profiler which records nothing is yielded.
+        The report is ``last_profile`` and appended to ``profile_log`` when the context exits, with the error if any
+        """
+        if not self.profile:
+            yield _NULL_PROFILER
+            return
+        profiler = _QueryProfiler(query, method)
+        with contextlib.suppress(sqlite3.Error):  # error of the query itself is raised when it is run
+            profiler.set_plan(conn.execute(f"EXPLAIN QUERY PLAN {query}").fetchall())
+        error = None
+        try:
+            yield profiler
+        except GeneratorExit:  # generator closed before the end
+            raise
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self.last_profile = profiler.finish(error)
+            if self.profile_log is not None:
+                _append_log(self.profile_log, self.last_profile)
+
+    @staticmethod
+    def _read_sql_in_stages(conn: sqlite3.Connection, query: str, profiler):
+        """
+        Same as ``pandas.read_sql_query()`` but with execution, fetching and DataFrame construction profiled separately
+        """
+        import pandas as pd
+
+        cursor = conn.cursor()
+        try:
+            with profiler.stage("execute"):
+                cursor.execute(query)
+            with profiler.stage("fetch") as stage:
+                results = cursor.fetchall()
+                stage["rows"] = len(results)
+            with profiler.stage("dataframe") as stage:
+                _df = pd.DataFrame.from_records(
+                    results,
+                    columns=[d[0] for d in cursor.description],
+                    coerce_float=True,
+                )
+                stage["rows"] = len(_df)
+                stage["bytes"] = _df.memory_usage(index=False).sum()
+        finally:
+            cursor.close()
+        return _df
+
+    def close(self):
+        """
+        Close the connection and all connections in the pool
+        """
+        self._pool.close()
+        self.conn.close()
+
+    def _cache_key(self, query: str, callbacks: list[QueryCallback] | None) -> str:
+        """
+        Key of a query in the cache, results are invalidated when any attached database (including user tables) is changed
+        """
+        return self.cache.key(
+            query,
+            callbacks,
+            [
+                _db_path(i)
+                for i in ["user_table", "gaiadr3"] + self._catalog_names
+                if i in self.attached_db_name or os.path.exists(_db_path(i))
+            ],
+        )
+
     def _read_only(self, file_path):
         # set read only premission for all loaded dataset to prevent accidental change
         os.chmod(file_path, stat.S_IREAD if self.win32 else 0o444)
@@ -152,6 +555,11 @@ class LocalGaiaSQL:
             query = re.sub(r"[']\s?\b(f)\b\s?[']", "0 ", query, flags=re.IGNORECASE)
             query = re.sub(r"[']\s?\b(true)\b\s?[']", "1 ", query, flags=re.IGNORECASE)
             query = re.sub(r"[']\s?\b(false)\b\s?[']", "0 ", query, flags=re.IGNORECASE)
+
+            # turn ADQL geometry functions to HEALPix ranges and exact checks
+            query = translate_adql(query)
+            if self.lazy_attach:
+                self._attach_catalogs(_CATALOG_REFERENCE_RE.findall(query))
             if "query" in kwargs:  # put the processed query back
                 kwargs["query"] = query
             else:
@@ -166,11 +574,16 @@ class LocalGaiaSQL:
         """
         Get SQL database connection and cursor used in this work for Gaia DR3 as the main table; 2MASS, ALLWISE and gaia astrophysical parameters as virtual tables
         """
-        self._file_exist(mygaiadb_default_db)
-        conn = sqlite3.connect(gaia_sql_db_path)
+        self._file_exist(mygaiadb.mygaiadb_default_db)
+        gaia_sql_db_path = mygaiadb.gaia_sql_db_path
+        if self.immutable:
+            conn = sqlite3.connect(_readonly_uri(gaia_sql_db_path, True), uri=True)
+        else:
+            conn = sqlite3.connect(gaia_sql_db_path)
         conn.create_function(
             "mygaiadb_version", 0, lambda: __version__, deterministic=True
         )
+        _register_adql_functions(conn)
         c = conn.cursor()
         if self.load_ext:
             self._load_sqlite3_ext(conn)
@@ -179,36 +592,73 @@ class LocalGaiaSQL:
         self._file_exist(gaia_sql_db_path)
         if self.readonly_guard:
             self._read_only(gaia_sql_db_path)  # set read-only before loading it
-        c.execute(f"""ATTACH DATABASE '{gaia_sql_db_path}' AS gaiadr3""")
+        c.execute(
+            f"""ATTACH DATABASE '{self._attach_path(gaia_sql_db_path)}' AS gaiadr3"""
+        )
         self.attached_db_name.append("gaiadr3")
-        self._file_exist(mygaiadb_usertable_db)
+        self._file_exist(mygaiadb.mygaiadb_usertable_db)
         c.execute(
-            f"""ATTACH DATABASE '{mygaiadb_usertable_db}' AS user_table"""
+            f"""ATTACH DATABASE '{mygaiadb.mygaiadb_usertable_db}' AS user_table"""
         )  # don't read-only
+        # in-memory database for tables only needed in this session, e.g., source_id in xmatch()
+        c.execute("""ATTACH DATABASE ':memory:' AS xmatch""")
         # ======================= must load table =======================
 
         # ======================= optional table =======================
-        if self.load_tmass:
-            self._file_exist(tmass_sql_db_path)
-            if self.readonly_guard:
-                self._read_only(tmass_sql_db_path)  # set read-only before loading it
-            c.execute(f"""ATTACH DATABASE '{tmass_sql_db_path}' AS tmass""")
-            self.attached_db_name.append("tmass")
-        if self.load_allwise:
-            self._file_exist(allwise_sql_db_path)
-            if self.readonly_guard:
-                self._read_only(allwise_sql_db_path)  # set read-only before loading it
-            c.execute(f"""ATTACH DATABASE '{allwise_sql_db_path}' AS allwise""")
-            self.attached_db_name.append("allwise")
-        if self.load_catwise:
-            self._file_exist(catwise_sql_db_path)
-            if self.readonly_guard:
-                self._read_only(catwise_sql_db_path)  # set read-only before loading it
-            c.execute(f"""ATTACH DATABASE '{catwise_sql_db_path}' AS catwise""")
-            self.attached_db_name.append("catwise")
+        if not self.lazy_attach:
+            for name in self._catalog_names:
+                self._check_catalog(name)
+                c.execute(
+                    f"""ATTACH DATABASE '{self._attach_path(_db_path(name))}' AS {name}"""
+                )
+                self.attached_db_name.append(name)
         # ======================= optional table =======================
+        _set_pragmas(conn, self.pragmas, ["main", "user_table"] + self.attached_db_name)
         return conn, c
 
+    def _check_catalog(self, name: str):
+        """
+        Check the database of an optional catalog exists and set it read-only before attaching it
+        """
+        path = _db_path(name)
+        self._file_exist(path)
+        if self.readonly_guard:
+            self._read_only(path)  # set read-only before loading it
+
+    def _attach_catalogs(self, names: list[str]):
+        """
+        Attach optional catalogs which are not attached yet if lazy_attach, the main connection attaches them now if
+        this is its thread and connections of the pool attach them when they are checked out
+        """
+        names = {i.lower() for i in names}
+        with self._attach_lock:
+            for name in self._catalog_names:
+                if name in names and name not in self.attached_db_name:
+                    self._check_catalog(name)
+                    self.attached_db_name.append(name)
+        if threading.get_ident() == self._conn_thread:
+            self._attach_missing(self.conn, readonly=False)
+
+    def _attach_missing(self, conn: sqlite3.Connection, readonly: bool = True):
+        """
+        Attach catalogs in attached_db_name which are not attached to a connection yet
+        """
+        attached = {i[1] for i in conn.execute("""PRAGMA database_list""")}
+        for name in list(self.attached_db_name):
+            if name not in attached:
+                path = _db_path(name)
+                uri = _readonly_uri(path, self.immutable) if readonly else self._attach_path(path)
+                conn.execute(f"""ATTACH DATABASE '{uri}' AS {name}""")
+                _set_pragmas(
+                    conn,
+                    {k: v for k, v in self.pragmas.items() if k in _SCHEMA_PRAGMAS},
+                    [name],
+                )
+
+    def _attach_path(self, file_path):
+        # catalogs are attached with URI if immutable, connection is opened with URI in that case
+        return _readonly_uri(file_path, True) if self.immutable else file_path
+
     @staticmethod
     def _load_sqlite3_ext(c):
         c.enable_load_extension(True)
@@ -220,6 +670,121 @@ class LocalGaiaSQL:
         else:
             raise ImportError("MyGaiaDB SQL C extension not found at " + str(_lib))
 
+    def _csv_text(
+        self,
+        results: list[tuple],
+        header: list[str],
+        callbacks: list[QueryCallback] | None,
+        first: bool,
+        profiler=_NULL_PROFILER,
+    ) -> tuple[str, int]:
+        """
+        Turn rows to csv text (with header row if first) and number of rows, after callbacks are applied
+        """
+        return self._csv_format(
+            self._csv_frame(results, header, callbacks, profiler), first, profiler
+        )
+
+    def _csv_frame(
+        self,
+        results: list[tuple],
+        header: list[str],
+        callbacks: list[QueryCallback] | None,
+        profiler=_NULL_PROFILER,
+    ) -> pd.DataFrame:
+        """
+        Turn rows to pandas dataframe with callbacks applied
+        """
+        import pandas as pd
+
+        with profiler.stage("dataframe") as stage:
+            _df = pd.DataFrame(results, columns=header)
+            stage["rows"] = len(_df)
+            stage["bytes"] = _df.memory_usage(index=False).sum()
+        if callbacks is not None:
+            with profiler.stage("callbacks") as stage:
+                _df = self._result_after_callbacks(_df, callbacks)
+                stage["rows"] = len(_df)
+        return _df
+
+    @staticmethod
+    def _csv_format(
+        _df: pd.DataFrame, first: bool, profiler=_NULL_PROFILER
+    ) -> tuple[str, int]:
+        """
+        Turn a dataframe to csv text (with header row if first) and number of rows
+        """
+        with profiler.stage("format") as stage:
+            text = _df.to_csv(None, index=False, header=first, lineterminator="\n")
+            stage["rows"], stage["bytes"] = len(_df), len(text)
+        return text, len(_df)
+
+    def _write_csv_pipelined(
+        self,
+        cursor: sqlite3.Cursor,
+        f,
+        header: list[str],
+        chunksize: int,
+        callbacks: list[QueryCallback] | None,
+        n_workers: int,
+        queue_depth: int,
+        pbar: tqdm,
+        profiler=_NULL_PROFILER,
+    ):
+        """
+        Write result of the executed query in cursor to a csv file in a pipeline: this thread fetches rows from SQLite,
+        a single thread turns chunks into dataframes and applies callbacks in order (callbacks are not required to be
+        thread-safe), a pool of n_workers threads turns dataframes into csv text, and a writer thread appends the text
+        to the file in order. At most queue_depth chunks are waiting to be written so memory usage is bounded.
+        """
+
+        def to_frame(results):
+            return self._csv_frame(results, header, callbacks, profiler)
+
+        def to_csv_text(frame, first):
+            return self._csv_format(frame.result(), first, profiler)
+
+        write_queue = Queue(maxsize=queue_depth)
+        errors = []
+
+        def writer():
+            while (future := write_queue.get()) is not None:
+                if errors:  # keep draining the queue so the fetching thread is not blocked
+                    continue
+                try:
+                    text, n_rows = future.result()
+                    with profiler.stage("write") as stage:
+                        f.write(text)
+                        stage["rows"], stage["bytes"] = n_rows, len(text)
+                    pbar.update(n_rows)
+                except BaseException as e:
+                    errors.append(e)
+
+        writer_thread = threading.Thread(target=writer, daemon=True)
+        writer_thread.start()
+        try:
+            # pool of formatting threads is shut down first as its tasks wait for dataframes
+            with (
+                ThreadPoolExecutor(max_workers=1) as frame_pool,
+                ThreadPoolExecutor(max_workers=n_workers) as pool,
+            ):
+                first_flag = True
+                while not errors:  # looping until the end
+                    with profiler.stage("fetch") as stage:
+                        results = cursor.fetchmany(chunksize)
+                        stage["rows"] = len(results)
+                    if results == []:
+                        break
+                    # blocks when queue_depth chunks are waiting to be written
+                    frame = frame_pool.submit(to_frame, results)
+                    write_queue.put(pool.submit(to_csv_text, frame, first_flag))
+                    first_flag = False
+        finally:
+            write_queue.put(None)
+            writer_thread.join()
+        if errors:
+            raise errors[0]
+
     @preprocess_query
     def save_csv(
         self,
@@ -229,6 +794,10 @@ class LocalGaiaSQL:
         overwrite: bool = True,
         callbacks: list[QueryCallback] | None = None,
         comments: bool = True,
+        n_workers: int = 1,
+        queue_depth: int = 4,
+        timeout: float | None = None,
+        max_vm_steps: int | None = None,
     ):
         """
         Given query, save the fetchall() result to csv, "chunksize" number of rows at each time until finished
@@ -247,62 +816,426 @@ class LocalGaiaSQL:
             List of mygaiadb callbacks
         comments : bool, optional, default=True
             Whether to save the query as comment lines in csv file
+        n_workers : int, optional, default=1
+            Number of threads to format chunks to csv text. If larger than 1, fetching rows, applying callbacks, formatting
+            and writing to the file are done at the same time in a pipeline, the file is the same as with ``n_workers=1``.
+            Callbacks are applied to chunks one at a time in a single thread, so they do not need to be thread-safe
+        queue_depth : int, optional, default=4
+            Maximum number of formatted chunks waiting to be written if ``n_workers`` is larger than 1
+        timeout : float, optional, default=None
+            Maximum time in seconds to run the query, ``TimeoutError`` is raised and the file is removed if exceeded
+        max_vm_steps : int, optional, default=None
+            Maximum number of SQLite virtual machine instructions to run the query, ``TimeoutError`` is raised and the
+            file is removed if exceeded
 
         Returns
         -------
         None
         """
-        self.cursor.execute(query)
+        from tqdm import tqdm
+
+        self._warn_slow_query(query)
+        with (
+            self._pool.connection() as conn,
+            contextlib.closing(conn.cursor()) as cursor,
+            self._profiling(query, "save_csv", conn) as profiler,
+            self._query_limits(conn, timeout, max_vm_steps, profiler),
+        ):
+            with profiler.stage("execute"):
+                cursor.execute(query)
+            if os.path.exists(filename) and not overwrite:
+                raise FileExistsError(f"{os.path.abspath(filename)} already existed!")
+            # a partially written file is removed if the query fails, times out or is cancelled
+            with _remove_on_error(filename), open(filename, "w") as f:
+                if comments:
+                    comment_char = "# "
+                    query_commented = query.replace("\n", "\n" + comment_char)
+                    if "\n" in query_commented[:1]:
+                        # in case the first character is new line
+                        query_commented = query_commented[1:]
+                    else:
+                        # in case the first character is NOT new line so we need to add comment in the first line
+                        query_commented = comment_char + query_commented
+                    if "\n" in query_commented[-3:-2]:
+                        # in case the last character is new line, so will mess up the csv header
+                        query_commented = query_commented[:-2]
+                    else:
+                        # if not we need to add a new line so header wont be in the comment line
+                        query_commented = query_commented + "\n"
+                    f.write(query_commented)
+                # write header rows
+                header_og = [d[0] for d in cursor.description]
+                if callbacks is not None:
+                    header_big = [d[0] for d in cursor.description]
+                    header_big.extend([i.new_col_name for i in callbacks])
+                    self._check_callbacks_header(header_og, callbacks)
+                else:
+                    header_big = header_og
+                first_flag = True
+                with tqdm(unit=" rows") as pbar:
+                    pbar.set_description_str("Rows written: ")
+                    if n_workers > 1:
+                        self._write_csv_pipelined(
+                            cursor,
+                            f,
+                            header_og,
+                            chunksize,
+                            callbacks,
+                            n_workers,
+                            queue_depth,
+                            pbar,
+                            profiler,
+                        )
+                    else:
+                        while True:  # looping until the end
+                            with profiler.stage("fetch") as stage:
+                                results = cursor.fetchmany(chunksize)
+                                stage["rows"] = len(results)
+                            if results == []:
+                                break
+                            text, n_rows = self._csv_text(
+                                results, header_og, callbacks, first_flag, profiler
+                            )
+                            with profiler.stage("write") as stage:
+                                f.write(text)
+                                stage["rows"], stage["bytes"] = n_rows, len(text)
+                            first_flag = False
+                            pbar.update(n_rows)
+        return None
+
+    def _query_columns(self, query: str) -> tuple[list[str], list[str]]:
+        """
+        Unique names (e.g., second "source_id" is "source_id:1") and declared types in SQL schema of columns in query result,
+        declared types are empty string for columns which are not table columns
+        """
+        with self._pool.connection() as conn:
+            conn.execute("""DROP VIEW IF EXISTS temp.mygaiadb_decltypes""")
+            # SQLite keeps declared types of columns in views
+            conn.execute(
+                f"""CREATE TEMP VIEW mygaiadb_decltypes AS {query.strip().rstrip(";")}"""
+            )
+            try:
+                info = conn.execute(
+                    """PRAGMA temp.table_info(mygaiadb_decltypes)"""
+                ).fetchall()
+                return [i[1] for i in info], [i[2] for i in info]
+            finally:
+                conn.execute("""DROP VIEW temp.mygaiadb_decltypes""")
+
+    def _iter_arrow_tables(
+        self,
+        query: str,
+        chunksize: int,
+        callbacks: list[QueryCallback] | None,
+        timeout: float | None = None,
+        max_vm_steps: int | None = None,
+        profiler=_NULL_PROFILER,
+    ):
+        """
+        Generator of pyarrow tables of query result in chunks with the same schema, types are from SQL schema if the columns
+        are table columns or from the first chunk otherwise. A table without rows is yielded if the result is empty.
+        """
+        import pyarrow as pa
+
+        names, decltypes = self._query_columns(query)
+        arrow_types = [_sql_to_arrow_type(i) for i in decltypes]
+        self._warn_slow_query(query)
+        with (
+            self._pool.connection() as conn,
+            self._query_limits(conn, timeout, max_vm_steps, profiler),
+        ):
+            cursor = conn.cursor()
+            try:
+                with profiler.stage("execute"):
+                    cursor.execute(query)
+                header = [d[0] for d in cursor.description]
+                if callbacks is not None:
+                    self._check_callbacks_header(header, callbacks)
+                schema = None
+                while True:  # looping until the end
+                    with profiler.stage("fetch") as stage:
+                        results = cursor.fetchmany(chunksize)
+                        stage["rows"] = len(results)
+                    if results == [] and schema is not None:
+                        break
+                    with profiler.stage("arrow") as stage:
+                        columns = (
+                            zip(*results) if results != [] else [[]] * len(header)
+                        )
+                        table = pa.Table.from_arrays(
+                            [
+                                _to_arrow_array(i, j)
+                                for i, j in zip(columns, arrow_types)
+                            ],
+                            names=names,
+                        )
+                        stage["rows"], stage["bytes"] = table.num_rows, table.nbytes
+                    if callbacks is not None:
+                        with profiler.stage("callbacks") as stage:
+                            for callback in callbacks:
+                                func_dist = {}
+                                for j in callback.required_col:
+                                    func_dist[j] = table[j].to_numpy(
+                                        zero_copy_only=False
+                                    )
+                                table = table.append_column(
+                                    callback.new_col_name,
+                                    _to_arrow_array(callback(**func_dist), None),
+                                )
+                            stage["rows"] = table.num_rows
+                    if schema is None:
+                        schema = table.schema
+                    yield table.cast(schema)
+                    if results == []:
+                        break
+            finally:
+                cursor.close()
+
+    def _save_tables(
+        self,
+        query: str,
+        filename: str,
+        chunksize: int,
+        overwrite: bool,
+        callbacks: list[QueryCallback] | None,
+        comments: bool,
+        open_writer,
+        timeout: float | None = None,
+        max_vm_steps: int | None = None,
+        method: str = "_save_tables",
+    ):
+        """
+        Save query result to a file in chunks with a writer from open_writer(schema, metadata) which has
+        write_table(table) and close() methods, the file is removed if anything fails after it is opened
+        """
+        from tqdm import tqdm
+
         if os.path.exists(filename) and not overwrite:
             raise FileExistsError(f"{os.path.abspath(filename)} already existed!")
-        f = open(filename, "w")
+        metadata = {"mygaiadb_version": __version__}
         if comments:
-            comment_char = "# "
-            query_commented = query.replace("\n", "\n" + comment_char)
-            if "\n" in query_commented[:1]:
-                # in case the first character is new line
-                query_commented = query_commented[1:]
-            else:
-                # in case the first character is NOT new line so we need to add comment in the first line
-                query_commented = comment_char + query_commented
-            if "\n" in query_commented[-3:-2]:
-                # in case the last character is new line, so will mess up the csv header
-                query_commented = query_commented[:-2]
-            else:
-                # if not we need to add a new line so header wont be in the comment line
-                query_commented = query_commented + "\n"
-            f.write(query_commented)
-        # write header rows
-        header_og = [d[0] for d in self.cursor.description]
-        if callbacks is not None:
-            header_big = [d[0] for d in self.cursor.description]
-            header_big.extend([i.new_col_name for i in callbacks])
-            self._check_callbacks_header(header_og, callbacks)
-        else:
-            header_big = header_og
-        first_flag = True
-        with tqdm(unit=" rows") as pbar:
-            pbar.set_description_str("Rows written: ")
-            while True:  # looping until the end
-                results = self.cursor.fetchmany(chunksize)
-                if results == []:
-                    break
-                _df = pd.DataFrame(results, columns=header_og)
-                if callbacks is not None:
-                    _df = self._result_after_callbacks(_df, callbacks)
-                _df.to_csv(
-                    f,
-                    mode="a" if not first_flag else "w",
-                    index=False,
-                    header=False if not first_flag else True,
-                    lineterminator="\n",
-                )
-                first_flag = False
-                pbar.update(len(_df))
+            metadata["query"] = query
+        writer = None
+        try:
+            with (
+                self._pool.connection() as conn,
+                self._profiling(query, method, conn) as profiler,
+                tqdm(unit=" rows") as pbar,
+            ):
+                pbar.set_description_str("Rows written: ")
+                for table in self._iter_arrow_tables(
+                    query, chunksize, callbacks, timeout, max_vm_steps, profiler
+                ):
+                    with profiler.stage("write") as stage:
+                        if writer is None:
+                            writer = open_writer(table.schema, metadata)
+                        writer.write_table(table)
+                        stage["rows"], stage["bytes"] = table.num_rows, table.nbytes
+                    pbar.update(table.num_rows)
+                if writer is not None:
+                    with profiler.stage("write"):
+                        writer.close()
+                        writer = None
+        except BaseException:
+            # a partially written file is removed if the query fails, times out or is cancelled
+            if writer is not None:
+                writer.close()
+                writer = None
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(filename)
+            raise
+        finally:
+            if writer is not None:
+                writer.close()
         return None
 
     @preprocess_query
-    def query(self, query: str, callbacks: list[QueryCallback] | None = None):
+    def save_parquet(
+        self,
+        query: str,
+        filename: str,
+        chunksize: int = 50000,
+        overwrite: bool = True,
+        callbacks: list[QueryCallback] | None = None,
+        comments: bool = True,
+        compression: str = "snappy",
+        timeout: float | None = None,
+        max_vm_steps: int | None = None,
+    ):
+        """
+        Given query, save the result to parquet (requires pyarrow) with a row group of "chunksize" rows written at each time until finished.
+        Column types are from SQL schema (e.g., ``real`` is float32 and ``double`` is float64) for table columns
+        and inferred from the first chunk for other columns
+
+        Parameters
+        ----------
+        query : str
+            Query string
+        filename : str
+            Filename (*.parquet) to be saved
+        chunksize : int, optional, default=50000
+            Number of rows to do in one batch
+        overwrite : bool, optional, default=True
+            Whether to overwrite file if it already exists
+        callbacks : list[QueryCallback], optional, default=None
+            List of mygaiadb callbacks
+        comments : bool, optional, default=True
+            Whether to save the query as "query" in file metadata
+        compression : str, optional, default="snappy"
+            Compression codec supported by pyarrow
+        timeout : float, optional, default=None
+            Maximum time in seconds to run the query, ``TimeoutError`` is raised and the file is removed if exceeded
+        max_vm_steps : int, optional, default=None
+            Maximum number of SQLite virtual machine instructions to run the query, ``TimeoutError`` is raised and the
+            file is removed if exceeded
+
+        Returns
+        -------
+        None
+        """
+        import pyarrow.parquet as pq
+
+        def open_writer(schema, metadata):
+            return pq.ParquetWriter(
+                filename, schema.with_metadata(metadata), compression=compression
+            )
+
+        return self._save_tables(
+            query,
+            filename,
+            chunksize,
+            overwrite,
+            callbacks,
+            comments,
+            open_writer,
+            timeout,
+            max_vm_steps,
+            "save_parquet",
+        )
+
+    @preprocess_query
+    def save_feather(
+        self,
+        query: str,
+        filename: str,
+        chunksize: int = 50000,
+        overwrite: bool = True,
+        callbacks: list[QueryCallback] | None = None,
+        comments: bool = True,
+        timeout: float | None = None,
+        max_vm_steps: int | None = None,
+    ):
+        """
+        Given query, save the result to feather (Arrow IPC file, requires pyarrow) with a record batch of "chunksize" rows written at each time until finished.
+        Column types are from SQL schema (e.g., ``real`` is float32 and ``double`` is float64) for table columns
+        and inferred from the first chunk for other columns
+
+        Parameters
+        ----------
+        query : str
+            Query string
+        filename : str
+            Filename (*.feather) to be saved
+        chunksize : int, optional, default=50000
+            Number of rows to do in one batch
+        overwrite : bool, optional, default=True
+            Whether to overwrite file if it already exists
+        callbacks : list[QueryCallback], optional, default=None
+            List of mygaiadb callbacks
+        comments : bool, optional, default=True
+            Whether to save the query as "query" in file metadata
+        timeout : float, optional, default=None
+            Maximum time in seconds to run the query, ``TimeoutError`` is raised and the file is removed if exceeded
+        max_vm_steps : int, optional, default=None
+            Maximum number of SQLite virtual machine instructions to run the query, ``TimeoutError`` is raised and the
+            file is removed if exceeded
+
+        Returns
+        -------
+        None
+        """
+        import pyarrow as pa
+
+        def open_writer(schema, metadata):
+            return pa.ipc.new_file(filename, schema.with_metadata(metadata))
+
+        return self._save_tables(
+            query,
+            filename,
+            chunksize,
+            overwrite,
+            callbacks,
+            comments,
+            open_writer,
+            timeout,
+            max_vm_steps,
+            "save_feather",
+        )
+
+    @preprocess_query
+    def save_hdf5(
+        self,
+        query: str,
+        filename: str,
+        chunksize: int = 50000,
+        overwrite: bool = True,
+        callbacks: list[QueryCallback] | None = None,
+        comments: bool = True,
+        timeout: float | None = None,
+        max_vm_steps: int | None = None,
+    ):
+        """
+        Given query, save the result to h5 (requires pyarrow) with a dataset for each column, "chunksize" number of rows at each time until finished.
+        Column types are from SQL schema (e.g., ``real`` is float32 and ``double`` is float64) for table columns
+        and inferred from the first chunk for other columns. NULL is NaN in float columns, the smallest integer in integer
+        columns, False in boolean columns and empty string in string columns (saved as attribute "fillvalue" of datasets)
+
+        Parameters
+        ----------
+        query : str
+            Query string
+        filename : str
+            Filename (*.h5) to be saved
+        chunksize : int, optional, default=50000
+            Number of rows to do in one batch
+        overwrite : bool, optional, default=True
+            Whether to overwrite file if it already exists
+        callbacks : list[QueryCallback], optional, default=None
+            List of mygaiadb callbacks
+        comments : bool, optional, default=True
+            Whether to save the query as attribute "query" of the file
+        timeout : float, optional, default=None
+            Maximum time in seconds to run the query, ``TimeoutError`` is raised and the file is removed if exceeded
+        max_vm_steps : int, optional, default=None
+            Maximum number of SQLite virtual machine instructions to run the query, ``TimeoutError`` is raised and the
+            file is removed if exceeded
+
+        Returns
+        -------
+        None
+        """
+        return self._save_tables(
+            query,
+            filename,
+            chunksize,
+            overwrite,
+            callbacks,
+            comments,
+            lambda schema, metadata: _H5TableWriter(filename, schema, metadata),
+            timeout,
+            max_vm_steps,
+            "save_hdf5",
+        )
+
+    @preprocess_query
+    def query(
+        self,
+        query: str,
+        callbacks: list[QueryCallback] | None = None,
+        use_cache: bool = True,
+        timeout: float | None = None,
+        max_vm_steps: int | None = None,
+    ):
         """
         Get result from query to pandas dataframe, ONLY USE THIS FOR SMALL QUERY
 
@@ -312,17 +1245,298 @@ class LocalGaiaSQL:
             Query string
         callbacks : list[QueryCallback], optional, default=None
             List of mygaiadb callbacks
+        use_cache : bool, optional, default=True
+            Whether to get the result from and save the result to the cache if this instance has a cache,
+            set to False for queries which do not always give the same result (e.g., with ``RANDOM()``)
+        timeout : float, optional, default=None
+            Maximum time in seconds to run the query, ``TimeoutError`` is raised if exceeded
+        max_vm_steps : int, optional, default=None
+            Maximum number of SQLite virtual machine instructions to run the query, ``TimeoutError`` is raised if exceeded
 
         Returns
         -------
         df: pandas.Dataframe
         """
-        _df = pd.read_sql_query(query, self.conn)
+        import pandas as pd
+
+        with (
+            self._pool.connection() as conn,
+            self._profiling(query, "query", conn) as profiler,
+        ):
+            cache_key = None
+            if self.cache is not None and use_cache:
+                with profiler.stage("cache") as stage:
+                    cache_key = self._cache_key(query, callbacks)
+                    _df = self.cache.get(cache_key)
+                    stage["rows"] = 0 if _df is None else len(_df)
+                if _df is not None:
+                    return _df
+            self._warn_slow_query(query)
+            with self._query_limits(conn, timeout, max_vm_steps, profiler):
+                if profiler.enabled:
+                    _df = self._read_sql_in_stages(conn, query, profiler)
+                else:
+                    _df = pd.read_sql_query(query, conn)
+            if callbacks is not None:
+                self._check_callbacks_header(_df.columns, callbacks)
+                with profiler.stage("callbacks") as stage:
+                    _df = self._result_after_callbacks(_df, callbacks)
+                    stage["rows"] = len(_df)
+            if cache_key is not None:
+                with profiler.stage("cache"):
+                    self.cache.put(cache_key, _df, query)
+        return _df
+
+    @preprocess_query
+    def iter_query(
+        self,
+        query: str,
+        chunksize: int = 50000,
+        callbacks: list[QueryCallback] | None = None,
+        as_: str = "pandas",
+        use_cache: bool = True,
+        timeout: float | None = None,
+        max_vm_steps: int | None = None,
+    ):
+        """
+        Generator to get result from query in chunks of "chunksize" rows, so large query can be processed with constant memory
+
+        Parameters
+        ----------
+        query : str
+            Query string
+        chunksize : int, optional, default=50000
+            Number of rows in each chunk
+        callbacks : list[QueryCallback], optional, default=None
+            List of mygaiadb callbacks, applied to each chunk
+        as_ : str, optional, default="pandas"
+            Type of chunks, "pandas" for pandas.DataFrame, "numpy" for numpy record array or "arrow" for pyarrow.Table.
+            Types are inferred for each chunk and columns with only NULL in a chunk are float with NaN
+        use_cache : bool, optional, default=True
+            Whether to get the result from and save the result to the cache if this instance has a cache. The result is
+            saved only if all chunks are consumed and have the same types
+        timeout : float, optional, default=None
+            Maximum time in seconds since the start of the query (including time to process chunks) to get chunks,
+            ``TimeoutError`` is raised if exceeded
+        max_vm_steps : int, optional, default=None
+            Maximum number of SQLite virtual machine instructions to run the query, ``TimeoutError`` is raised if exceeded
+
+        Yields
+        ------
+        chunk: pandas.Dataframe, numpy.recarray or pyarrow.Table
+        """
+        import pandas as pd
+
+        if as_ not in _ITER_QUERY_TYPES:
+            raise ValueError(f"as_ must be one of {_ITER_QUERY_TYPES} but got {as_}")
+        if as_ == "arrow":
+            import pyarrow as pa
+        cache_writer = None
+        if self.cache is not None and use_cache:
+            cache_key = self._cache_key(query, callbacks)
+            if (path := self.cache.path(cache_key)) is not None:
+                yield from self._iter_cached(path, chunksize, as_)
+                return
+            cache_writer = self.cache.writer(cache_key, query)
+        self._warn_slow_query(query)
+        with (
+            self._pool.connection() as conn,
+            self._profiling(query, "iter_query", conn) as profiler,
+            self._query_limits(conn, timeout, max_vm_steps, profiler),
+        ):
+            # own cursor so other queries can be done while iterating, with the same connection in this thread
+            cursor = conn.cursor()
+            try:
+                with profiler.stage("execute"):
+                    cursor.execute(query)
+                header = [d[0] for d in cursor.description]
+                if callbacks is not None:
+                    self._check_callbacks_header(header, callbacks)
+                while True:  # looping until the end
+                    with profiler.stage("fetch") as stage:
+                        results = cursor.fetchmany(chunksize)
+                        stage["rows"] = len(results)
+                    if results == []:
+                        break
+                    with profiler.stage("dataframe") as stage:
+                        _df = pd.DataFrame.from_records(
+                            results, columns=header, coerce_float=True
+                        )
+                        # NULL only columns are NaN instead of None so chunks are typed
+                        for col in _df.columns[_df.dtypes == object]:
+                            if _df[col].isna().all():
+                                _df[col] = np.nan
+                        stage["rows"] = len(_df)
+                        stage["bytes"] = _df.memory_usage(index=False).sum()
+                    if callbacks is not None:
+                        with profiler.stage("callbacks") as stage:
+                            _df = self._result_after_callbacks(_df, callbacks)
+                            stage["rows"] = len(_df)
+                    if cache_writer is not None:
+                        with profiler.stage("cache"):
+                            cache_writer.write(_df)
+                    with profiler.stage("convert") as stage:
+                        if as_ == "numpy":
+                            chunk = _df.to_records(index=False)
+                        elif as_ == "arrow":
+                            chunk = pa.Table.from_pandas(_df, preserve_index=False)
+                        else:
+                            chunk = _df
+                        stage["rows"] = len(chunk)
+                    yield chunk
+                if cache_writer is not None:
+                    cache_writer.commit()
+            finally:
+                cursor.close()
+                if cache_writer is not None:
+                    cache_writer.close()
+
+    @staticmethod
+    def _iter_cached(path: str, chunksize: int, as_: str):
+        """
+        Generator of chunks of a cached result in a parquet file
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        with pq.ParquetFile(path) as f:
+            for batch in f.iter_batches(batch_size=chunksize):
+                if as_ == "arrow":
+                    yield pa.Table.from_batches([batch])
+                elif as_ == "numpy":
+                    yield batch.to_pandas().to_records(index=False)
+                else:
+                    yield batch.to_pandas()
+
+    @preprocess_query
+    def iter_parallel_query(
+        self,
+        query: str,
+        n_workers: int = 4,
+        n_partitions: int | None = None,
+        callbacks: list[QueryCallback] | None = None,
+    ):
+        """
+        Generator to run a query on ``gaiadr3.gaia_source`` in parallel and get result of each partition in order
+
+        ``gaiadr3.gaia_source`` is split into ``n_partitions`` disjoint rowid ranges with the same number of rows, each partition
+        is queried in a worker process with its own read-only connection and read with a range scan on the table.
+        The query must be row-wise, i.e., cannot have LIMIT, GROUP BY, ORDER BY, DISTINCT, aggregate or window functions
+        or compound SELECT which give different result if they are run on partitions separately, and must reference
+        ``gaiadr3.gaia_source`` once outside of any subquery. Use ``order_by`` of ``parallel_query()`` to sort the result
+
+        Parameters
+        ----------
+        query : str
+            Query string on ``gaiadr3.gaia_source``, optionally joining other tables
+        n_workers : int, optional, default=4
+            Number of worker processes
+        n_partitions : int, optional, default=None
+            Number of partitions, 8 times ``n_workers`` if None so workers are balanced as rows are not equally costly
+        callbacks : list[QueryCallback], optional, default=None
+            List of mygaiadb callbacks, applied to the result of each partition in this process
+
+        Yields
+        ------
+        df: pandas.Dataframe
+            Result of a partition, partitions are yielded in the order of rowid ranges
+        """
+        with self._pool.connection() as conn:
+            error = _partition_error(conn, query)
+        if error is not None:
+            raise ValueError(f"{error}, use query() instead")
+        if n_partitions is None:
+            n_partitions = 8 * n_workers
+        if n_partitions < 1:
+            raise ValueError("n_partitions must be at least 1")
+        self._warn_slow_query(query)
+        # max(rowid) is a single lookup on the table b-tree
+        with self._pool.connection() as conn:
+            max_rowid = conn.execute(
+                """SELECT max(rowid) FROM gaiadr3.gaia_source"""
+            ).fetchone()[0]
+        max_rowid = max_rowid or 0
+        edges = np.linspace(1, max_rowid + 1, n_partitions + 1).astype(np.int64)
+        db_names = self._readonly_db_names()
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            # only a few partitions are submitted ahead so results waiting to be consumed are bounded
+            futures = []
+            for i in range(n_partitions):
+                futures.append(
+                    executor.submit(
+                        _query_partition,
+                        query,
+                        edges[i],
+                        edges[i + 1] - 1,
+                        db_names,
+                        self.load_ext,
+                        self.immutable,
+                        self.pragmas,
+                    )
+                )
+                if len(futures) >= 2 * n_workers:
+                    yield self._partition_result(futures.pop(0), callbacks)
+            for future in futures:
+                yield self._partition_result(future, callbacks)
+
+    def _partition_result(self, future, callbacks: list[QueryCallback] | None):
+        _df = future.result()
         if callbacks is not None:
             self._check_callbacks_header(_df.columns, callbacks)
             _df = self._result_after_callbacks(_df, callbacks)
         return _df
 
+    @preprocess_query
+    def parallel_query(
+        self,
+        query: str,
+        n_workers: int = 4,
+        n_partitions: int | None = None,
+        order_by: str | list[str] | None = None,
+        callbacks: list[QueryCallback] | None = None,
+    ):
+        """
+        Run a query on ``gaiadr3.gaia_source`` in parallel to pandas dataframe, see ``iter_parallel_query()`` for details
+
+        Parameters
+        ----------
+        query : str
+            Query string on ``gaiadr3.gaia_source``, optionally joining other tables
+        n_workers : int, optional, default=4
+            Number of worker processes
+        n_partitions : int, optional, default=None
+            Number of partitions, 8 times ``n_workers`` if None
+        order_by : str or list[str], optional, default=None
+            Column(s) of the result to sort by, otherwise the result is in the order of partitions (i.e., rowid)
+        callbacks : list[QueryCallback], optional, default=None
+            List of mygaiadb callbacks
+
+        Returns
+        -------
+        df: pandas.Dataframe
+        """
+        import pandas as pd
+        from tqdm import tqdm
+
+        _df = pd.concat(
+            list(
+                tqdm(
+                    self.iter_parallel_query(
+                        query,
+                        n_workers=n_workers,
+                        n_partitions=n_partitions,
+                        callbacks=callbacks,
+                    ),
+                    total=n_partitions or 8 * n_workers,
+                    desc="Partitions",
+                )
+            ),
+            ignore_index=True,
+        )
+        if order_by is not None:
+            _df = _df.sort_values(order_by, kind="stable", ignore_index=True)
+        return _df
+
     @preprocess_query
     def execution_plan(self, query: str):
         """
@@ -339,14 +1553,263 @@ class LocalGaiaSQL:
         """
             + query
         )
-        self.cursor.execute(query)
-        return self.cursor.fetchall()
+        with self._pool.connection() as conn:
+            return conn.execute(query).fetchall()
+
+    @preprocess_query
+    def analyze_query(self, query: str) -> list[dict]:
+        """
+        Analyze the execution plan of a query to find slow steps on big tables (``gaia_source``, ``twomass_psc``, ``allwise``
+        and ``catwise``) before running it, e.g., full scans, full scans in nested loops, temporary indexes and joins which
+        do not use ``*_designation*`` indexes, with suggestions of covering indexes or ranges of ``source_id`` instead
+
+        Parameters
+        ----------
+        query : str
+            Query string
+
+        Returns
+        -------
+        findings: list[dict]
+            Findings with keys "severity" ("critical" if the query can take days, "warning" if it scans a big table and
+            "info" for possible improvements), "table", "alias", "detail" (step of the plan), "message" and "suggestion"
+        """
+        plan = self.execution_plan(query)
+        with self._pool.connection() as conn:
+            columns = _columns_read(conn, query)
+            indexes = {i: _table_indexes(conn, i) for i in _BIG_TABLES}
+        return _analyze_plan(plan, query, columns, indexes)
+
+    def _warn_slow_query(self, query: str):
+        """
+        Warn if a query can take days according to its execution plan, which is checked if ``check_plan`` is True
+        """
+        if not self.check_plan:
+            return
+        try:
+            findings = _analyze_plan(self.execution_plan(query), query)
+        except sqlite3.Error:  # error of the query itself is raised when it is run
+            return
+        critical = [i for i in findings if i["severity"] == "critical"]
+        if critical:
+            warnings.warn(
+                "This query can take days to run:\n"
+                + "\n".join(f"- {i['message']}. {i['suggestion']}" for i in critical)
+                + "\nSee analyze_query() for details or set check_plan=False to turn off this warning"
+            )
+
+    def cone_search(
+        self,
+        ra: float,
+        dec: float,
+        radius: float,
+        columns: str | list[str] | None = None,
+        joins: str | list[str] | None = None,
+        callbacks: list[QueryCallback] | None = None,
+    ):
+        """
+        Get all sources within a radius of a coordinate from ``gaiadr3.gaia_source`` (with alias ``G``) to pandas dataframe
+
+        Gaia source_id encodes the level 12 HEALPix index of a source, so the HEALPix pixels overlapping with the cone are
+        turned into source_id range scans on the primary key instead of scanning the whole table. Sources in those pixels
+        are then filtered by their exact angular distance to the center of the cone.
+
+        Parameters
+        ----------
+        ra : float
+            Right ascension of the center of the cone in degrees
+        dec : float
+            Declination of the center of the cone in degrees
+        radius : float
+            Radius of the cone in degrees, compared to Gaia ``ra`` and ``dec`` at epoch J2016.0
+        columns : str or list[str], optional, default=None
+            Columns to select (e.g., ``["G.source_id", "G.parallax"]``), all columns of ``gaia_source`` if None
+        joins : str or list[str], optional, default=None
+            JOIN clauses to other tables (e.g., ``"INNER JOIN gaiadr3.astrophysical_parameters as GA on GA.source_id = G.source_id"``)
+        callbacks : list[QueryCallback], optional, default=None
+            List of mygaiadb callbacks
+
+        Returns
+        -------
+        df: pandas.Dataframe
+            Query result with an additional column ``ang_dist`` for angular distance to the center of the cone in degrees
+        """
+        import pandas as pd
+
+        if radius < 0:
+            raise ValueError("radius must be non-negative")
+        if columns is None:
+            columns = ["G.*"]
+        elif isinstance(columns, str):
+            columns = [columns]
+        if joins is None:
+            joins = []
+        elif isinstance(joins, str):
+            joins = [joins]
+        if self.lazy_attach:
+            self._attach_catalogs(_CATALOG_REFERENCE_RE.findall(" ".join(columns + joins)))
+
+        # source_id of sources in level 12 HEALPix index i are between i * 2**35 and (i + 1) * 2**35 - 1
+        ranges = healpix_disc_ranges(ra, dec, radius, level=12)
+        ranges[:, 0] = ranges[:, 0] << 35
+        ranges[:, 1] = ((ranges[:, 1] + 1) << 35) - 1
+        results = []
+        for i in range(0, len(ranges), _CONE_SEARCH_MAX_RANGES):
+            chunk = ranges[i : i + _CONE_SEARCH_MAX_RANGES]
+            query = f"""
+            SELECT {", ".join(columns)}, G.ra AS mygaiadb_cone_ra, G.dec AS mygaiadb_cone_dec
+            FROM gaiadr3.gaia_source as G
+            {" ".join(joins)}
+            WHERE {" OR ".join(["(G.source_id BETWEEN ? AND ?)"] * len(chunk))}
+            """
+            with self._pool.connection() as conn:
+                results.append(
+                    pd.read_sql_query(query, conn, params=chunk.ravel().tolist())
+                )
+        _df = pd.concat(results, ignore_index=True)
+
+        ang_dist = np.rad2deg(
+            _angular_distance(
+                _radec_to_vec(ra, dec)[:, None],
+                _radec_to_vec(_df["mygaiadb_cone_ra"], _df["mygaiadb_cone_dec"]),
+            )
+        )
+        _df = _df.drop(columns=["mygaiadb_cone_ra", "mygaiadb_cone_dec"])
+        _df["ang_dist"] = ang_dist
+        _df = _df[ang_dist <= radius].reset_index(drop=True)
+        if callbacks is not None:
+            self._check_callbacks_header(_df.columns, callbacks)
+            _df = self._result_after_callbacks(_df, callbacks)
+        return _df
 
-    def xmatch(self, user_id, db_id, query):
+    @preprocess_query
+    def xmatch(
+        self,
+        query: str,
+        ids: ArrayLike,
+        id_column: str = "source_id",
+        callbacks: list[QueryCallback] | None = None,
+    ):
         """
-        cross-matching given a list of source_id
+        Cross-matching a query with a list of source_id, results are returned in the order of the list
+
+        The list is loaded into a table in an in-memory database only for this session (sorted for B-tree locality,
+        with source_id as primary key) and joined with the query, so the list is neither written to disk
+        like ``upload_user_table()`` nor put in the query string like ``WHERE source_id IN (...)``
+
+        Parameters
+        ----------
+        query : str
+            Query string (e.g., ``SELECT G.source_id, G.ra FROM gaiadr3.gaia_source as G``), can be on any attached database
+        ids : ArrayLike
+            List of integer id to cross-match with
+        id_column : str, optional, default="source_id"
+            Name of the column in the query result to be cross-matched with ``ids``
+        callbacks : list[QueryCallback], optional, default=None
+            List of mygaiadb callbacks
+
+        Returns
+        -------
+        df: pandas.Dataframe
+            Query result in the order of ``ids``, ids without any match are not included and ids appear multiple times in ``ids``
+            will also appear multiple times in the result
         """
-        raise NotImplementedError()
+        import pandas as pd
+
+        ids = np.asarray(ids, dtype=np.int64)
+        query = query.strip().rstrip(";")
+        self.cursor.execute("""DROP TABLE IF EXISTS xmatch.ids""")
+        self.cursor.execute(
+            """CREATE TABLE xmatch.ids (source_id INTEGER PRIMARY KEY)"""
+        )
+        try:
+            unique_ids = np.unique(ids)
+            for i in range(0, len(unique_ids), _XMATCH_BATCH_SIZE):
+                self.cursor.executemany(
+                    """INSERT INTO xmatch.ids VALUES (?)""",
+                    zip(unique_ids[i : i + _XMATCH_BATCH_SIZE].tolist()),
+                )
+            self.conn.commit()
+            _df = pd.read_sql_query(_xmatch_query(query, id_column), self.conn)
+        finally:
+            self.cursor.execute("""DROP TABLE xmatch.ids""")
+            self.conn.commit()
+
+        # merge preserves the order of ids
+        _df = pd.DataFrame({id_column: ids}).merge(
+            _df.astype({id_column: np.int64}), on=id_column, how="inner"
+        )
+        if callbacks is not None:
+            self._check_callbacks_header(_df.columns, callbacks)
+            _df = self._result_after_callbacks(_df, callbacks)
+        return _df
+
+    def positional_xmatch(
+        self,
+        df: pd.DataFrame,
+        radius: float,
+        catalog: str = "gaia",
+        columns: list[str] | None = None,
+        mode: str = "nearest",
+        ra_column: str = "ra",
+        dec_column: str = "dec",
+        n_workers: int = 4,
+        tablename: str | None = None,
+    ):
+        """
+        Cross-matching a user catalog with Gaia or CATWISE by position
+
+        Both the user catalog and the catalog are bucketed by HEALPix pixels, catalog sources in the pixels of user sources
+        and their neighbour pixels are read with HEALPix index range scans (``source_id`` for Gaia and ``healpix12`` for CATWISE)
+        and separations are computed with NumPy in parallel across blocks of pixels
+
+        Parameters
+        ----------
+        df : pandas.Dataframe
+            User catalog with RA and DEC in degrees
+        radius : float
+            Matching radius in arcsecond
+        catalog : str, optional, default="gaia"
+            Catalog to cross-match with, one of "gaia" (``gaiadr3.gaia_source`` with RA and DEC at epoch J2016.0) and "catwise"
+        columns : list[str], optional, default=None
+            Columns of the catalog to return, only ``source_id`` for Gaia and ``unwise_objid`` for CATWISE if None
+        mode : str, optional, default="nearest"
+            "nearest" to return the nearest match within the radius or "all" to return all matches within the radius
+        ra_column : str, optional, default="ra"
+            Column name of RA in ``df``
+        dec_column : str, optional, default="dec"
+            Column name of DEC in ``df``
+        n_workers : int, optional, default=4
+            Number of threads to cross-match blocks of pixels
+        tablename : str, optional, default=None
+            If given, the result is also saved as a user table with this name
+
+        Returns
+        -------
+        df: pandas.Dataframe
+            Rows of the user catalog with matches, followed by catalog columns (with suffix of the catalog name if the user
+            catalog has the same column) and ``ang_sep`` for angular separation in arcsecond
+        """
+        if catalog in _XMATCH_CATALOGS:
+            self._file_exist(getattr(mygaiadb, _XMATCH_CATALOGS[catalog]["db_path"]))
+        idx, matched, separation = _positional_xmatch(
+            df[ra_column].to_numpy(),
+            df[dec_column].to_numpy(),
+            radius,
+            catalog=catalog,
+            columns=columns,
+            mode=mode,
+            n_workers=n_workers,
+            immutable=self.immutable,
+            pragmas=self.pragmas,
+        )
+        result = (
+            df.iloc[idx].reset_index(drop=True).join(matched, rsuffix=f"_{catalog}")
+        )
+        result["ang_sep"] = separation
+        if tablename is not None:
+            self.upload_user_table(result, tablename)
+        return result
 
     def upload_user_table(self, df: pd.DataFrame, tablename: str):
         """
@@ -359,7 +1822,7 @@ class LocalGaiaSQL:
         tablename: str
             Table name
         """
-        with contextlib.closing(sqlite3.connect(mygaiadb_usertable_db)) as conn:
+        with contextlib.closing(sqlite3.connect(mygaiadb.mygaiadb_usertable_db)) as conn:
             df.to_sql(f"{tablename}", conn, if_exists="fail", index=False)
 
     def remove_user_table(self, tablename: str, reclaim: bool = False):
@@ -373,7 +1836,7 @@ class LocalGaiaSQL:
         reclaim: bool, optional, default=False
             Whether to reclaim disk space after removing a table
         """
-        with contextlib.closing(sqlite3.connect(mygaiadb_usertable_db)) as conn:
+        with contextlib.closing(sqlite3.connect(mygaiadb.mygaiadb_usertable_db)) as conn:
             conn.execute(f"""DROP TABLE {tablename}""")
             if reclaim:
                 conn.execute("""VACUUM""")
@@ -414,6 +1877,8 @@ class LocalGaiaSQL:
         result: list
             list of tables with the format of DATABASE_NAME.TABLE_NAME
         """
+        if self.lazy_attach:
+            self._attach_catalogs(self._catalog_names)
         result = []
         for i in self.attached_db_name:
             self.cursor.execute(
@@ -440,9 +1905,13 @@ class LocalGaiaSQL:
         result: list
             list of columns of DATABASE_NAME.TABLE_NAME
         """
+        import pandas as pd
+
         if "." not in name:
             raise NameError(
                 "Table name need to be with the format of DATABASE_NAME.TABLE_NAME"
             )
+        if self.lazy_attach:
+            self._attach_catalogs([name.split(".")[0]])
         result = pd.read_sql_query(f"""SELECT * FROM {name} LIMIT 1""", self.conn)
         return [i for i in result.columns]
@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+import mygaiadb
+from mygaiadb.query.pool import _readonly_uri, _set_pragmas
+from mygaiadb.utils import (
+    _angular_distance,
+    _healpix_center_and_radius,
+    _healpix_query_discs,
+    _radec_to_vec,
+    radec_to_healpix,
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# catalogs which can be cross-matched by position, the name of the path of their database in mygaiadb and the column
+# with level 12 HEALPix index (source_id of Gaia has HEALPix index in bit 35 and above)
+_XMATCH_CATALOGS = {
+    "gaia": {
+        "db_path": "gaia_sql_db_path",
+        "table": "gaia_source",
+        "id_column": "source_id",
+        "healpix_column": "source_id",
+        "healpix_shift": 35,
+    },
+    "catwise": {
+        "db_path": "catwise_sql_db_path",
+        "table": "catwise",
+        "id_column": "unwise_objid",
+        "healpix_column": "healpix12",
+        "healpix_shift": 0,
+    },
+}
+# sources are grouped in blocks of HEALPix pixels at this level (~0.23 degree) unless the radius is larger
+_XMATCH_BLOCK_LEVEL = 8
+# maximum number of separations computed at once
+_XMATCH_MAX_PAIRS = 4_000_000
+# maximum number of HEALPix ranges in one statement, 2 parameters each
+_XMATCH_MAX_RANGES = 400
+
+
+def _block_level(radius: float) -> int:
+    """
+    HEALPix level of blocks so pixels are larger than the radius in radian
+    """
+    level = _XMATCH_BLOCK_LEVEL
+    while level > 0 and np.sqrt(np.pi / 3) / 2**level < radius:
+        level -= 1
+    return level
+
+
+def _match_block(
+    conn: sqlite3.Connection,
+    catalog: dict,
+    columns: list[str],
+    ranges: np.ndarray,
+    user_idx: np.ndarray,
+    user_vec: np.ndarray,
+    radius: float,
+) -> tuple[np.ndarray, list[tuple], np.ndarray, list[str]]:
+    """
+    Find all pairs within radius (in radian) between user sources in a block and catalog sources in HEALPix ranges
+    covering the block and its neighbours
+
+    Returns
+    -------
+    user_idx : array
+        Index of user sources of pairs
+    matched : list[tuple]
+        Rows of catalog columns of pairs
+    separation : array
+        Angular separation of pairs in radian
+    names : list[str]
+        Names of catalog columns
+    """
+    shift = catalog["healpix_shift"]
+    rows = []
+    for i in range(0, len(ranges), _XMATCH_MAX_RANGES):
+        chunk = ranges[i : i + _XMATCH_MAX_RANGES]
+        params = np.stack(
+            [chunk[:, 0] << shift, ((chunk[:, 1] + 1) << shift) - 1], axis=1
+        )
+        condition = " OR ".join(
+            [f"({catalog['healpix_column']} BETWEEN ? AND ?)"] * len(chunk)
+        )
+        cursor = conn.execute(
+            f"""
+            SELECT {", ".join(columns)}, ra, dec
+            FROM {catalog["table"]}
+            WHERE {condition}
+            """,
+            params.ravel().tolist(),
+        )
+        # rows are used as they are without pandas as blocks are small and many
+        rows.extend(cursor.fetchall())
+    names = [d[0] for d in cursor.description][:-2]
+    coords = np.array([row[-2:] for row in rows], dtype=np.float64).reshape(-1, 2)
+    cand_vec = _radec_to_vec(coords[:, 0], coords[:, 1])
+
+    # select pairs with dot product first (with a margin for round-off error) and then exact separation
+    min_cos = np.cos(min(radius * 1.01 + 1e-7, np.pi))
+    pair_user, pair_cand = [], []
+    step = max(_XMATCH_MAX_PAIRS // max(cand_vec.shape[1], 1), 1)
+    for i in range(0, len(user_idx), step):
+        u, c = np.nonzero(user_vec[:, i : i + step].T @ cand_vec >= min_cos)
+        pair_user.append(u + i)
+        pair_cand.append(c)
+    pair_user, pair_cand = np.concatenate(pair_user), np.concatenate(pair_cand)
+    separation = _angular_distance(user_vec[:, pair_user], cand_vec[:, pair_cand])
+    good = separation <= radius
+    return (
+        user_idx[pair_user[good]],
+        [rows[j][:-2] for j in pair_cand[good]],
+        separation[good],
+        names,
+    )
+
+
+def positional_xmatch(
+    ra: np.ndarray,
+    dec: np.ndarray,
+    radius: float,
+    catalog: str = "gaia",
+    columns: list[str] | None = None,
+    mode: str = "nearest",
+    n_workers: int = 4,
+    immutable: bool = False,
+    pragmas: dict | None = None,
+) -> tuple[np.ndarray, pd.DataFrame, np.ndarray]:
+    """
+    Cross-match coordinates with a catalog by position
+
+    Both sides are bucketed by HEALPix pixels. Coordinates are grouped in blocks of HEALPix pixels and catalog sources
+    in each block and its neighbour pixels (all pixels within the radius of the block) are read with HEALPix index range
+    scans, then separations are computed with NumPy. Blocks are processed in parallel by threads.
+
+    Parameters
+    ----------
+    ra : array
+        Right ascension in degrees
+    dec : array
+        Declination in degrees
+    radius : float
+        Matching radius in arcsecond
+    catalog : str, optional, default="gaia"
+        Catalog to cross-match with, one of "gaia" and "catwise"
+    columns : list[str], optional, default=None
+        Columns of the catalog to return, only the id column of the catalog if None
+    mode : str, optional, default="nearest"
+        "nearest" to return the nearest match within the radius or "all" to return all matches within the radius
+    n_workers : int, optional, default=4
+        Number of threads to process blocks
+    immutable : bool, optional, default=False
+        Whether to open the catalog as an immutable database
+    pragmas : dict, optional, default=None
+        Pragmas of connections (e.g., ``{"mmap_size": 2**30}``)
+
+    Returns
+    -------
+    idx : array
+        Index of the coordinates of matches, sorted
+    matched : pandas.DataFrame
+        Catalog columns of matches
+    separation : array
+        Angular separation of matches in arcsecond
+    """
+    import pandas as pd
+    from tqdm import tqdm
+
+    if catalog not in _XMATCH_CATALOGS:
+        raise ValueError(
+            f"catalog must be one of {list(_XMATCH_CATALOGS.keys())} but got {catalog}"
+        )
+    if mode not in ("nearest", "all"):
+        raise ValueError(f"mode must be 'nearest' or 'all' but got {mode}")
+    if radius <= 0:
+        raise ValueError("radius must be positive")
+    catalog = _XMATCH_CATALOGS[catalog]
+    if columns is None:
+        columns = [catalog["id_column"]]
+    radius = np.deg2rad(radius / 3600)
+
+    vec = _radec_to_vec(ra, dec)
+    level = _block_level(radius)
+    block = radec_to_healpix(ra, dec, level=level)
+    order = np.argsort(block, kind="stable")
+    blocks, block_starts = np.unique(block[order], return_index=True)
+    block_ends = np.append(block_starts[1:], len(order))
+    # HEALPix ranges within the radius of blocks, found with pixels 4 times smaller than blocks
+    # instead of level 12 pixels to keep the number of pixels small, then converted to level 12 ranges
+    block_center, block_radius = _healpix_center_and_radius(blocks, level)
+    disc, first, last = _healpix_query_discs(
+        block_center, block_radius + radius, level + 2
+    )
+    shift = 2 * (10 - level)
+    first, last = first << shift, ((last + 1) << shift) - 1
+    disc_starts = np.searchsorted(disc, np.arange(len(blocks) + 1))
+
+    # one read-only connection per thread as connections cannot be shared between threads
+    local = threading.local()
+    connections = []
+
+    def get_conn():
+        if not hasattr(local, "conn"):
+            local.conn = sqlite3.connect(
+                _readonly_uri(getattr(mygaiadb, catalog["db_path"]), immutable),
+                uri=True,
+                check_same_thread=False,
+            )
+            _set_pragmas(local.conn, pragmas or {}, ["main"])
+            connections.append(local.conn)
+        return local.conn
+
+    def match(i):
+        idx = order[block_starts[i] : block_ends[i]]
+        ranges = np.stack([first, last], axis=1)[disc_starts[i] : disc_starts[i + 1]]
+        return _match_block(
+            get_conn(), catalog, columns, ranges, idx, vec[:, idx], radius
+        )
+
+    try:
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            results = list(
+                tqdm(
+                    executor.map(match, range(len(blocks))),
+                    total=len(blocks),
+                    desc="Cross-matching blocks",
+                )
+            )
+    finally:
+        for conn in connections:
+            conn.close()
+
+    if len(results) == 0:
+        raise ValueError("No coordinates to cross-match")
+    idx = np.concatenate([r[0] for r in results])
+    matched = [row for r in results for row in r[1]]
+    separation = np.concatenate([r[2] for r in results])
+    # sort by index of the coordinates then separation
+    sorting = np.lexsort((separation, idx))
+    if mode == "nearest":
+        sorting = sorting[np.unique(idx[sorting], return_index=True)[1]]
+    return (
+        idx[sorting],
+        pd.DataFrame([matched[i] for i in sorting], columns=results[0][3]),
+        np.rad2deg(separation[sorting]) * 3600,
+    )
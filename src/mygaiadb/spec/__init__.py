@@ -1,7 +1,7 @@
 import h5py
 import tqdm
 import numpy as np
-from mygaiadb import gaia_xp_coeff_h5_path
+import mygaiadb
 from numpy.typing import NDArray
 
 
@@ -51,7 +51,7 @@ def yield_xp_coeffs(
         return_additional_columns = []
 
     h5f = h5py.File(
-        gaia_xp_coeff_h5_path, "r", rdcc_nbytes=rdcc_nbytes, rdcc_nslots=rdcc_nslots
+        mygaiadb.gaia_xp_coeff_h5_path, "r", rdcc_nbytes=rdcc_nbytes, rdcc_nslots=rdcc_nslots
     )
     file_names = list(h5f.keys())
 
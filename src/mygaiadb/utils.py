@@ -50,3 +50,283 @@ def radec_to_ecl(ra: ArrayLike, dec: ArrayLike) -> tuple[NDArray, NDArray]:
     ecl_lat = np.rad2deg(ecl_lat)
 
     return ecl_lon, ecl_lat
+
+
+def _spread_bits(x: NDArray) -> NDArray:
+    """
+    Interleave bits of integers with zeros, i.e., bit i is moved to bit 2i
+    """
+    x = np.asarray(x, dtype=np.int64) & 0xFFFFFFFF
+    x = (x | (x << 16)) & 0x0000FFFF0000FFFF
+    x = (x | (x << 8)) & 0x00FF00FF00FF00FF
+    x = (x | (x << 4)) & 0x0F0F0F0F0F0F0F0F
+    x = (x | (x << 2)) & 0x3333333333333333
+    x = (x | (x << 1)) & 0x5555555555555555
+    return x
+
+
+def radec_to_healpix(ra: ArrayLike, dec: ArrayLike, level: int = 12) -> NDArray:
+    """
+    HEALPix index in NESTED scheme of coordinates, the same as the HEALPix index encoded in Gaia source_id
+    (i.e., ``source_id // 2**35`` for level 12)
+
+    refers to Gorski et al. (2005) and ``ang2pix_nest`` in HEALPix C library
+
+    Parameters
+    ----------
+    ra : float or array
+        Right ascension in degrees
+    dec : float or array
+        Declination in degrees
+    level : int, optional (default=12)
+        HEALPix level, i.e., NSIDE = 2**level
+
+    Returns
+    -------
+    healpix : array
+        HEALPix index
+    """
+    nside = 2**level
+    dec_rad = np.deg2rad(np.asarray(dec, dtype=np.float64))
+    z = np.sin(dec_rad)
+    za = np.abs(z)
+    # in [0, 4)
+    tt = np.mod(np.asarray(ra, dtype=np.float64), 360.0) / 90.0
+    tt = np.where(tt >= 4.0, 0.0, tt)
+
+    # equatorial region
+    temp1 = nside * (0.5 + tt)
+    temp2 = nside * z * 0.75
+    jp = (temp1 - temp2).astype(np.int64)  # index of ascending edge line
+    jm = (temp1 + temp2).astype(np.int64)  # index of descending edge line
+    ifp = jp >> level
+    ifm = jm >> level
+    face_eq = np.where(ifp == ifm, ifp | 4, np.where(ifp < ifm, ifp, ifm + 8))
+    ix_eq = jm & (nside - 1)
+    iy_eq = nside - (jp & (nside - 1)) - 1
+
+    # polar caps, 1 - |z| is computed as 2 * sin^2(pi / 4 - |dec| / 2) to keep precision near poles
+    ntt = np.minimum(tt.astype(np.int64), 3)
+    tp = tt - ntt
+    tmp = nside * np.sqrt(6.0) * np.abs(np.sin(np.pi / 4 - np.abs(dec_rad) / 2))
+    jp_pol = np.minimum((tp * tmp).astype(np.int64), nside - 1)
+    jm_pol = np.minimum(((1.0 - tp) * tmp).astype(np.int64), nside - 1)
+    north = z >= 0
+    face_pol = np.where(north, ntt, ntt + 8)
+    ix_pol = np.where(north, nside - jm_pol - 1, jp_pol)
+    iy_pol = np.where(north, nside - jp_pol - 1, jm_pol)
+
+    equatorial = za <= 2.0 / 3.0
+    face = np.where(equatorial, face_eq, face_pol)
+    ix = np.where(equatorial, ix_eq, ix_pol)
+    iy = np.where(equatorial, iy_eq, iy_pol)
+    return (face << (2 * level)) + _spread_bits(ix) + (_spread_bits(iy) << 1)
+
+
+def _compress_bits(x: NDArray) -> NDArray:
+    """
+    Inverse of ``_spread_bits()``, i.e., bit 2i is moved to bit i and odd bits are dropped
+    """
+    x = np.asarray(x, dtype=np.int64) & 0x5555555555555555
+    x = (x | (x >> 1)) & 0x3333333333333333
+    x = (x | (x >> 2)) & 0x0F0F0F0F0F0F0F0F
+    x = (x | (x >> 4)) & 0x00FF00FF00FF00FF
+    x = (x | (x >> 8)) & 0x0000FFFF0000FFFF
+    x = (x | (x >> 16)) & 0x00000000FFFFFFFF
+    return x
+
+
+# ring index (in unit of NSIDE) of the southern corner and longitude index of base pixels
+_HEALPIX_JRLL = np.array([2, 2, 2, 2, 3, 3, 3, 3, 4, 4, 4, 4])
+_HEALPIX_JPLL = np.array([1, 3, 5, 7, 0, 2, 4, 6, 1, 3, 5, 7])
+
+
+def _radec_to_vec(ra: ArrayLike, dec: ArrayLike) -> NDArray:
+    """
+    Unit vectors with shape (3, ...) of coordinates in degrees
+    """
+    ra_rad = np.deg2rad(np.asarray(ra, dtype=np.float64))
+    dec_rad = np.deg2rad(np.asarray(dec, dtype=np.float64))
+    return np.stack(
+        [
+            np.cos(dec_rad) * np.cos(ra_rad),
+            np.cos(dec_rad) * np.sin(ra_rad),
+            np.sin(dec_rad),
+        ]
+    )
+
+
+def _vec_to_radec(vec: NDArray) -> tuple[NDArray, NDArray]:
+    """
+    Coordinates in degrees of vectors with shape (3, ...)
+    """
+    ra = np.rad2deg(np.arctan2(vec[1], vec[0])) % 360.0
+    dec = np.rad2deg(np.arctan2(vec[2], np.hypot(vec[0], vec[1])))
+    return ra, dec
+
+
+def _angular_distance(vec1: NDArray, vec2: NDArray) -> NDArray:
+    """
+    Angular distance in radian between vectors with shape (3, ...), accurate for small and large distance
+    """
+    cross = np.cross(vec1, vec2, axis=0)
+    return np.arctan2(np.sqrt(np.sum(cross**2, axis=0)), np.sum(vec1 * vec2, axis=0))
+
+
+def _healpix_xyf_to_vec(x: NDArray, y: NDArray, face: NDArray) -> NDArray:
+    """
+    Unit vectors of continuous coordinates x, y in [0, 1] on HEALPix base pixels
+
+    refers to ``xyf2loc`` in HEALPix C++ library
+    """
+    jr = _HEALPIX_JRLL[face] - x - y
+    north, south = jr < 1, jr > 3
+    nr = np.where(north, jr, np.where(south, 4 - jr, 1.0))
+    tmp = nr * nr / 3.0
+    z = np.where(north, 1 - tmp, np.where(south, tmp - 1, (2 - jr) * 2.0 / 3.0))
+    # sin(theta) is computed from 1 - |z| in polar caps to keep precision near poles
+    sth = np.where(north | south, np.sqrt(tmp * (2 - tmp)), np.sqrt(1 - z * z))
+    nr_safe = np.where(nr < 1e-15, 1.0, nr)
+    phi = np.where(
+        nr < 1e-15,
+        0.0,
+        np.pi / 4 * np.mod(_HEALPIX_JPLL[face] * nr + x - y, 8.0) / nr_safe,
+    )
+    return np.stack([sth * np.cos(phi), sth * np.sin(phi), z])
+
+
+def _healpix_to_xyf(healpix: NDArray, level: int) -> tuple[NDArray, NDArray, NDArray]:
+    healpix = np.asarray(healpix, dtype=np.int64)
+    pixel_in_face = healpix & ((1 << (2 * level)) - 1)
+    return (
+        _compress_bits(pixel_in_face),
+        _compress_bits(pixel_in_face >> 1),
+        healpix >> (2 * level),
+    )
+
+
+def healpix_to_radec(healpix: ArrayLike, level: int = 12) -> tuple[NDArray, NDArray]:
+    """
+    Coordinates of the centers of HEALPix pixels in NESTED scheme, inverse of ``radec_to_healpix()``
+
+    Parameters
+    ----------
+    healpix : int or array
+        HEALPix index
+    level : int, optional (default=12)
+        HEALPix level, i.e., NSIDE = 2**level
+
+    Returns
+    -------
+    ra : array
+        Right ascension in degrees
+    dec : array
+        Declination in degrees
+    """
+    nside = 2**level
+    ix, iy, face = _healpix_to_xyf(healpix, level)
+    return _vec_to_radec(
+        _healpix_xyf_to_vec((ix + 0.5) / nside, (iy + 0.5) / nside, face)
+    )
+
+
+def _healpix_center_and_radius(healpix: NDArray, level: int) -> tuple[NDArray, NDArray]:
+    """
+    Unit vectors of the centers of HEALPix pixels and upper bounds of angular distance
+    from the centers to any point in the pixels in radian
+    """
+    nside = 2**level
+    ix, iy, face = _healpix_to_xyf(healpix, level)
+    center = _healpix_xyf_to_vec((ix + 0.5) / nside, (iy + 0.5) / nside, face)
+    radius = np.zeros(len(face))
+    # corners and middle points of edges, pixel edges are not great circles so add a margin
+    for dx, dy in ((0, 0), (0, 1), (1, 0), (1, 1), (0.5, 0), (0, 0.5), (1, 0.5), (0.5, 1)):
+        vertex = _healpix_xyf_to_vec((ix + dx) / nside, (iy + dy) / nside, face)
+        radius = np.maximum(radius, _angular_distance(center, vertex))
+    return center, radius * 1.1
+
+
+def _healpix_query_discs(
+    disc_center: NDArray, disc_radius: NDArray, level: int
+) -> tuple[NDArray, NDArray, NDArray]:
+    """
+    Ranges of HEALPix index in NESTED scheme of all pixels overlapping with multiple discs at once
+
+    Pixels are refined hierarchically from the base pixels so pixels fully inside a disc stay at the lowest level possible
+    and the number of pixels to check only scales with the circumference of the discs.
+
+    Parameters
+    ----------
+    disc_center : array
+        Unit vectors with shape (3, N) of the centers of N discs
+    disc_radius : array
+        Radius of the discs in radian
+    level : int
+        HEALPix level of the ranges
+
+    Returns
+    -------
+    disc : array
+        Index of the disc of each range, sorted
+    first : array
+        First HEALPix index of each range, sorted for the same disc
+    last : array
+        Last HEALPix index (inclusive) of each range, contiguous ranges of the same disc are merged
+    """
+    disc_radius = np.broadcast_to(np.asarray(disc_radius, dtype=np.float64), disc_center.shape[1:])
+    disc = np.repeat(np.arange(disc_center.shape[1]), 12)
+    healpix = np.tile(np.arange(12, dtype=np.int64), disc_center.shape[1])
+    discs, firsts, lasts = [], [], []
+    for current_level in range(level + 1):
+        center, pixel_radius = _healpix_center_and_radius(healpix, current_level)
+        distance = _angular_distance(disc_center[:, disc], center)
+        inside = distance + pixel_radius <= disc_radius[disc]
+        overlap = distance <= disc_radius[disc] + pixel_radius
+        if current_level == level:
+            inside = overlap
+        shift = 2 * (level - current_level)
+        discs.append(disc[inside])
+        firsts.append(healpix[inside] << shift)
+        lasts.append(((healpix[inside] + 1) << shift) - 1)
+        # pixels partially overlapping with a disc are split into 4 pixels in the next level
+        split = overlap & ~inside
+        disc = np.repeat(disc[split], 4)
+        healpix = ((healpix[split] << 2)[:, None] + np.arange(4)).ravel()
+    disc, first, last = np.concatenate(discs), np.concatenate(firsts), np.concatenate(lasts)
+    idx = np.lexsort((first, disc))
+    disc, first, last = disc[idx], first[idx], last[idx]
+    # merge contiguous ranges
+    new_range = np.ones(len(disc), dtype=bool)
+    new_range[1:] = (disc[1:] != disc[:-1]) | (first[1:] != last[:-1] + 1)
+    starts = np.flatnonzero(new_range)
+    ends = np.append(starts[1:], len(disc)) - 1
+    return disc[starts], first[starts], last[ends]
+
+
+def healpix_disc_ranges(
+    ra: float, dec: float, radius: float, level: int = 12
+) -> NDArray:
+    """
+    Ranges of HEALPix index in NESTED scheme of all pixels overlapping with a disc. Some pixels near the edge
+    of the disc which do not overlap with it can be included but all overlapping pixels are included.
+
+    Parameters
+    ----------
+    ra : float
+        Right ascension of the center of the disc in degrees
+    dec : float
+        Declination of the center of the disc in degrees
+    radius : float
+        Radius of the disc in degrees
+    level : int, optional (default=12)
+        HEALPix level, i.e., NSIDE = 2**level
+
+    Returns
+    -------
+    ranges : array
+        Array with shape (N, 2) of sorted and non-overlapping ranges of HEALPix index (both ends inclusive)
+    """
+    _, first, last = _healpix_query_discs(
+        _radec_to_vec(ra, dec)[:, None], np.deg2rad(radius), level
+    )
+    return np.stack([first, last], axis=1)
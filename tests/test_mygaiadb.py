@@ -1,10 +1,33 @@
+import contextlib
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
 import h5py
 import pytest
 import mygaiadb
-from mygaiadb.query import LocalGaiaSQL, DustCallback, ZeroPointCallback, LambdaCallback
+from mygaiadb.query import (
+    LocalGaiaSQL,
+    QueryCache,
+    DustCallback,
+    ZeroPointCallback,
+    LambdaCallback,
+)
+from mygaiadb.query.adql import translate_adql
+from mygaiadb.query.query import _xmatch_query
 from mygaiadb.spec import yield_xp_coeffs
 from mygaiadb import gaia_xp_coeff_h5_path
-from mygaiadb.utils import radec_to_ecl
+from mygaiadb.utils import (
+    radec_to_ecl,
+    radec_to_healpix,
+    healpix_to_radec,
+    healpix_disc_ranges,
+)
 from mygaiadb.data import download, compile
 import numpy as np
 import pandas as pd
@@ -53,6 +76,47 @@ def test_utils():
     )
 
 
+@pytest.mark.order(0)
+def test_radec_to_healpix():
+    # the first source in Gaia DR3 gaia_source, source_id 4295806720 is in level 12 HEALPix 0
+    assert radec_to_healpix(44.99615537864534, 0.00529287940082) == 4295806720 // 2**35
+    # north pole is the last pixel of the first base pixel, south pole is the first pixel of the 9th base pixel
+    npt.assert_array_equal(
+        radec_to_healpix([0.0, 10.0], [90.0, -90.0], level=12),
+        [4**12 - 1, 8 * 4**12],
+    )
+    # a pixel is the parent of its 4 children in the next level
+    ra, dec = np.random.default_rng(0).uniform([0, -90], [360, 90], (1000, 2)).T
+    npt.assert_array_equal(
+        radec_to_healpix(ra, dec, level=11), radec_to_healpix(ra, dec, level=12) // 4
+    )
+    # pixel centers are inside the pixels
+    healpix = np.random.default_rng(0).integers(0, 12 * 4**12, 1000)
+    npt.assert_array_equal(radec_to_healpix(*healpix_to_radec(healpix)), healpix)
+    # all pixels of points inside a disc are covered
+    ranges = healpix_disc_ranges(ra[0], dec[0], 10.0)
+    cos_dist = np.sin(np.deg2rad(dec)) * np.sin(np.deg2rad(dec[0])) + np.cos(
+        np.deg2rad(dec)
+    ) * np.cos(np.deg2rad(dec[0])) * np.cos(np.deg2rad(ra - ra[0]))
+    healpix = radec_to_healpix(ra, dec)[cos_dist > np.cos(np.deg2rad(10.0))]
+    idx = np.searchsorted(ranges[:, 0], healpix, side="right") - 1
+    assert np.all(healpix <= ranges[idx, 1])
+    assert healpix_disc_ranges(0.0, 0.0, 180.0).tolist() == [[0, 12 * 4**12 - 1]]
+
+
+@pytest.mark.order(0)
+def test_decode_array_column():
+    # array strings in Gaia csv files, missing arrays should be filled with NaN
+    values = pd.Series(["[1.5,-2.0,3e-3]", None, "[null,0.1,7]"])
+    npt.assert_equal(
+        compile._decode_array_column(values, np.float64),
+        [[1.5, -2.0, 3e-3], [np.nan] * 3, [np.nan, 0.1, 7.0]],
+    )
+    assert compile._decode_array_column(values, np.float32).dtype == np.float32
+    with pytest.raises(ValueError):
+        compile._decode_array_column(pd.Series(["[1,2]", "[1,2,3]"]), np.float64)
+
+
 @pytest.mark.order(1)
 def test_download():
     download.download_gaia_source(test=True)
@@ -85,6 +149,144 @@ def test_compile():
     assert mygaiadb.allwise_sql_db_path.exists()
     # assert database > 2GB
     assert mygaiadb.gaia_sql_db_path.stat().st_size > 2e9
+    # assert databases are switched back to safe settings after bulk ingest
+    for db_path in [
+        mygaiadb.gaia_sql_db_path,
+        mygaiadb.tmass_sql_db_path,
+        mygaiadb.allwise_sql_db_path,
+        mygaiadb.catwise_sql_db_path,
+    ]:
+        with contextlib.closing(sqlite3.connect(db_path)) as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+
+
+@pytest.mark.order(3)
+def test_parallel_ingest():
+    # parsing files in worker processes should give the same result in the same order
+    file_paths = sorted(mygaiadb.data._2MASS_PARENT.glob("psc_*.gz"))
+    serial = [
+        pd.concat(list(batches))
+        for _, _, batches in compile._iter_parsed_files(
+            file_paths, compile._read_tmass, n_workers=1
+        )
+    ]
+    parallel = [
+        pd.concat(list(batches))
+        for _, _, batches in compile._iter_parsed_files(
+            file_paths, compile._read_tmass, n_workers=2, queue_depth=1
+        )
+    ]
+    assert len(serial) == len(parallel) == len(file_paths)
+    for df_serial, df_parallel in zip(serial, parallel):
+        pd.testing.assert_frame_equal(df_serial, df_parallel)
+
+
+@pytest.mark.order(3)
+def test_compile_sql_indexes():
+    # databases are compiled with indexing=False in test_compile
+    compile.compile_sql_indexes(n_workers=4)
+    for database, statements in compile._SQL_INDEXES.items():
+        with contextlib.closing(
+            sqlite3.connect(compile._sql_db_path(database))
+        ) as conn:
+            indexes = [
+                i[0]
+                for i in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+            ]
+        for statement in statements:
+            assert statement.split(" ON ")[0].split()[-1] in indexes
+    with contextlib.closing(sqlite3.connect(mygaiadb.catwise_sql_db_path)) as conn:
+        ra, dec, healpix12 = np.array(
+            conn.execute("SELECT ra, dec, healpix12 FROM catwise").fetchall()
+        ).T
+    npt.assert_array_equal(healpix12, radec_to_healpix(ra, dec, level=12))
+
+
+@pytest.mark.order(3)
+def test_parallel_h5_compile():
+    # compiling XP coeffs h5 files in worker processes should give the same files
+    h5_paths = sorted(
+        mygaiadb.astro_data_path.joinpath(
+            "gaia_mirror", "Gaia", "gdr3", "Spectroscopy", "xp_continuous_mean_spectrum"
+        ).glob("*.h5")
+    )
+    serial = {}
+    for path in h5_paths:
+        with h5py.File(path, "r") as f:
+            serial[path] = {k: f[k][()] for k in f.keys()}
+    compile.compile_xp_continuous_h5(save_correlation_matrix=True, n_workers=2)
+    for path in h5_paths:
+        with h5py.File(path, "r") as f:
+            assert set(f.keys()) == set(serial[path].keys())
+            for k in f.keys():
+                npt.assert_array_equal(f[k][()], serial[path][k])
+
+
+@pytest.mark.order(3)
+def test_xp_allinone_assembly(tmp_path, monkeypatch):
+    # all assembly modes should give the same content as the single h5 file compiled in test_compile
+    with h5py.File(gaia_xp_coeff_h5_path, "r") as f:
+        expected = {
+            (gp, k): f[gp][k][()] for gp in f.keys() for k in f[gp].keys()
+        }
+    for i, (assembly, layout) in enumerate(
+        [
+            ("rewrite", None),
+            ("rewrite", "gzip"),
+            ("rewrite", {"chunk_rows": 16, "compression": "lzf"}),
+            ("copy", None),
+            ("link", None),
+        ]
+    ):
+        h5_path = tmp_path.joinpath(f"allinone_{i}.h5")
+        monkeypatch.setattr(mygaiadb, "gaia_xp_coeff_h5_path", h5_path)
+        compile.compile_xp_continuous_allinone_h5(assembly=assembly, layout=layout)
+        with h5py.File(h5_path, "r") as f:
+            if layout is not None:
+                dataset = f[list(f.keys())[0]]["bp_coefficients"]
+                assert dataset.compression == compile._get_h5_layout(layout)["compression"]
+            content = {
+                (gp, k): f[gp][k][()] for gp in f.keys() for k in f[gp].keys()
+            }
+        assert content.keys() == expected.keys()
+        for key, value in expected.items():
+            npt.assert_array_equal(content[key], value)
+    with pytest.raises(ValueError):
+        compile.compile_xp_continuous_allinone_h5(assembly="virtual")
+    with pytest.raises(ValueError):
+        compile.compile_xp_continuous_allinone_h5(assembly="copy", layout="gzip")
+    with pytest.raises(ValueError):
+        compile.compile_xp_continuous_allinone_h5(assembly="rewrite", layout="zstd")
+
+
+@pytest.mark.order(3)
+def test_reader_engines():
+    # pyarrow engine should parse files the same as pandas engine
+    for reader, file_paths in [
+        (compile._read_gaia_source, mygaiadb.data._GAIA_DR3_GAIASOURCE_PARENT.glob("*.csv.gz")),
+        (compile._read_tmass, mygaiadb.data._2MASS_PARENT.glob("psc_*.gz")),
+        (compile._read_allwise, mygaiadb.data._ALLWISE_PARENT.glob("wise-allwise-cat-*.bz2")),
+        (compile._read_catwise, mygaiadb.data._CATWISE_PARENT.glob("*/*cat_b0.tbl.gz")),
+    ]:
+        for path in sorted(file_paths):
+            df_pandas = pd.concat(list(reader(path, engine="pandas")), ignore_index=True)
+            df_arrow = pd.concat(list(reader(path, engine="pyarrow")), ignore_index=True)
+            pd.testing.assert_frame_equal(df_pandas, df_arrow, check_dtype=False)
+
+
+@pytest.mark.order(3)
+def test_resume_compile():
+    # files already in the ingest manifest should be skipped
+    with contextlib.closing(sqlite3.connect(mygaiadb.tmass_sql_db_path)) as conn:
+        n_rows = conn.execute("SELECT COUNT(*) FROM twomass_psc").fetchone()[0]
+        n_files, n_manifest_rows = conn.execute(
+            "SELECT COUNT(*), SUM(row_count) FROM mygaiadb_ingest_manifest WHERE table_name = 'twomass_psc' AND committed_at IS NOT NULL"
+        ).fetchone()
+    assert n_rows == n_manifest_rows
+    assert n_files == len(list(mygaiadb.data._2MASS_PARENT.glob("psc_*.gz")))
+    compile.compile_tmass_sql_db(indexing=False)
+    with contextlib.closing(sqlite3.connect(mygaiadb.tmass_sql_db_path)) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM twomass_psc").fetchone()[0] == n_rows
 
 
 @pytest.mark.order(4)
@@ -172,6 +374,186 @@ def test_query(localdb):
     assert np.all(preprocessed_result == normal_result)
 
 
+@pytest.mark.order(6)
+def test_immutable_query(localdb):
+    query = """
+    SELECT G.source_id, G.ra, GA.teff_gspphot
+    FROM gaiadr3.gaia_source as G
+    LEFT JOIN gaiadr3.astrophysical_parameters as GA on GA.source_id = G.source_id
+    """
+    tuned_db = LocalGaiaSQL(
+        load_allwise=False,
+        immutable=True,
+        mmap_size=2**28,
+        cache_size=-65536,
+        temp_store="memory",
+        threads=2,
+    )
+    try:
+        pd.testing.assert_frame_equal(tuned_db.query(query), localdb.query(query))
+        with tuned_db._pool.connection() as conn:
+            assert conn.execute("PRAGMA gaiadr3.cache_size").fetchone()[0] == -65536
+            assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2
+            database_list = conn.execute("PRAGMA database_list").fetchall()
+        assert all(i[1] in tuned_db._readonly_db_names() or i[1] == "main" for i in database_list)
+    finally:
+        tuned_db.close()
+    with pytest.raises(ValueError):
+        LocalGaiaSQL(load_allwise=False, temp_store="disk")
+
+
+@pytest.mark.order(6)
+def test_cone_search(localdb):
+    everything = localdb.query("SELECT G.source_id, G.ra, G.dec FROM gaiadr3.gaia_source as G")
+    ra, dec = everything["ra"].iloc[0], everything["dec"].iloc[0]
+    radius = 5.0
+    cone_df = localdb.cone_search(
+        ra,
+        dec,
+        radius,
+        columns=["G.source_id", "GA.teff_gspphot"],
+        joins="LEFT JOIN gaiadr3.astrophysical_parameters as GA on GA.source_id = G.source_id",
+    )
+    assert list(cone_df.columns) == ["source_id", "teff_gspphot", "ang_dist"]
+    assert np.all(cone_df["ang_dist"] <= radius)
+    # compare to brute-force angular distance of all sources
+    cos_dist = np.sin(np.deg2rad(everything["dec"])) * np.sin(np.deg2rad(dec)) + np.cos(
+        np.deg2rad(everything["dec"])
+    ) * np.cos(np.deg2rad(dec)) * np.cos(np.deg2rad(everything["ra"] - ra))
+    npt.assert_array_equal(
+        np.sort(cone_df["source_id"]),
+        np.sort(everything["source_id"][cos_dist >= np.cos(np.deg2rad(radius))]),
+    )
+    with pytest.raises(ValueError):
+        localdb.cone_search(ra, dec, -1.0)
+
+
+@pytest.mark.order(6)
+def test_adql_query(localdb):
+    everything = localdb.query("SELECT G.source_id, G.ra, G.dec FROM gaiadr3.gaia_source as G")
+    ra, dec = everything["ra"].iloc[0], everything["dec"].iloc[0]
+    cone_df = localdb.cone_search(ra, dec, 5.0, columns=["G.source_id"])
+    adql_df = localdb.query(
+        f"""
+        SELECT TOP 100000 G.source_id
+        FROM gaiadr3.gaia_source as G
+        WHERE 1 = CONTAINS(POINT('ICRS', G.ra, G.dec), CIRCLE('ICRS', {ra}, {dec}, 5.0))
+        """
+    )
+    npt.assert_array_equal(np.sort(adql_df["source_id"]), np.sort(cone_df["source_id"]))
+    # source_id ranges are searched instead of scanning gaia_source
+    assert translate_adql(
+        f"SELECT G.source_id FROM gaiadr3.gaia_source as G WHERE CONTAINS(POINT(G.ra, G.dec), CIRCLE({ra}, {dec}, 5.0)) = 1"
+    ).count("G.source_id BETWEEN") > 0
+    # ranges are not used if the comparison is not the whole predicate, e.g., -1 = CONTAINS(...) is never true
+    circle = f"CONTAINS(POINT(G.ra, G.dec), CIRCLE({ra}, {dec}, 5.0))"
+    for predicate in [
+        f"-1 = {circle}",
+        f"G.parallax - 1 = {circle}",
+        f"0.1 = {circle}",
+        f"{circle} = 1.5",
+        f"{circle} = 1 + G.parallax",
+        f"2 * {circle} = 1",
+    ]:
+        translated = translate_adql(f"SELECT G.source_id FROM gaiadr3.gaia_source as G WHERE {predicate}")
+        assert "BETWEEN" not in translated
+    assert len(localdb.query(f"SELECT G.source_id FROM gaiadr3.gaia_source as G WHERE -1 = {circle}")) == 0
+    assert "BETWEEN" in translate_adql(
+        f"SELECT G.source_id FROM gaiadr3.gaia_source as G WHERE (G.parallax > 1 AND 1 = {circle}) ORDER BY G.source_id"
+    )
+    # same results as checking every source
+    for shape in [
+        f"BOX('ICRS', {ra}, {dec}, 10.0, 4.0)",
+        f"POLYGON('ICRS', {ra - 5}, {dec - 3}, {ra + 5}, {dec - 3}, {ra}, {dec + 3})",
+    ]:
+        ranged_df = localdb.query(
+            f"SELECT G.source_id FROM gaiadr3.gaia_source as G WHERE 1 = CONTAINS(POINT(G.ra, G.dec), {shape})"
+        )
+        scan_df = localdb.query(
+            f"SELECT G.source_id FROM gaiadr3.gaia_source as G WHERE CONTAINS(POINT(G.ra, G.dec), {shape}) > 0"
+        )
+        npt.assert_array_equal(np.sort(ranged_df["source_id"]), np.sort(scan_df["source_id"]))
+    # the farthest points of a wide box from its center are between corners on its edges of constant RA
+    wide_box = "BOX('ICRS', 0, 5, 300, 40)"
+    ranged_count = localdb.query(
+        f"SELECT count(*) AS n FROM gaiadr3.gaia_source as G WHERE 1 = CONTAINS(POINT(G.ra, G.dec), {wide_box})"
+    )["n"][0]
+    exact_count = localdb.query(
+        f"SELECT count(*) AS n FROM gaiadr3.gaia_source as G WHERE CONTAINS(POINT(G.ra, G.dec), {wide_box}) > 0"
+    )["n"][0]
+    assert ranged_count == exact_count
+    distance_df = localdb.query(
+        f"SELECT DISTANCE(POINT(G.ra, G.dec), POINT({ra}, {dec})) as dist FROM gaiadr3.gaia_source as G LIMIT 1"
+    )
+    npt.assert_allclose(distance_df["dist"], 0.0, atol=1e-8)
+    with pytest.raises(ValueError):
+        localdb.query("SELECT * FROM gaiadr3.gaia_source as G WHERE 1 = CONTAINS(POINT(G.ra, G.dec), CIRCLE(0, 0))")
+
+
+@pytest.mark.order(6)
+def test_xmatch(localdb):
+    source_ids = localdb.query(
+        "SELECT G.source_id FROM gaiadr3.gaia_source as G LIMIT 100"
+    )["source_id"].to_numpy()
+    # shuffled with duplicates and an id not in the database
+    ids = np.random.default_rng(0).permutation(np.concatenate([source_ids, source_ids[:10], [1]]))
+    query = """
+    SELECT G.source_id, G.ra, GA.teff_gspphot
+    FROM gaiadr3.gaia_source as G
+    LEFT JOIN gaiadr3.astrophysical_parameters as GA on GA.source_id = G.source_id
+    """
+    xmatch_df = localdb.xmatch(query, ids)
+    npt.assert_array_equal(xmatch_df["source_id"], ids[ids != 1])
+    query_df = localdb.query(query + " WHERE G.source_id = " + str(ids[0]))
+    npt.assert_array_equal(xmatch_df["ra"].iloc[0], query_df["ra"].iloc[0])
+    # ids are only kept during the query
+    assert "xmatch.ids" not in localdb.list_all_tables()
+    # ids are the outer loop so the query is searched for each id instead of scanning gaia_source
+    localdb.cursor.execute("""CREATE TABLE xmatch.ids (source_id INTEGER PRIMARY KEY)""")
+    try:
+        for plan_query in [
+            """
+            SELECT G.source_id, GA.teff_gspphot
+            FROM gaiadr3.gaia_source as G
+            INNER JOIN gaiadr3.astrophysical_parameters as GA on GA.source_id = G.source_id
+            """,
+            "SELECT G.source_id, G.ra FROM gaiadr3.gaia_source as G WHERE G.ra > 10",
+        ]:
+            plan = localdb.conn.execute(
+                f"EXPLAIN QUERY PLAN {_xmatch_query(plan_query, 'source_id')}"
+            ).fetchall()
+            assert plan[0][3] == "SCAN X"
+            assert all(not i[3].startswith("SCAN") for i in plan[1:])
+    finally:
+        localdb.cursor.execute("""DROP TABLE xmatch.ids""")
+    where_df = localdb.xmatch("SELECT G.source_id, G.ra FROM gaiadr3.gaia_source as G WHERE G.ra > 10", ids)
+    npt.assert_array_equal(where_df["source_id"], xmatch_df["source_id"][xmatch_df["ra"] > 10])
+
+
+@pytest.mark.order(6)
+def test_positional_xmatch(localdb):
+    gaia_df = localdb.query(
+        "SELECT G.source_id, G.ra, G.dec FROM gaiadr3.gaia_source as G LIMIT 1000"
+    )
+    user_df = gaia_df.rename(columns={"source_id": "my_id"})
+    # every source should match itself as the nearest source
+    nearest_df = localdb.positional_xmatch(user_df, 1.0, mode="nearest", tablename="xmatch_table")
+    npt.assert_array_equal(nearest_df["my_id"], nearest_df["source_id"])
+    assert len(nearest_df) == len(user_df)
+    assert np.all(nearest_df["ang_sep"] < 1e-3)
+    assert "xmatch_table" in localdb.list_user_tables()
+    localdb.remove_user_table("xmatch_table")
+    all_df = localdb.positional_xmatch(user_df, 10.0, mode="all", columns=["source_id", "ra"])
+    assert len(all_df) >= len(user_df)
+    assert np.all(all_df["ang_sep"] <= 10.0)
+    assert np.all(np.diff(all_df.index) == 1)
+    assert "ra_gaia" in all_df.columns
+    with pytest.raises(ValueError):
+        localdb.positional_xmatch(user_df, 1.0, mode="furthest")
+    with pytest.raises(ValueError):
+        localdb.positional_xmatch(user_df, 1.0, catalog="sdss")
+
+
 @pytest.mark.order(7)
 def test_query_saving(localdb):
     # ================= query with new line in both start and end =================
@@ -214,6 +596,344 @@ def test_query_saving(localdb):
     # make sure saved csv has the same result of simply query
     assert np.all(query_df.loc[0] == query_df_from_saved.loc[0])
 
+    # ================= pipelined saving should give the same file =================
+    localdb.save_csv(query, "output_pipelined.csv", chunksize=3, n_workers=4, queue_depth=2)
+    localdb.save_csv(query, "output.csv", chunksize=3)
+    with open("output.csv", "rb") as f1, open("output_pipelined.csv", "rb") as f2:
+        assert f1.read() == f2.read()
+    # callbacks are applied to chunks in order by a single thread even with multiple workers
+    seen = []
+
+    def record_ra(ra):
+        seen.append((threading.get_ident(), ra[0]))
+        return ra / 180 * np.pi
+
+    ra_conversion = LambdaCallback(new_col_name="ra_rad", func=record_ra)
+    localdb.save_csv(query, "output_pipelined.csv", chunksize=3, n_workers=4, callbacks=[ra_conversion])
+    localdb.save_csv(query, "output.csv", chunksize=3, callbacks=[ra_conversion])
+    with open("output.csv", "rb") as f1, open("output_pipelined.csv", "rb") as f2:
+        assert f1.read() == f2.read()
+    n_chunks = len(seen) // 2
+    assert len({i[0] for i in seen[:n_chunks]}) == 1
+    assert [i[1] for i in seen[:n_chunks]] == [i[1] for i in seen[n_chunks:]]
+
+
+@pytest.mark.order(7)
+def test_query_saving_columnar(localdb):
+    import pyarrow.feather as pf
+    import pyarrow.parquet as pq
+
+    query = """
+    SELECT G.source_id, G.ra, G.phot_g_mean_mag, G.has_xp_continuous, GA.teff_gspphot, GA.source_id
+    FROM gaiadr3.gaia_source as G
+    LEFT JOIN gaiadr3.astrophysical_parameters as GA on GA.source_id = G.source_id
+    LIMIT 25
+    """
+    ra_conversion = LambdaCallback(new_col_name="ra_rad", func=lambda ra: ra / 180 * np.pi)
+    query_df = localdb.query(query, callbacks=[ra_conversion])
+    localdb.save_parquet(query, "output.parquet", chunksize=10, callbacks=[ra_conversion])
+    assert pq.ParquetFile("output.parquet").num_row_groups == 3
+    table = pq.read_table("output.parquet")
+    # types from SQL schema and unique column names
+    assert str(table.schema.field("phot_g_mean_mag").type) == "float"
+    assert str(table.schema.field("has_xp_continuous").type) == "bool"
+    assert table.column_names[-2:] == ["source_id:1", "ra_rad"]
+    assert table.schema.metadata[b"query"].decode() == query
+    npt.assert_array_equal(table["source_id"].to_numpy(), query_df.iloc[:, 0])
+    npt.assert_allclose(table["ra_rad"].to_numpy(), query_df["ra_rad"])
+    localdb.save_feather(query, "output.feather", chunksize=10, callbacks=[ra_conversion])
+    assert pf.read_table("output.feather").equals(table)
+    localdb.save_hdf5(query, "output.h5", chunksize=10, callbacks=[ra_conversion])
+    with h5py.File("output.h5", "r") as f:
+        npt.assert_array_equal(f["source_id"][()], query_df.iloc[:, 0])
+        assert f.attrs["query"] == query
+    with pytest.raises(FileExistsError):
+        localdb.save_parquet(query, "output.parquet", overwrite=False)
+
+
+@pytest.mark.order(7)
+def test_iter_query(localdb):
+    query = """
+    SELECT G.source_id, G.ra, GA.teff_gspphot
+    FROM gaiadr3.gaia_source as G
+    LEFT JOIN gaiadr3.astrophysical_parameters as GA on GA.source_id = G.source_id
+    LIMIT 25
+    """
+    ra_conversion = LambdaCallback(new_col_name="ra_rad", func=lambda ra: ra / 180 * np.pi)
+    query_df = localdb.query(query, callbacks=[ra_conversion])
+    chunks = list(localdb.iter_query(query, chunksize=10, callbacks=[ra_conversion]))
+    assert [len(i) for i in chunks] == [10, 10, 5]
+    iter_df = pd.concat(chunks, ignore_index=True)
+    npt.assert_array_equal(iter_df["source_id"], query_df["source_id"])
+    npt.assert_array_equal(iter_df["ra_rad"], query_df["ra_rad"])
+    chunks = list(localdb.iter_query(query, chunksize=10, as_="numpy"))
+    npt.assert_array_equal(np.concatenate(chunks)["source_id"], query_df["source_id"])
+    chunks = list(localdb.iter_query(query, chunksize=10, as_="arrow"))
+    npt.assert_array_equal(
+        np.concatenate([i["source_id"].to_numpy() for i in chunks]), query_df["source_id"]
+    )
+    with pytest.raises(ValueError):
+        next(localdb.iter_query(query, as_="polars"))
+
+
+@pytest.mark.order(7)
+def test_query_cache(localdb, tmp_path):
+    query = """
+    SELECT G.source_id, G.ra, GA.teff_gspphot
+    FROM gaiadr3.gaia_source as G
+    LEFT JOIN gaiadr3.astrophysical_parameters as GA on GA.source_id = G.source_id
+    LIMIT 25
+    """
+    ra_conversion = LambdaCallback(new_col_name="ra_rad", func=lambda ra: ra / 180 * np.pi)
+    localdb.cache = QueryCache(tmp_path, max_size=2**30)
+    try:
+        query_df = localdb.query(query, callbacks=[ra_conversion])
+        pd.testing.assert_frame_equal(localdb.query(query, callbacks=[ra_conversion]), query_df)
+        assert localdb.cache.stats()["hits"] == 1
+        # different callbacks are cached separately
+        ra_double = LambdaCallback(new_col_name="ra_rad", func=lambda ra: ra * 2)
+        npt.assert_array_equal(localdb.query(query, callbacks=[ra_double])["ra_rad"], query_df["ra"] * 2)
+        assert localdb.cache.stats()["entries"] == 2
+        # iter_query() on the cached result
+        chunks = list(localdb.iter_query(query, chunksize=10, callbacks=[ra_conversion]))
+        assert [len(i) for i in chunks] == [10, 10, 5]
+        assert localdb.cache.stats()["hits"] == 2
+        localdb.cache.invalidate(query)
+        assert localdb.cache.stats()["entries"] == 0
+        # iter_query() result is cached after all chunks are consumed
+        chunks = list(localdb.iter_query(query, chunksize=10))
+        npt.assert_array_equal(localdb.query(query)["source_id"], query_df["source_id"])
+        assert localdb.cache.stats()["hits"] == 3
+        # results with duplicate column names cannot be saved as parquet, they are returned but not cached
+        dup_query = """
+        SELECT G.source_id, GA.source_id, GA.teff_gspphot
+        FROM gaiadr3.gaia_source as G
+        LEFT JOIN gaiadr3.astrophysical_parameters as GA on GA.source_id = G.source_id
+        LIMIT 25
+        """
+        n_entries = localdb.cache.stats()["entries"]
+        assert list(localdb.query(dup_query).columns) == ["source_id", "source_id", "teff_gspphot"]
+        assert sum(len(i) for i in localdb.iter_query(dup_query, chunksize=10)) == 25
+        assert localdb.cache.stats()["entries"] == n_entries
+        assert not any(i.name.endswith(".tmp") for i in tmp_path.iterdir())
+        localdb.cache.max_size = 0
+        localdb.cache.evict()
+        assert localdb.cache.stats()["size"] == 0
+    finally:
+        localdb.cache = None
+
+
+@pytest.mark.order(7)
+def test_concurrent_query(localdb):
+    query = """
+    SELECT G.source_id, G.ra, GA.teff_gspphot
+    FROM gaiadr3.gaia_source as G
+    LEFT JOIN gaiadr3.astrophysical_parameters as GA on GA.source_id = G.source_id
+    """
+    query_df = localdb.query(query)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: localdb.query(query), range(16)))
+    for i in results:
+        pd.testing.assert_frame_equal(i, query_df)
+    # connections are reused
+    assert len(localdb._pool._connections) <= localdb._pool.size
+    # other queries in the same thread while iterating use the same connection
+    for chunk in localdb.iter_query(query + " LIMIT 25", chunksize=10):
+        assert len(localdb.query(query + " LIMIT 1")) == 1
+
+
+@pytest.mark.order(7)
+def test_query_limits(localdb, tmp_path):
+    # cross join without join condition which takes a long time
+    slow_query = """
+    SELECT count(*)
+    FROM gaiadr3.gaia_source as A, gaiadr3.gaia_source as B
+    WHERE A.parallax > B.parallax
+    """
+    with pytest.raises(TimeoutError):
+        localdb.query(slow_query, timeout=0.2)
+    with pytest.raises(TimeoutError):
+        localdb.query(slow_query, max_vm_steps=100000)
+    # partially written file is removed
+    query = "SELECT G.source_id, G.ra, G.dec FROM gaiadr3.gaia_source as G"
+    for func, ext in [(localdb.save_csv, "csv"), (localdb.save_parquet, "parquet")]:
+        filename = tmp_path.joinpath(f"limited.{ext}")
+        with pytest.raises(TimeoutError):
+            func(query, filename, chunksize=10, max_vm_steps=20000)
+        assert not filename.exists()
+    # cancel from another thread
+    timer = threading.Timer(0.2, localdb.cancel)
+    timer.start()
+    with pytest.raises(InterruptedError):
+        localdb.query(slow_query)
+    timer.join()
+    # connection is still usable after interrupted
+    assert len(localdb.query(query + " LIMIT 5", timeout=10)) == 5
+
+
+@pytest.mark.order(7)
+def test_query_profile(localdb, tmp_path):
+    query = """
+    SELECT G.source_id, G.ra, GA.teff_gspphot
+    FROM gaiadr3.gaia_source as G
+    LEFT JOIN gaiadr3.astrophysical_parameters as GA on GA.source_id = G.source_id
+    LIMIT 25
+    """
+    ra_conversion = LambdaCallback(new_col_name="ra_rad", func=lambda ra: ra / 180 * np.pi)
+    query_df = localdb.query(query, callbacks=[ra_conversion])
+    assert localdb.last_profile is None
+    log = tmp_path.joinpath("profile.jsonl")
+    localdb.profile, localdb.profile_log = True, str(log)
+    try:
+        # result is the same with profiling
+        pd.testing.assert_frame_equal(localdb.query(query, callbacks=[ra_conversion]), query_df)
+        report = localdb.last_profile
+        assert report["method"] == "query"
+        assert {"execute", "fetch", "dataframe", "callbacks"} <= set(report["stages"])
+        assert report["stages"]["fetch"]["rows"] == 25
+        assert len(report["plan"]) > 0
+        assert report["total_time"] >= sum(i["time"] for i in report["stages"].values())
+        # VM steps are counted in multiples of the interval of the progress handler
+        localdb.query(query.replace("LIMIT 25", ""))
+        assert localdb.last_profile["vm_steps"] > 0
+        chunks = list(localdb.iter_query(query, chunksize=10))
+        assert localdb.last_profile["method"] == "iter_query"
+        assert localdb.last_profile["stages"]["fetch"]["rows"] == 25
+        localdb.save_csv(query, tmp_path.joinpath("profile.csv"), chunksize=10)
+        assert localdb.last_profile["stages"]["write"]["rows"] == 25
+        localdb.save_parquet(query, tmp_path.joinpath("profile.parquet"), chunksize=10)
+        assert localdb.last_profile["stages"]["write"]["rows"] == 25
+        with pytest.raises(sqlite3.OperationalError):
+            localdb.query("SELECT not_a_column FROM gaiadr3.gaia_source")
+        assert localdb.last_profile["error"] is not None
+        with open(log) as f:
+            reports = [json.loads(i) for i in f]
+        assert [i["method"] for i in reports] == [
+            "query", "query", "iter_query", "save_csv", "save_parquet", "query"
+        ]
+    finally:
+        localdb.profile, localdb.profile_log = False, None
+
+
+@pytest.mark.order(7)
+def test_analyze_query(localdb):
+    # nested loop on gaia_source without join condition
+    slow_query = """
+    SELECT count(*)
+    FROM gaiadr3.gaia_source as A, gaiadr3.gaia_source as B
+    WHERE A.parallax > B.parallax
+    """
+    findings = localdb.analyze_query(slow_query)
+    assert [i["severity"] for i in findings] == ["warning", "critical"]
+    assert all(i["table"] == "gaia_source" for i in findings)
+    with pytest.warns(UserWarning, match="can take days"):
+        with pytest.raises(TimeoutError):
+            localdb.query(slow_query, timeout=0.1)
+    # no warning for joins on indexed columns
+    query = """
+    SELECT G.source_id, TM.j_m
+    FROM gaiadr3.gaia_source as G
+    INNER JOIN gaiadr3.tmasspscxsc_best_neighbour as T on G.source_id = T.source_id
+    INNER JOIN tmass.twomass_psc as TM on TM.designation = T.original_ext_source_id
+    LIMIT 10
+    """
+    assert all(i["severity"] != "critical" for i in localdb.analyze_query(query))
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        localdb.query(query)
+    # join with 2MASS not on designation builds a temporary index
+    findings = localdb.analyze_query(
+        "SELECT G.source_id, TM.j_m FROM gaiadr3.gaia_source as G, tmass.twomass_psc as TM WHERE G.ra = TM.ra"
+    )
+    assert "critical" in [i["severity"] for i in findings]
+    localdb.check_plan = False
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            with pytest.raises(TimeoutError):
+                localdb.query(slow_query, timeout=0.1)
+    finally:
+        localdb.check_plan = True
+
+
+@pytest.mark.order(7)
+def test_parallel_query(localdb):
+    query = """
+    SELECT G.source_id, G.ra, GA.teff_gspphot
+    FROM gaiadr3.gaia_source as G
+    LEFT JOIN gaiadr3.astrophysical_parameters as GA on GA.source_id = G.source_id
+    WHERE G.parallax > 1
+    """
+    query_df = localdb.query(query).sort_values("source_id", ignore_index=True)
+    parallel_df = localdb.parallel_query(query, n_workers=2, n_partitions=5, order_by="source_id")
+    pd.testing.assert_frame_equal(parallel_df, query_df)
+    chunks = list(localdb.iter_parallel_query(query, n_workers=2, n_partitions=5))
+    assert len(chunks) == 5
+    assert sum(len(i) for i in chunks) == len(query_df)
+    with pytest.raises(ValueError):
+        localdb.parallel_query(query + " LIMIT 10")
+    with pytest.raises(ValueError):
+        localdb.parallel_query("SELECT * FROM tmass.twomass_psc")
+    # queries which are not row-wise give wrong result if partitioned
+    for bad_query in [
+        "SELECT COUNT(*) FROM gaiadr3.gaia_source as G WHERE G.parallax > 1",
+        "SELECT G.source_id FROM gaiadr3.gaia_source as G "
+        "WHERE G.parallax > (SELECT AVG(parallax) + 2 FROM gaiadr3.gaia_source)",
+        "SELECT G.source_id FROM gaiadr3.gaia_source as G WHERE G.parallax > 1 ORDER BY G.parallax",
+        "SELECT G.source_id FROM gaiadr3.gaia_source as G "
+        "INNER JOIN gaiadr3.gaia_source as G2 on G2.source_id = G.source_id",
+        "SELECT G.source_id, SUM(G.parallax) OVER () FROM gaiadr3.gaia_source as G",
+    ]:
+        with pytest.raises(ValueError):
+            localdb.parallel_query(bad_query)
+    # scalar max() is row-wise
+    query = "SELECT G.source_id, max(G.parallax, 0) AS p FROM gaiadr3.gaia_source as G WHERE G.parallax > 1"
+    pd.testing.assert_frame_equal(
+        localdb.parallel_query(query, n_workers=2, n_partitions=5, order_by="source_id"),
+        localdb.query(query).sort_values("source_id", ignore_index=True),
+    )
+
+
+@pytest.mark.order(7)
+def test_lazy_attach(localdb, tmp_path):
+    # importing does not need MY_ASTRO_DATA, create any file or import pandas
+    env = {k: v for k, v in os.environ.items() if k != "MY_ASTRO_DATA"}
+    env["HOME"] = str(tmp_path)
+    code = (
+        "import sys, mygaiadb, mygaiadb.query; "
+        "assert 'pandas' not in sys.modules and 'tqdm' not in sys.modules; "
+        "mygaiadb.gaia_sql_db_path"
+    )
+    result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True)
+    assert "MY_ASTRO_DATA" in result.stderr and "AssertionError" not in result.stderr
+    assert not tmp_path.joinpath(".mygaiadb").exists()
+    # subpackages do not resolve paths when imported either
+    code = "import mygaiadb.data, mygaiadb.data.compile, mygaiadb.data.download, mygaiadb.spec"
+    result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert not tmp_path.joinpath(".mygaiadb").exists()
+
+    lazydb = LocalGaiaSQL(load_allwise=False, lazy_attach=True)
+    assert lazydb.attached_db_name == ["gaiadr3"]
+    query = "SELECT source_id, ra FROM gaiadr3.gaia_source LIMIT 10"
+    pd.testing.assert_frame_equal(lazydb.query(query), localdb.query(query))
+    assert lazydb.attached_db_name == ["gaiadr3"]
+    # catalogs are attached when referenced, also by connections in other threads
+    query = "SELECT designation, j_m FROM tmass.twomass_psc LIMIT 10"
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = list(executor.map(lazydb.query, [query] * 2))
+    assert lazydb.attached_db_name == ["gaiadr3", "tmass"]
+    for result in results:
+        pd.testing.assert_frame_equal(result, localdb.query(query))
+    # the main connection can only be used in its own thread, it attaches catalogs when used there
+    assert "tmass" not in [i[1] for i in lazydb.conn.execute("PRAGMA database_list")]
+    assert lazydb.get_table_column("tmass.twomass_psc") == localdb.get_table_column("tmass.twomass_psc")
+    assert "tmass" in [i[1] for i in lazydb.conn.execute("PRAGMA database_list")]
+    # allwise is not loaded so it is never attached
+    assert sorted(lazydb.list_all_tables()) == sorted(localdb.list_all_tables())
+    assert "allwise" not in lazydb.attached_db_name
+    lazydb.close()
+
 
 @pytest.mark.order(8)
 @pytest.mark.parametrize(